@@ -11,17 +11,47 @@ Setup:
 1. pip install flask
 2. python app.py
 """
-from flask import Flask, request, redirect, url_for, render_template_string, flash, session
+from flask import Flask, request, redirect, url_for, render_template, flash, session, g, Response, before_render_template, template_rendered
+from jinja2 import DictLoader, FileSystemBytecodeCache
 import csv
+import heapq
+import gzip
 import json
+import logging
 import os
 import sys
 import random
+import re
+import secrets
+import sqlite3
+import threading
 import time
 import webbrowser
-from threading import Timer
+import atexit
+import bisect
+import gc
+import math
+from threading import Timer, Lock
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 
+import dedup
+import grading
+import importers
+import metrics
+import search
+import snapshot
+import sqlitedb
+from metrics import timed, count_read, count_written
+from questiontable import QuestionTable, assign_ids
+
+try:
+    import fcntl
+except ImportError:   # Windows: the desktop/waitress setup runs a single process
+    fcntl = None
+
 # --- Configuration ---
 ACCESS_PIN = '1234'
 SECRET_KEY = 'super-secret-key-change-me'
@@ -35,55 +65,1349 @@ else:
     # If running as python script
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
-DATA_FILE = os.path.join(BASE_DIR, 'questions.json')
-SESSION_FILE = os.path.join(BASE_DIR, 'session.json')
-SCORES_FILE = os.path.join(BASE_DIR, 'highscores.json')
+# Data files live next to the app unless MCQ_DATA_DIR points elsewhere
+DATA_DIR = os.environ.get('MCQ_DATA_DIR', BASE_DIR)
+
+DATA_FILE = os.path.join(DATA_DIR, 'questions.json')
+SESSION_DIR = os.path.join(DATA_DIR, 'sessions')
+SESSION_DB = os.path.join(DATA_DIR, 'sessions.db')
+SCORES_FILE = os.path.join(DATA_DIR, 'highscores.json')  # legacy top-20 file, migrated into SCORES_LOG
+SCORES_LOG = os.path.join(DATA_DIR, 'scores.jsonl')
+QUESTIONS_DB = os.path.join(DATA_DIR, 'questions.db')
+QUESTIONS_LOCK = os.path.join(DATA_DIR, '.questions.lock')
+ITEM_STATS_DB = os.path.join(DATA_DIR, 'item_stats.db')
+FINGERPRINT_DB = os.path.join(DATA_DIR, 'fingerprints.db')
+FINGERPRINT_LOCK = os.path.join(DATA_DIR, '.fingerprints.lock')
+SNAPSHOT_FILE = os.path.join(DATA_DIR, 'questions.snap')
+
+# Question storage: 'json' (questions.json) or 'sqlite' (questions.db)
+QUESTION_STORE = os.environ.get('MCQ_QUESTION_STORE', 'json')
+
+# Keep a memory-mapped binary snapshot of the bank next to the store
+# (questions.snap) and serve from it: O(1) start-up, text decoded on access,
+# pages shared by all worker processes. '1' on, '0' off; unset: on under
+# 'serve' with more than one worker
+SNAPSHOT_MODE = os.environ.get('MCQ_SNAPSHOT', '')
+
+# Instrumentation: requests slower than this (ms) get their sampled stacks
+# written to profiles/ as folded stacks; 0 disables the profiler
+PROFILE_SLOW_MS = int(os.environ.get('MCQ_PROFILE_SLOW_MS', 0))
+PROFILE_DIR = os.path.join(DATA_DIR, 'profiles')
+
+# Durability of JSON state files: 'fsync' (fsync every write), 'group' (concurrent
+# session writes are coalesced into one fsynced commit; callers wait for it) or
+# 'async' (coalesced and written in the background without fsync; single-process only).
+# MCQ_GROUP_COMMIT_MS > 0 makes 'group' commit on a fixed interval instead of as
+# soon as the previous commit finishes; it is also the 'async' flush interval.
+DURABILITY = os.environ.get('MCQ_DURABILITY', 'group')
+GROUP_COMMIT_MS = int(os.environ.get('MCQ_GROUP_COMMIT_MS', 0))
+
+log = logging.getLogger('mcq')
+
+# Session storage: 'file' (one JSON file per session), 'sqlite' or 'memory' (LRU, lost on restart)
+SESSION_BACKEND = os.environ.get('MCQ_SESSION_BACKEND', 'file')
+SESSION_TTL = int(os.environ.get('MCQ_SESSION_TTL', 12 * 3600))
+SESSION_MAX = int(os.environ.get('MCQ_SESSION_MAX', 10000))
 
 app = Flask(__name__)
 app.secret_key = SECRET_KEY
 
-# --- Data Helpers ---
-
-def load_questions():
-    if not os.path.exists(DATA_FILE): return []
+# --- Multi-process Safety ---
+# Under 'python app.py serve' several worker processes share the data files.
+# Reads stay lock-free (caches revalidate by signature); bank writes are
+# serialised across processes with an advisory file lock.
+
+@contextmanager
+def file_lock(path):
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try: yield
+        finally: fcntl.flock(f, fcntl.LOCK_UN)
+
+# Threads, pools and SQLite connections do not survive fork, and gunicorn
+# forks the workers after the app is imported in the master: each object
+# resets such state in the child here and sets it up again on first use.
+
+def after_fork():
+    sqlitedb.after_fork()
+    metrics.after_fork()
+    if WRITER: WRITER.after_fork()
+    ITEM_STATS.after_fork()
+
+if hasattr(os, 'register_at_fork'): os.register_at_fork(after_in_child=after_fork)
+
+# --- Durable Writes ---
+# Files are never rewritten in place: data goes to a temp file in the same
+# directory which is then atomically renamed over the target, so a crash
+# leaves either the old or the new version. Session writes additionally go
+# through a write-behind queue that coalesces rapid updates to the same file.
+
+def atomic_write(path, data, fsync=True):
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
     try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except: return []
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+    count_written(len(data))
+
+class WriteBehind:
+    WRITERS = 8   # files in a batch are independent: write (and fsync) them side by side
+    KEEP_FAILURES = 64   # recent batches whose failed writes a late waiter can still look up
+
+    def __init__(self, interval, fsync):
+        self.interval = interval
+        self.fsync = fsync
+        self.cond = threading.Condition()
+        self.pending = {}    # path -> bytes (latest wins)
+        self.inflight = {}   # batch being written right now
+        self.batch = 0       # id of the last batch taken by the flusher
+        self.flushed = 0     # id of the last batch fully written
+        self.failures = {}   # batch id -> {path: error} for batches with failed writes
+        self.flush_lock = Lock()
+        self.pool = None       # created on the first multi-file batch
+        self.timer = False     # flusher thread running in this process
+
+    def submit(self, path, data, wait):
+        with self.cond:
+            if self.interval and not self.timer:
+                threading.Thread(target=self._run, name='mcq-writer', daemon=True).start()
+                self.timer = True
+            self.pending[path] = data
+            target = self.batch + 1
+        if not wait: return
+        # Without a timer the caller commits itself; writers arriving meanwhile
+        # queue up behind flush_lock and go out together in the next batch
+        if not self.interval: self.flush()
+        with self.cond:
+            while self.flushed < target: self.cond.wait()
+            error = self.failures.get(target, {}).get(path)
+        # The caller was promised a durable write: never report a failed one as done
+        if error is not None: raise error
+
+    def peek(self, path):
+        with self.cond:
+            data = self.pending.get(path)
+            return data if data is not None else self.inflight.get(path)
+
+    def discard(self, path):
+        with self.cond:
+            self.pending.pop(path, None)
+
+    def flush(self):
+        with self.flush_lock:
+            with self.cond:
+                if not self.pending: return
+                self.inflight, self.pending = self.pending, {}
+                self.batch += 1
+                batch, items = self.batch, self.inflight
+            if len(items) > 1: errors = list(self._pool().map(self._write, items.items()))
+            else: errors = [self._write(item) for item in items.items()]
+            with self.cond:
+                self.inflight = {}
+                self.flushed = batch
+                failed = {path: e for path, e in zip(items, errors) if e is not None}
+                if failed: self.failures[batch] = failed
+                for old in [b for b in self.failures if b <= batch - self.KEEP_FAILURES]: del self.failures[old]
+                self.cond.notify_all()
+
+    def _write(self, item):
+        path, data = item
+        try: atomic_write(path, data, self.fsync)
+        except OSError as e:
+            log.exception('write-behind failed for %s', path)
+            return e
+
+    def _pool(self):
+        if self.pool is None: self.pool = ThreadPoolExecutor(self.WRITERS, thread_name_prefix='mcq-flush')
+        return self.pool
+
+    def after_fork(self):
+        # The parent's thread and pool are gone; its queued writes are its own to flush
+        self.cond = threading.Condition()
+        self.flush_lock = Lock()
+        self.pending, self.inflight = {}, {}
+        self.pool = None
+        self.timer = False
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+WRITER = None
+if DURABILITY == 'group': WRITER = WriteBehind(GROUP_COMMIT_MS / 1000, fsync=True)
+elif DURABILITY == 'async': WRITER = WriteBehind((GROUP_COMMIT_MS or 20) / 1000, fsync=False)
+if WRITER: atexit.register(WRITER.flush)
+
+def durable_write(path, data):
+    if WRITER: WRITER.submit(path, data, wait=DURABILITY == 'group')
+    else: atomic_write(path, data, fsync=DURABILITY == 'fsync')
+
+def fsync_enabled():
+    return DURABILITY != 'async'
+
+# --- Question Storage ---
+# 'json' keeps the bank in questions.json (default); 'sqlite' keeps it in
+# questions.db. Both expose the same small interface used by the bank cache
+# below: the store is only read in full, and exams are sampled from the
+# in-memory bank's per-subject id arrays, never by querying the store.
+# Import an existing questions.json with: python app.py migrate-sqlite
+
+class JsonQuestionStore:
+    def __init__(self, path):
+        self.path = path
+
+    def signature(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError: return None
+
+    def read_all(self):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        count_read(len(data))
+        try: return json.loads(data)
+        except ValueError:
+            # A crash during append() can leave a torn last entry; keep every complete one
+            end = data.rfind(b'\n  }')
+            if end < 0: raise
+            qs = json.loads(data[:end + 4] + b'\n]')
+            log.warning('%s: recovered %d questions from a truncated file', self.path, len(qs))
+            return qs
+
+    def write_all(self, qs):
+        atomic_write(self.path, json.dumps(qs, ensure_ascii=False, indent=2).encode('utf-8'), fsync_enabled())
+
+    def append(self, new_qs):
+        """Append in place before the closing bracket (no rewrite of existing entries)."""
+        with open(self.path, 'r+b') as f:
+            # Find the closing bracket of the top-level array and whatever precedes it
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            tail = b''
+            while pos > 0 and len(tail.strip()) < 2:
+                step = min(4096, pos)
+                pos -= step
+                f.seek(pos)
+                tail = f.read(step) + tail
+            body = tail.rstrip()
+            if not body.endswith(b']'): raise ValueError('questions.json is not a JSON array')
+            empty = body[:-1].rstrip().endswith(b'[')
+            f.seek(pos + len(body) - 1)
+            f.truncate()
+            chunk = ',\n'.join('  ' + json.dumps(q, ensure_ascii=False, indent=2).replace('\n', '\n  ') for q in new_qs)
+            data = (('\n' if empty else ',\n') + chunk + '\n]').encode('utf-8')
+            f.write(data)
+            if fsync_enabled():
+                f.flush()
+                os.fsync(f.fileno())
+        count_written(len(data))
+
+    def clear(self):
+        if os.path.exists(self.path): os.remove(self.path)
+
+class SQLiteQuestionStore:
+    SCHEMA = [
+        'CREATE TABLE IF NOT EXISTS questions (id INTEGER PRIMARY KEY, question TEXT NOT NULL, '
+        'options TEXT NOT NULL, answer INTEGER NOT NULL, subject TEXT NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS questions_subject ON questions (subject)',
+        'CREATE TABLE IF NOT EXISTS question_tags (qid INTEGER NOT NULL, tag TEXT NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS question_tags_qid ON question_tags (qid)',
+        'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)',
+        "INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)",
+    ]
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlitedb.LocalConnection(path, self.SCHEMA)
+
+    def signature(self):
+        # Bumped by every write, so other processes notice changes cheaply
+        return self._conn().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def read_all(self):
+        db = self._conn()
+        tags = {}
+        for qid, tag in db.execute('SELECT qid, tag FROM question_tags ORDER BY rowid'):
+            tags.setdefault(qid, []).append(tag)
+        qs = []
+        for qid, text, options, ans, subject in db.execute('SELECT id, question, options, answer, subject FROM questions ORDER BY id'):
+            q = {'question': text, 'options': json.loads(options), 'answer': ans, 'subject': subject, 'id': qid}
+            if qid in tags: q['tags'] = tags[qid]
+            qs.append(q)
+        return qs
+
+    def _insert(self, db, qs):
+        db.executemany('INSERT INTO questions (id, question, options, answer, subject) VALUES (?, ?, ?, ?, ?)',
+                       [(q['id'], q['question'], json.dumps(q['options'], ensure_ascii=False), q['answer'],
+                         q.get('subject', 'General')) for q in qs])
+        db.executemany('INSERT INTO question_tags (qid, tag) VALUES (?, ?)',
+                       [(q['id'], tag) for q in qs for tag in q.get('tags', [])])
+        db.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def write_all(self, qs):
+        with self._conn() as db:
+            db.execute('DELETE FROM questions')
+            db.execute('DELETE FROM question_tags')
+            self._insert(db, qs)
+
+    def append(self, new_qs):
+        with self._conn() as db:
+            self._insert(db, new_qs)
+
+    def clear(self):
+        self.write_all([])
+
+def create_question_store(backend):
+    if backend == 'json': return JsonQuestionStore(DATA_FILE)
+    if backend == 'sqlite': return SQLiteQuestionStore(QUESTIONS_DB)
+    raise ValueError(f'Unknown question store: {backend}')
+
+STORE = create_question_store(QUESTION_STORE)
+
+# --- Question Bank (in-memory cache) ---
+# The store is read once per process and only re-read when its signature
+# changes (file mtime/size, or the SQLite version counter), e.g. after a write
+# by another process. Every question carries a stable integer 'id'; sessions
+# reference questions by id only.
+#
+# Questions are held in a columnar QuestionTable (see questiontable.py), not
+# as a list of dicts: bank.get() decodes one question on demand, ids and
+# by_subject are int64 arrays. With MCQ_SNAPSHOT=1 the table is the mapped
+# questions.snap (see snapshot.py), rebuilt whenever the store is read or
+# rewritten and reused as is on start-up while its recorded store signature
+# still matches. Appends publish a new snapshot.
+#
+# Under 'serve' the bank is loaded once in the master before the workers fork.
+# Neither table layout has per-question Python objects, so no refcount or GC
+# pass dirties the pages and the workers keep sharing them. A reload after a
+# write is an atomic rename of questions.snap plus a re-map in each worker on
+# its next request; only one worker rebuilds a stale snapshot.
+
+class QuestionBank:
+    def __init__(self, store, snapshot_path=None):
+        self.store = store
+        self.lock = Lock()
+        self.signature = None
+        self.text_index = search.SearchIndex()
+        self.text_indexed = False   # built on the first search, then kept in step
+        self.unnumbered = False     # the store has entries without an id (numbered in memory only)
+        self.use_snapshot(snapshot_path)
+        self._use(QuestionTable())
+
+    def use_snapshot(self, path):
+        self.snapshot_path = path
+        self.snapshot_lock = os.path.join(os.path.dirname(path), '.snapshot.lock') if path else None
+        self.snapshot_owner = None   # thread holding the snapshot lock in this process
+        self.signature = None   # reload (and publish) on the next refresh
+
+    # A new bank is installed by swapping self.table alone, so a request never
+    # sees the ids of one table with the questions of another
+    @property
+    def questions(self):   # reads like the list of dicts it replaces
+        return self.table
+
+    @property
+    def ids(self):
+        return self.table.ids
+
+    @property
+    def by_subject(self):
+        return self.table.by_subject
+
+    @property
+    def max_id(self):
+        return self.table.max_id
+
+    def _use(self, table):
+        self.subjects = sorted(table.by_subject)
+        self.table = table
+
+    def _install(self, table, signature):
+        old = self.table
+        self._use(table)
+        self.signature = signature
+        self.unnumbered = False
+        if not self.text_indexed: return
+        # Another process appended: index only the new rows. Anything else
+        # (write_all, replace) re-checks every question
+        if table.extends(old): self.text_index.add(table[len(old):])
+        else: self.text_index.sync(table)
+
+    @contextmanager
+    def _snapshot_locked(self, wait=True):
+        """Serialises snapshot rebuilds across worker processes (re-entrant in
+        the holding thread). Yields False if wait is off and the lock is taken."""
+        if not self.snapshot_path or fcntl is None or self.snapshot_owner == threading.get_ident():
+            yield True
+            return
+        with open(self.snapshot_lock, 'a') as f:
+            try: fcntl.flock(f, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            self.snapshot_owner = threading.get_ident()
+            try: yield True
+            finally:
+                self.snapshot_owner = None
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @contextmanager
+    def bulk(self):
+        """Appends made inside (an import) go to one writable in-memory table and
+        the snapshot is published once at the end; meanwhile other processes
+        keep serving the bank they have."""
+        with self._snapshot_locked():
+            try: yield
+            finally:
+                with self.lock:
+                    if self.snapshot_path and not self.table.readonly and self.signature == self.store.signature():
+                        self._install(self._publish(self.table, self.signature), self.signature)
+
+    def _publish(self, table, signature):
+        """Write the table as the snapshot and map it (caller holds the snapshot lock)."""
+        try:
+            snapshot.write(self.snapshot_path, table, signature)
+            return snapshot.Snapshot(self.snapshot_path)
+        except OSError:   # e.g. the file is mapped by another process on Windows
+            log.exception('could not write %s; serving the bank from memory', self.snapshot_path)
+            return table
+
+    def _set(self, qs, signature, publish=True):
+        numbered = all(isinstance(q.get('id'), int) for q in qs)
+        table = QuestionTable.from_questions(assign_ids(qs))
+        # Ids given to id-less entries only last until append_questions writes
+        # them out, so such a store is never snapshotted: every process reads it
+        if publish and self.snapshot_path and signature is not None and numbered: table = self._publish(table, signature)
+        self._install(table, signature)
+        self.unnumbered = not numbered
+
+    def _open_snapshot(self, signature):
+        try: snap = snapshot.Snapshot(self.snapshot_path)
+        except (OSError, ValueError): return None
+        return snap if snap.matches(signature) else None
+
+    @timed('load_questions')   # a full read of the store (get_bank times the revalidation)
+    def _load(self, sig, publish=True):
+        qs = []
+        if sig is not None:
+            try: qs = self.store.read_all()
+            except (OSError, ValueError, sqlite3.Error):
+                # Never present an empty bank because of a bad read: keep serving the last good one
+                log.exception('could not load questions from %s', getattr(self.store, 'path', self.store))
+                if self.signature is None and not len(self.table): raise
+                return self
+        self._set(qs, sig, publish)
+        return self
+
+    def refresh(self, stale_ok=True):
+        """Bring the bank up to date with the store. While another process
+        holds the snapshot lock (rebuilding, or importing) the current bank is
+        kept if stale_ok, else the store is read without publishing."""
+        sig = self.store.signature()
+        if sig == self.signature: return self
+        with self.lock:
+            sig = self.store.signature()
+            if sig == self.signature: return self
+            if sig is None or not self.snapshot_path: return self._load(sig)
+            snap = self._open_snapshot(sig)
+            if snap is None:
+                # One process re-reads the store and publishes; the others map its snapshot
+                with self._snapshot_locked(wait=False) as locked:
+                    if not locked: return self if stale_ok and self.signature is not None else self._load(sig, False)
+                    snap = self._open_snapshot(sig)
+                    if snap is None: return self._load(sig)
+            self._install(snap, sig)
+        return self
+
+    # Writers never wait for the snapshot lock (an import in another process
+    # holds it between chunks and needs the questions lock they hold): if it
+    # is taken they skip publishing, and the next refresh rebuilds the snapshot
+
+    def replace(self, qs):
+        with self.lock, self._snapshot_locked(wait=False) as locked:
+            self._set(qs, self.store.signature(), locked)
+
+    def extend(self, qs):
+        # Incremental update after an append; ids must already be assigned.
+        # A mapped snapshot is read-only: append to an in-memory copy and
+        # publish that, so other workers map it instead of re-reading the store
+        # (inside bulk() the copy is kept and published once, at the end)
+        with self.lock:
+            table = self.table.copy() if self.table.readonly else self.table
+            table.append(qs)
+            signature = self.store.signature()
+            if self.snapshot_path and self.snapshot_owner != threading.get_ident():
+                with self._snapshot_locked(wait=False) as locked:
+                    if locked: table = self._publish(table, signature)
+            self._use(table)
+            if self.text_indexed: self.text_index.add(qs)
+            self.signature = signature
+
+    def get(self, qid):
+        return self.table.get(qid)
+
+    def answer(self, qid):
+        return self.table.answer(qid)
+
+    def ids_for(self, subject):
+        if subject == 'all': return self.ids
+        return self.by_subject.get(subject, ())
+
+    def search(self, query, limit=10, offset=0):
+        if not self.text_indexed:
+            with self.lock:
+                if not self.text_indexed:
+                    self.text_index.sync(self.table)
+                    self.text_indexed = True
+        return self.text_index.search(query, limit, offset)
+
+BANK = QuestionBank(STORE, SNAPSHOT_FILE if SNAPSHOT_MODE == '1' else None)
+
+@timed('get_bank')
+def get_bank():
+    return BANK.refresh()
+
+# --- Session Store ---
+# Exam state is keyed by a random per-browser id kept in the Flask cookie, so
+# concurrent candidates never share (or overwrite) each other's session.
+
+SID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+def new_session_id():
+    return secrets.token_hex(16)
+
+class MemorySessionStore:
+    """LRU with TTL, sharded so concurrent requests rarely wait on the same lock."""
+    SHARDS = 16
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.per_shard = max(1, max_entries // self.SHARDS)
+        self.shards = [(Lock(), OrderedDict()) for _ in range(self.SHARDS)]
+
+    def _shard(self, sid):
+        return self.shards[int(sid[:4], 16) % self.SHARDS]
+
+    def get(self, sid):
+        lock, entries = self._shard(sid)
+        with lock:
+            item = entries.get(sid)
+            if item is None: return None
+            if item[0] < time.time():
+                del entries[sid]
+                return None
+            entries.move_to_end(sid)
+            blob = item[1]
+        return json.loads(blob)
+
+    def put(self, sid, data):
+        blob = json.dumps(data)
+        lock, entries = self._shard(sid)
+        with lock:
+            entries[sid] = (time.time() + self.ttl, blob)
+            entries.move_to_end(sid)
+            while len(entries) > self.per_shard:
+                entries.popitem(last=False)
+
+    def put_many(self, items):
+        for sid, data in items: self.put(sid, data)
+
+    def delete(self, sid):
+        lock, entries = self._shard(sid)
+        with lock: entries.pop(sid, None)
+
+    def clear(self):
+        for lock, entries in self.shards:
+            with lock: entries.clear()
+
+class FileSessionStore:
+    """One small JSON file per session; expired files are pruned on write."""
+    PRUNE_EVERY = 200
+
+    def __init__(self, directory, ttl):
+        self.dir = directory
+        self.ttl = ttl
+        self.writes = 0
+        os.makedirs(self.dir, exist_ok=True)
+
+    def _path(self, sid):
+        return os.path.join(self.dir, sid + '.json')
+
+    def get(self, sid):
+        path = self._path(sid)
+        data = WRITER.peek(path) if WRITER else None
+        if data is not None: return json.loads(data)
+        try:
+            if os.path.getmtime(path) + self.ttl < time.time(): return None
+            with open(path, 'rb') as f:
+                data = f.read()
+            count_read(len(data))
+            return json.loads(data)
+        except (OSError, ValueError): return None
+
+    def put(self, sid, data):
+        durable_write(self._path(sid), json.dumps(data).encode('utf-8'))
+        self.writes += 1
+        if self.writes % self.PRUNE_EVERY == 0: self.prune()
+
+    def put_many(self, items):
+        if not WRITER:
+            for sid, data in items: durable_write(self._path(sid), json.dumps(data).encode('utf-8'))
+            return
+        for sid, data in items: WRITER.submit(self._path(sid), json.dumps(data).encode('utf-8'), wait=False)
+        WRITER.flush()   # one batch for the whole set
+
+    def delete(self, sid):
+        if WRITER: WRITER.discard(self._path(sid))
+        try: os.remove(self._path(sid))
+        except OSError: pass
+
+    def prune(self):
+        cutoff = time.time() - self.ttl
+        for entry in os.scandir(self.dir):
+            try:
+                if entry.stat().st_mtime < cutoff: os.remove(entry.path)
+            except OSError: pass
+
+    def clear(self):
+        if WRITER: WRITER.flush()
+        for entry in os.scandir(self.dir):
+            try: os.remove(entry.path)
+            except OSError: pass
+
+class SQLiteSessionStore:
+    """Durable store; WAL lets many readers proceed while one writer commits."""
+    PRUNE_EVERY = 200
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self.writes = 0
+        self._conn = sqlitedb.LocalConnection(path, [
+            'CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL)',
+            'CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)',
+        ])
+
+    def get(self, sid):
+        row = self._conn().execute('SELECT data FROM sessions WHERE sid = ? AND expires >= ?', (sid, time.time())).fetchone()
+        if not row: return None
+        count_read(len(row[0]))
+        return json.loads(row[0])
+
+    def put(self, sid, data):
+        blob = json.dumps(data)
+        with self._conn() as db:
+            db.execute('INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)',
+                       (sid, blob, time.time() + self.ttl))
+        count_written(len(blob))
+        self.writes += 1
+        if self.writes % self.PRUNE_EVERY == 0: self.prune()
+
+    def put_many(self, items):
+        expires = time.time() + self.ttl
+        rows = [(sid, json.dumps(data), expires) for sid, data in items]
+        with self._conn() as db:   # one transaction
+            db.executemany('INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)', rows)
+        count_written(sum(len(r[1]) for r in rows))
+
+    def delete(self, sid):
+        with self._conn() as db:
+            db.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def prune(self):
+        with self._conn() as db:
+            db.execute('DELETE FROM sessions WHERE expires < ?', (time.time(),))
+
+    def clear(self):
+        with self._conn() as db:
+            db.execute('DELETE FROM sessions')
+
+def create_session_store(backend):
+    if backend == 'memory': return MemorySessionStore(SESSION_TTL, SESSION_MAX)
+    if backend == 'sqlite': return SQLiteSessionStore(SESSION_DB, SESSION_TTL)
+    if backend == 'file': return FileSessionStore(SESSION_DIR, SESSION_TTL)
+    raise ValueError(f'Unknown session backend: {backend}')
+
+SESSIONS = create_session_store(SESSION_BACKEND)
+
+def current_session_id(create=False):
+    sid = session.get('sid')
+    if not (sid and SID_RE.match(sid)):
+        if not create: return None
+        sid = session['sid'] = new_session_id()
+    return sid
+
+# --- Leaderboard ---
+# Every finished session is appended to scores.jsonl (full history). Top-N
+# heaps per board are kept in memory and fed by tailing the log, so records
+# appended by other processes show up too and / never re-reads the file.
+
+def board_keys(record):
+    keys = ['all']
+    if record.get('subject'): keys.append('subject:' + record['subject'])
+    if record.get('difficulty'): keys.append('difficulty:' + record['difficulty'])
+    return keys
+
+class Leaderboard:
+    def __init__(self, path, legacy_path=None, size=20):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.size = size
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        self.boards = {}   # key -> min-heap of (score, accuracy, -seq, record)
+        self.offset = 0
+        self.seq = 0
+
+    def _add(self, record):
+        self.seq += 1
+        entry = (record.get('score', 0), record.get('accuracy', 0), -self.seq, record)
+        for key in board_keys(record):
+            heap = self.boards.setdefault(key, [])
+            if len(heap) < self.size: heapq.heappush(heap, entry)
+            elif entry > heap[0]: heapq.heapreplace(heap, entry)
+
+    def _migrate_legacy(self):
+        if os.path.exists(self.path) or not (self.legacy_path and os.path.exists(self.legacy_path)): return
+        try:
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                old = json.load(f)
+        except (OSError, ValueError): return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for record in old: f.write(json.dumps(record) + '\n')
+
+    def refresh(self):
+        with self.lock:
+            if self.offset == 0: self._migrate_legacy()
+            try: size = os.path.getsize(self.path)
+            except OSError: size = 0
+            if size < self.offset: self.reset()   # log was truncated/removed
+            if size == self.offset: return self
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                chunk = f.read(size - self.offset)
+            count_read(len(chunk))
+            end = chunk.rfind(b'\n') + 1   # leave a half-written last line for next time
+            for line in chunk[:end].splitlines():
+                try: self._add(json.loads(line))
+                except ValueError: continue
+            self.offset += end
+        return self
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        """Append records with one write and one fsync (group commit)."""
+        data = ''.join(json.dumps(record) + '\n' for record in records).encode('utf-8')
+        self.refresh()   # migrates the legacy file before the log is first created
+        with self.lock:
+            with open(self.path, 'ab') as f:
+                f.write(data)
+                if fsync_enabled():
+                    f.flush()
+                    os.fsync(f.fileno())
+        count_written(len(data))
+        self.refresh()
+
+    def top(self, key='all', n=10):
+        self.refresh()
+        return [e[3] for e in heapq.nlargest(n, self.boards.get(key, []))]
+
+    def clear(self):
+        with self.lock:
+            for path in (self.path, self.legacy_path):
+                if path and os.path.exists(path): os.remove(path)
+            self.reset()
+
+LEADERBOARD = Leaderboard(SCORES_LOG, SCORES_FILE)
+
+# --- Item Statistics ---
+# Per-question item analysis kept as running sums in item_stats.db, so the
+# admin view never has to scan old sessions:
+# - option_counts: how often each option was picked (0 = blank / timed out)
+# - items: responses and correct answers, plus for finished exams the sums of
+#   the candidates' total scores needed for the point-biserial correlation
+# Answers are buffered in memory and written in small batches as UPSERT
+# increments, so several worker processes can share the file. A timer thread
+# writes out what an idle worker still holds, and the buffer is flushed when
+# the process (or gunicorn worker) exits.
+
+class ItemStats:
+    FLUSH_EVERY = 200      # buffered updates
+    FLUSH_SECONDS = 2.0
+    COLUMNS = ('responses', 'correct', 'scored', 'scored_correct', 'sum_total', 'sum_total_sq', 'sum_total_correct')
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = Lock()
+        self.auto_flush = True   # False: the owner calls flush() (asgi.py does, off the event loop)
+        self.timer = False   # flusher thread running in this process
+        self.reset()
+        self._conn = sqlitedb.LocalConnection(path, [
+            'CREATE TABLE IF NOT EXISTS option_counts (qid INTEGER NOT NULL, option INTEGER NOT NULL, '
+            'n INTEGER NOT NULL, PRIMARY KEY (qid, option))',
+            'CREATE TABLE IF NOT EXISTS items (qid INTEGER PRIMARY KEY, '
+            + ', '.join(f'{c} REAL NOT NULL DEFAULT 0' for c in self.COLUMNS) + ')',
+        ])
+
+    def reset(self):
+        self.options = {}   # (qid, option) -> count
+        self.items = {}     # qid -> deltas in COLUMNS order
+        self.pending = 0
+        self.last_flush = time.time()
+
+    def _item(self, qid):
+        row = self.items.get(qid)
+        if row is None: row = self.items[qid] = [0] * len(self.COLUMNS)
+        return row
+
+    def record(self, qid, option, is_correct):
+        """One graded answer (O(1); option in bank numbering, 0 = none)."""
+        with self.lock:
+            key = (qid, option)
+            self.options[key] = self.options.get(key, 0) + 1
+            row = self._item(qid)
+            row[0] += 1
+            if is_correct: row[1] += 1
+            self.pending += 1
+        self._maybe_flush()
+
+    def record_exam(self, results, total):
+        """A finished exam: (qid, is_correct) pairs and the candidate's total."""
+        with self.lock:
+            for qid, is_correct in results:
+                row = self._item(qid)
+                row[2] += 1
+                row[4] += total
+                row[5] += total * total
+                if is_correct:
+                    row[3] += 1
+                    row[6] += total
+                self.pending += 1
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if not self.auto_flush: return
+        if not self.timer:
+            with self.lock:
+                if not self.timer:
+                    threading.Thread(target=self._run, name='mcq-item-stats', daemon=True).start()
+                    self.timer = True
+        if self.due(): self.flush()
+
+    def _run(self):
+        while True:
+            time.sleep(self.FLUSH_SECONDS)
+            if self.auto_flush and self.due(): self.flush()
+
+    def after_fork(self):
+        # Buffered counts are the parent's to write; a child would count them again
+        self.lock = Lock()
+        self.timer = False
+        self.reset()
+
+    def due(self):
+        return self.pending >= self.FLUSH_EVERY or time.time() - self.last_flush >= self.FLUSH_SECONDS
+
+    def flush(self):
+        with self.lock:
+            if not self.pending: return
+            options, items = self.options, self.items
+            self.reset()
+        cols = ', '.join(self.COLUMNS)
+        updates = ', '.join(f'{c} = {c} + excluded.{c}' for c in self.COLUMNS)
+        try:
+            with self._conn() as db:
+                db.executemany('INSERT INTO option_counts (qid, option, n) VALUES (?, ?, ?) '
+                               'ON CONFLICT (qid, option) DO UPDATE SET n = n + excluded.n',
+                               [(qid, option, n) for (qid, option), n in options.items()])
+                db.executemany(f'INSERT INTO items (qid, {cols}) VALUES (?{", ?" * len(self.COLUMNS)}) '
+                               f'ON CONFLICT (qid) DO UPDATE SET {updates}',
+                               [(qid, *row) for qid, row in items.items()])
+        except sqlite3.Error: log.exception('item statistics flush failed')
+
+    def difficulties(self):
+        """qid -> (responses, correct) for every question with answers."""
+        self.flush()
+        return {qid: (int(n), int(c)) for qid, n, c in self._conn().execute('SELECT qid, responses, correct FROM items')}
+
+    def report(self):
+        """Per-question p-value, point-biserial discrimination and option shares."""
+        self.flush()
+        db = self._conn()
+        options = {}
+        for qid, option, n in db.execute('SELECT qid, option, n FROM option_counts'):
+            options.setdefault(qid, {})[option] = n
+        rows = []
+        for qid, *values in db.execute(f'SELECT qid, {", ".join(self.COLUMNS)} FROM items ORDER BY responses DESC, qid'):
+            stats = dict(zip(self.COLUMNS, values))
+            rows.append({
+                'id': qid,
+                'responses': int(stats['responses']),
+                'p_value': stats['correct'] / stats['responses'] if stats['responses'] else None,
+                'discrimination': point_biserial(stats),
+                'scored': int(stats['scored']),
+                'options': options.get(qid, {})
+            })
+        return rows
+
+    def clear(self):
+        with self.lock: self.reset()
+        with self._conn() as db:
+            db.execute('DELETE FROM option_counts')
+            db.execute('DELETE FROM items')
+
+def point_biserial(stats):
+    n, n1 = stats['scored'], stats['scored_correct']
+    if n < 2 or n1 == 0 or n1 == n: return None
+    mean = stats['sum_total'] / n
+    var = stats['sum_total_sq'] / n - mean * mean
+    if var <= 1e-12: return None
+    m1 = stats['sum_total_correct'] / n1
+    m0 = (stats['sum_total'] - stats['sum_total_correct']) / (n - n1)
+    p = n1 / n
+    return (m1 - m0) / var ** 0.5 * (p * (1 - p)) ** 0.5
+
+ITEM_STATS = ItemStats(ITEM_STATS_DB)
+atexit.register(ITEM_STATS.flush)
+
+def flush_buffers():
+    """Write out buffered item statistics and session writes (process exit)."""
+    ITEM_STATS.flush()
+    if WRITER: WRITER.flush()
+
+# --- Data Helpers ---
 
 def save_questions(qs):
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(qs, f, ensure_ascii=False, indent=2)
+    assign_ids(qs)
+    with file_lock(QUESTIONS_LOCK):
+        STORE.write_all(qs)
+        BANK.replace(list(qs))
+    if FINGERPRINTS.count(): FINGERPRINTS.sync(qs)   # otherwise built on the next import
+
+def append_questions(new_qs):
+    with file_lock(QUESTIONS_LOCK):
+        bank = BANK.refresh(stale_ok=False)   # pick up appends made by other workers before numbering
+        if bank.unnumbered:
+            # Write the ids out once: the next read would number id-less entries
+            # after the appended ones, and every existing question would change id
+            qs = list(bank.questions)
+            STORE.write_all(qs)
+            BANK.replace(qs)
+        next_id = bank.max_id + 1
+        for q in new_qs:
+            q['id'] = next_id
+            next_id += 1
+        try:
+            STORE.append(new_qs)
+        except (OSError, ValueError):
+            assign_ids(new_qs)
+            qs = list(bank.questions) + new_qs
+            STORE.write_all(qs)
+            BANK.replace(qs)
+            return
+        BANK.extend(new_qs)
+
+def migrate_to_sqlite(json_path=DATA_FILE, db_path=QUESTIONS_DB):
+    """One-shot import of questions.json into questions.db (replaces its contents)."""
+    qs = assign_ids(JsonQuestionStore(json_path).read_all())
+    SQLiteQuestionStore(db_path).write_all(qs)
+    return len(qs)
+
+# --- Exam Sampling ---
+# An exam is fully described by (subject, limit, seed, pool_size): the ids are
+# drawn with random.sample over positions of the subject's id index, which is
+# O(k) and deterministic. Ids are append-only, so the first pool_size entries
+# of an index never change and the exam can be regenerated instead of stored.
+
+def new_seed():
+    return secrets.randbits(48)
+
+def sample_exam(subject, k, seed, pool_size=None):
+    pool = get_bank().ids_for(subject)
+    n = len(pool) if pool_size is None else min(pool_size, len(pool))
+    rng = random.Random(seed)
+    return [pool[i] for i in rng.sample(range(n), min(k, n))]
+
+TIMERS = {'easy': 60, 'medium': 30, 'hard': 15}
+
+def new_exam(user_name, subject, difficulty, mode, limit, seed=None, pool_size=None, shuffle_options=False):
+    """Session record for a fresh exam, or None if the subject has no questions."""
+    if pool_size is None: pool_size = len(get_bank().ids_for(subject))
+    if not pool_size: return None
+    sess = {
+        'user_name': user_name,
+        'seed': new_seed() if seed is None else seed,
+        'pool_size': pool_size,
+        'limit': min(max(limit, 1), pool_size),
+        'shuffle_options': shuffle_options,
+        'pos': 0,
+        'score': 0,
+        'correct': 0,
+        'attempted': 0,
+        'difficulty': difficulty,
+        'mode': mode,
+        'timer': TIMERS.get(difficulty, 30),
+        'start_time': time.time(),
+        'subject': subject,
+        'answers': [],   # chosen option per answered question (bank numbering), 0 = none
+        'timeouts': []   # positions that were auto-submitted by the timer
+    }
+    if mode == 'adaptive':
+        sess['max_questions'] = sess['limit']
+        start_adaptive(sess)
+    return sess
+
+def exam_request(form):
+    """new_exam() arguments from the start form (or a JSON body)."""
+    try: limit = int(form.get('num_questions'))
+    except (TypeError, ValueError): limit = 10
+    try: seed = int(form.get('seed'))   # optional: regenerate a known exam
+    except (TypeError, ValueError): seed = None
+    return {'user_name': form.get('user_name'), 'subject': form.get('subject'), 'difficulty': form.get('difficulty'),
+            'mode': form.get('mode'), 'limit': limit, 'seed': seed}
+
+def option_order(sess, qid, n=4):
+    order = list(range(n))
+    if sess.get('shuffle_options'): random.Random(f"{sess['seed']}:{qid}").shuffle(order)
+    return order
+
+def present_question(q, order):
+    """The question as the candidate sees it: options in display order, answer as a display index."""
+    return {
+        'id': q['id'],
+        'question': q['question'],
+        'options': [q['options'][i] for i in order],
+        'answer': order.index(q['answer'] - 1) + 1 if 1 <= q['answer'] <= len(order) else q['answer'],
+        'subject': q.get('subject', 'General')
+    }
 
+def question_payload(sess, qid, pos):
+    """JSON-safe question for the client; the answer is only revealed in practice mode."""
+    q = get_bank().get(qid)
+    if not q: return None
+    shown = present_question(q, option_order(sess, qid, len(q['options'])))
+    payload = {'pos': pos, 'question': shown['question'], 'options': shown['options']}
+    if sess.get('mode') == 'practice': payload['answer'] = shown['answer']
+    return payload
+
+def record_answer(sess, qid, choice_str, is_timeout):
+    """Grade the current question and advance the session (caller saves it)."""
+    question = get_bank().get(qid)
+    if not question: return None
+    correct_ans = question['answer']
+    
+    # The client posts the displayed position; store the bank's option number
+    order = option_order(sess, question['id'], len(question['options']))
+    try: user_choice = order[int(choice_str) - 1] + 1 if choice_str else None
+    except (ValueError, IndexError): user_choice = None
+    is_correct, delta = grading.grade_answer(correct_ans, user_choice, is_timeout, sess['difficulty'])
+    
+    # Update Stats
+    sess['attempted'] += 1
+    sess['score'] += delta
+    if is_correct: sess['correct'] += 1
+    ITEM_STATS.record(qid, 0 if is_timeout else user_choice or 0, is_correct)
+    
+    # Save Review (resolved against the bank in review())
+    sess['answers'].append(user_choice or 0)
+    if is_timeout: sess['timeouts'].append(sess['pos'])
+    
+    # Move Next (Always, for both modes now)
+    sess['pos'] += 1
+    if sess.get('mode') == 'adaptive': advance_adaptive(sess, qid, is_correct)
+    return {
+        'is_correct': is_correct,
+        'is_timeout': is_timeout,
+        'correct_choice': order.index(correct_ans - 1) + 1 if 0 < correct_ans <= len(order) else correct_ans,
+        'correct_text': question['options'][correct_ans - 1] if 0 < correct_ans <= len(question['options']) else None,
+        'score': sess['score']
+    }
+
+def session_question_ids(sess):
+    if 'qids' in sess: return list(sess['qids'])   # adaptive: chosen as the exam goes
+    qids = sample_exam(sess['subject'], sess['limit'], sess['seed'], sess['pool_size'])
+    if sess.get('round'):   # restarted: same questions, new order
+        random.Random(f"{sess['seed']}:{sess['round']}").shuffle(qids)
+    return qids
+
+# --- Adaptive Selection ---
+# Adaptive exams pick each next question near the candidate's running ability
+# estimate (Elo/Rasch style: P(correct) = 1 / (1 + e^(b - ability))). Item
+# difficulty b comes from the item statistics (smoothed p-value) and is kept
+# in a per-subject list sorted by b, so the next item is a bisect plus a short
+# walk past already-used items. The exam stops at the question limit or once
+# the ability estimate is precise enough.
+
+ADAPTIVE_MIN = 5          # never stop before this many questions
+ADAPTIVE_SE = 0.6         # stop once the ability's standard error is below this
+ADAPTIVE_REFRESH = 300    # seconds between re-reads of item difficulties
+
+def item_difficulty(responses, correct):
+    p = (correct + 1) / (responses + 2)   # unseen items sit in the middle (b = 0)
+    return math.log((1 - p) / p)
+
+class DifficultyIndex:
+    def __init__(self):
+        self.lock = Lock()
+        self.signature = None
+        self.built = 0
+        self.difficulty = {}
+        self.subjects = {}   # subject -> (sorted difficulties, question ids in the same order)
+
+    def _index(self, subject):
+        bank = get_bank()
+        sig = (bank.signature, len(bank.ids))
+        with self.lock:
+            if sig != self.signature or time.time() - self.built > ADAPTIVE_REFRESH:
+                self.difficulty = {qid: item_difficulty(n, c) for qid, (n, c) in ITEM_STATS.difficulties().items()}
+                self.subjects = {}
+                self.signature, self.built = sig, time.time()
+            index = self.subjects.get(subject)
+            if index is None:
+                pairs = sorted((self.difficulty.get(qid, 0.0), qid) for qid in bank.ids_for(subject))
+                index = self.subjects[subject] = ([b for b, _ in pairs], [qid for _, qid in pairs])
+            return index
+
+    def get(self, qid):
+        return self.difficulty.get(qid, 0.0)
+
+    def nearest(self, subject, ability, used):
+        """Unused question whose difficulty is closest to `ability`, or None."""
+        keys, qids = self._index(subject)
+        hi = bisect.bisect_left(keys, ability)
+        lo = hi - 1
+        while lo >= 0 or hi < len(keys):
+            if hi >= len(keys) or (lo >= 0 and ability - keys[lo] <= keys[hi] - ability):
+                if qids[lo] not in used: return qids[lo]
+                lo -= 1
+            else:
+                if qids[hi] not in used: return qids[hi]
+                hi += 1
+        return None
+
+DIFFICULTY = DifficultyIndex()
+
+def start_adaptive(sess):
+    sess['ability'] = 0.0
+    sess['information'] = 0.0
+    first = DIFFICULTY.nearest(sess['subject'], 0.0, ())
+    sess['qids'] = [first] if first is not None else []
+
+def advance_adaptive(sess, qid, is_correct):
+    """Update the ability estimate and queue the next question (or stop)."""
+    b = DIFFICULTY.get(qid)
+    expected = 1 / (1 + math.exp(b - sess['ability']))
+    n = len(sess['answers'])
+    sess['ability'] += 1.6 / math.sqrt(n + 1) * ((1 if is_correct else 0) - expected)
+    sess['information'] += expected * (1 - expected)
+    se = 1 / math.sqrt(sess['information']) if sess['information'] else float('inf')
+    nxt = None
+    if n < sess['limit'] and not (n >= ADAPTIVE_MIN and se < ADAPTIVE_SE):
+        nxt = DIFFICULTY.nearest(sess['subject'], sess['ability'], set(sess['qids']))
+    if nxt is None: sess['limit'] = n   # finished: the exam is as long as what was asked
+    else: sess['qids'].append(nxt)
+
+@timed('get_session_data')
 def get_session_data():
-    if not os.path.exists(SESSION_FILE): return None
-    try:
-        with open(SESSION_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except: return None
+    sid = current_session_id()
+    return SESSIONS.get(sid) if sid else None
 
+@timed('save_session_data')
 def save_session_data(data):
-    with open(SESSION_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f)
+    SESSIONS.put(current_session_id(create=True), data)
 
-def load_scores():
-    if not os.path.exists(SCORES_FILE): return []
-    try:
-        with open(SCORES_FILE, 'r', encoding='utf-8') as f:
-            return sorted(json.load(f), key=lambda x: x['score'], reverse=True)[:10]
-    except: return []
+def load_scores(board='all'):
+    return LEADERBOARD.top(board)
 
+@timed('save_score')
 def save_score(record):
-    scores = load_scores()
-    scores.append(record)
-    scores.sort(key=lambda x: (x['score'], x['accuracy']), reverse=True)
-    with open(SCORES_FILE, 'w', encoding='utf-8') as f:
-        json.dump(scores[:20], f) 
-
-def reset_session_file():
-    if os.path.exists(SESSION_FILE): os.remove(SESSION_FILE)
+    LEADERBOARD.append(record)
+
+def grade_session(sess):
+    """Final totals for a session, recomputed from its answer sheet."""
+    bank = get_bank()
+    qids = session_question_ids(sess)[:len(sess['answers'])]
+    key = [bank.answer(qid) or 0 for qid in qids]
+    timeouts = set(sess['timeouts'])
+    result = grading.grade_sheets(key, [sess['answers']], sess['difficulty'],
+                                  [[pos in timeouts for pos in range(len(qids))]], sess['limit'])
+    return {name: values[0] for name, values in result.items()}
+
+def record_item_stats(sess, graded):
+    """Feed a finished exam into the discrimination sums (once per round).
+    True if it did; the caller saves the session."""
+    if sess.get('stats_recorded'): return False
+    bank = get_bank()
+    timeouts = set(sess['timeouts'])
+    results = []
+    for pos, (qid, choice) in enumerate(zip(session_question_ids(sess), sess['answers'])):
+        ans = bank.answer(qid)
+        if ans is not None: results.append((qid, choice == ans and pos not in timeouts))
+    ITEM_STATS.record_exam(results, graded['correct'])
+    sess['stats_recorded'] = True
+    return True
+
+def finish_exam(sess, user_name):
+    """Totals, leaderboard record and whether the session changed (and must be saved)."""
+    graded = grade_session(sess)
+    changed = bool(sess['answers']) and record_item_stats(sess, graded)
+    record = {
+        'name': user_name,
+        'score': graded['score'],
+        'accuracy': graded['accuracy'],
+        'subject': sess.get('subject'),
+        'difficulty': sess.get('difficulty'),
+        'date': datetime.now().strftime("%Y-%m-%d %H:%M")
+    }
+    return graded, record, changed
+
+def build_reviews(sess):
+    bank = get_bank()
+    timeouts = set(sess['timeouts'])
+    reviews = []
+    for pos, (qid, choice) in enumerate(zip(session_question_ids(sess), sess['answers'])):
+        q = bank.get(qid)
+        if not q: continue
+        is_timeout = pos in timeouts
+        reviews.append({
+            'question': q['question'],
+            'options': q['options'],
+            'user_choice': choice or None,
+            'correct_choice': q['answer'],
+            'is_correct': choice == q['answer'] and not is_timeout,
+            'is_timeout': is_timeout
+        })
+    return reviews
+
+def reset_session_data():
+    sid = current_session_id()
+    if sid: SESSIONS.delete(sid)
+
+# --- Bulk Exams ---
+# Classroom-scale exam creation: one pass over the shared subject index, a
+# derived seed per candidate (question sample + option order) and a single
+# batched write of all session records. Candidates enter via /join/<token>.
+
+BULK_MAX = 5000
+MODES = ('practice', 'exam')
+
+def create_bulk_exams(names, subject, difficulty, mode, limit, seed=None):
+    pool_size = len(get_bank().ids_for(subject))
+    if not pool_size: raise ValueError(f'no questions found for subject {subject!r}')
+    rng = random.Random(new_seed() if seed is None else seed)
+    exams = [(new_session_id(), new_exam(name, subject, difficulty, mode, limit, seed=rng.getrandbits(48),
+                                         pool_size=pool_size, shuffle_options=True)) for name in names]
+    SESSIONS.put_many(exams)
+    return exams
+
+def bulk_sessions_cli(argv):
+    import argparse
+    parser = argparse.ArgumentParser(prog='app.py bulk-sessions', description='Create many exam sessions at once.')
+    parser.add_argument('--count', type=int, default=0, help='number of exams (ignored with --names)')
+    parser.add_argument('--names', help='file with one candidate name per line')
+    parser.add_argument('--subject', default='all')
+    parser.add_argument('--difficulty', default='medium', choices=sorted(TIMERS))
+    parser.add_argument('--mode', default='exam', choices=MODES)
+    parser.add_argument('--questions', type=int, default=10)
+    parser.add_argument('--seed', type=int, help='master seed, to regenerate the same set of exams')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000', help='used to print join links')
+    args = parser.parse_args(argv)
+    if SESSION_BACKEND == 'memory': parser.error('the memory session backend does not outlive this command; use file or sqlite')
+    if args.names:
+        with open(args.names, encoding='utf-8') as f: names = [line.strip() for line in f if line.strip()]
+    else: names = [f'Candidate {i + 1}' for i in range(args.count)]
+    if not names: parser.error('give --count or --names')
+    start = time.perf_counter()
+    exams = create_bulk_exams(names, args.subject, args.difficulty, args.mode, args.questions, args.seed)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['name', 'token', 'url'])
+    for sid, sess in exams: writer.writerow([sess['user_name'], sid, f'{args.base_url.rstrip("/")}/join/{sid}'])
+    print(f'Created {len(exams)} sessions in {time.perf_counter() - start:.3f}s', file=sys.stderr)
+
+# --- Question Import ---
+# Files are parsed by the format plugins in importers.py, straight from the
+# upload stream, and stored in chunks so memory stays flat regardless of file
+# size. Each chunk is checked against the duplicate fingerprint index before
+# it is appended; exact and near duplicates are skipped with a reason.
+
+# Parser processes for web uploads (0 = parse in the request thread); the
+# import command uses one per CPU by default
+IMPORT_WORKERS = int(os.environ.get('MCQ_IMPORT_WORKERS', 0))
+
+FINGERPRINTS = dedup.FingerprintIndex(FINGERPRINT_DB)
+
+def sync_fingerprints():
+    """Fingerprint questions that reached the bank without an import (first
+    run, edits, other tools); a no-op when the index is in step."""
+    bank = get_bank()
+    if FINGERPRINTS.count() != len(bank.ids): FINGERPRINTS.sync(bank.questions)
+
+def describe_duplicate(match, chunk):
+    kind, other, sim = match
+    target = f'line {chunk[other[1]][0]}' if isinstance(other, tuple) else f'question #{other}'
+    return f'{kind} of {target}' + (f' ({sim:.0%} similar)' if kind == 'near-duplicate' else '')
+
+def store_import_chunk(chunk, stats):
+    """Append one parsed chunk [(line_no, question)], skipping duplicates."""
+    with file_lock(FINGERPRINT_LOCK):
+        sync_fingerprints()
+        kept = []
+        for (line_no, q), (fp, match) in zip(chunk, FINGERPRINTS.check([q for _, q in chunk])):
+            if match:
+                stats['duplicates'] += 1
+                importers.reject(stats, line_no, describe_duplicate(match, chunk))
+            else: kept.append((q, fp))
+        if kept:
+            append_questions([q for q, _ in kept])
+            FINGERPRINTS.add([(q['id'], fp) for q, fp in kept])
+    stats['accepted'] += len(kept)
+
+def import_questions(stream, fmt='csv', progress=None, workers=None, subject=None):
+    """Import a binary stream in one of importers.FORMATS; returns the stats dict."""
+    with BANK.bulk():
+        return importers.import_stream(stream, fmt, store_import_chunk, progress,
+                                       IMPORT_WORKERS if workers is None else workers, subject)
+
+def import_cli(argv):
+    import argparse
+    parser = argparse.ArgumentParser(prog='app.py import', description='Import questions from files into the bank.')
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--format', choices=sorted(importers.FORMATS), help='default: from the file extension')
+    parser.add_argument('--subject', help='subject for questions that do not name one')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='parser processes (1 = no pool)')
+    args = parser.parse_args(argv)
+    failed = False
+    for path in args.files:
+        fmt = args.format or importers.detect_format(path)
+        start = time.perf_counter()
+        with open(path, 'rb') as f:
+            stats = import_questions(f, fmt, workers=args.workers, subject=args.subject)
+        print(f'{path} ({fmt}): {stats["rows"]} records, {stats["accepted"]} imported, '
+              f'{stats["rejected"]} skipped ({stats["duplicates"]} duplicates) in {time.perf_counter() - start:.2f}s')
+        for line_no, reason in stats['reasons'][:20]: print(f'  line {line_no}: {reason}')
+        if stats['rejected'] > 20: print(f'  … {stats["rejected"] - 20} more')
+        failed = failed or not stats['accepted']
+    return 1 if failed else 0
 
 # --- HTML Templates ---
+# Page templates extend base.html and are compiled once by the app's Jinja
+# environment (see TEMPLATES below), not re-parsed on every request.
 
 BASE_LAYOUT = '''
 <!doctype html>
@@ -188,7 +1512,7 @@ BASE_LAYOUT = '''
           {% endif %}
         {% endwith %}
 
-        {{ content | safe }}
+        {% block content %}{% endblock %}
     </div>
 
     <footer class="text-center p-4 text-gray-400 text-sm no-print">
@@ -198,7 +1522,8 @@ BASE_LAYOUT = '''
 </html>
 '''
 
-INDEX_CONTENT = '''
+INDEX_CONTENT = '''{% extends "base.html" %}
+{% block content %}
 <div class="grid lg:grid-cols-3 gap-8 fade-in">
     
     <!-- Column 1: Start Practice -->
@@ -233,6 +1558,8 @@ INDEX_CONTENT = '''
                     <select name="mode" class="w-full p-3 rounded-lg border border-gray-300 bg-white outline-none">
                         <option value="practice">🛡️ Practice Mode (Feedback & Sound)</option>
                         <option value="exam">⏱️ Exam Mode (Fast, Silent)</option>
+                        <option value="adaptive">🎯 Adaptive Exam (Stops When Your Level Is Clear)</option>
+                        <option value="offline">📦 Offline Exam (One Download, One Submit)</option>
                     </select>
                 </div>
 
@@ -270,13 +1597,13 @@ INDEX_CONTENT = '''
                 <span class="bg-indigo-100 text-indigo-800 text-sm font-bold px-3 py-1 rounded-full">Total Questions: {{ total }}</span>
             </div>
             <form action="/upload" method="post" enctype="multipart/form-data" class="flex gap-4 items-center">
-                <input type="file" name="file" accept=".csv" required 
+                <input type="file" name="file" accept=".csv,.jsonl,.ndjson,.xlsx,.txt,.aiken,.gift" required 
                     class="block w-full text-sm text-gray-500 file:mr-4 file:py-2 file:px-4 file:rounded-full file:border-0 file:text-sm file:font-semibold file:bg-indigo-50 file:text-indigo-700 hover:file:bg-indigo-100 transition"/>
                 <button type="submit" class="bg-gray-800 text-white py-2 px-6 rounded-lg hover:bg-gray-900 whitespace-nowrap">
                     Upload
                 </button>
             </form>
-            <p class="text-xs text-gray-400 mt-2">Format: <code>question,opt1,opt2,opt3,opt4,ans,subject(optional)</code></p>
+            <p class="text-xs text-gray-400 mt-2">CSV: <code>question,opt1,opt2,opt3,opt4,ans,subject(optional)</code> with ans 1-4 or A-D. Also JSON Lines, Excel (.xlsx), Aiken (.txt) and GIFT.</p>
         </div>
     </div>
 
@@ -287,6 +1614,19 @@ INDEX_CONTENT = '''
                 <h2 class="text-xl font-bold text-yellow-600">🏆 Leaderboard</h2>
                 <span class="text-xs bg-yellow-100 text-yellow-700 px-2 py-1 rounded">Top Rankers</span>
             </div>
+            <div class="flex flex-wrap gap-2 mb-4 text-xs">
+                {% for key, label in [('all', 'All'), ('difficulty:easy', 'Easy'), ('difficulty:medium', 'Medium'), ('difficulty:hard', 'Hard')] %}
+                <a href="/?board={{ key }}" class="px-2 py-1 rounded {{ 'bg-yellow-500 text-white' if board == key else 'bg-gray-100 text-gray-600 hover:bg-gray-200' }}">{{ label }}</a>
+                {% endfor %}
+                {% if subjects|length > 1 %}
+                <select onchange="location.href='/?board=' + encodeURIComponent(this.value)" class="px-2 py-1 rounded bg-gray-100 text-gray-600 outline-none">
+                    <option value="all">By subject…</option>
+                    {% for sub in subjects %}
+                    <option value="subject:{{ sub }}" {{ 'selected' if board == 'subject:' ~ sub }}>{{ sub }}</option>
+                    {% endfor %}
+                </select>
+                {% endif %}
+            </div>
             
             {% if scores %}
             <div class="space-y-3 max-h-[400px] overflow-y-auto">
@@ -325,9 +1665,11 @@ INDEX_CONTENT = '''
         </div>
     </div>
 </div>
+{% endblock %}
 '''
 
-PRACTICE_CONTENT = '''
+PRACTICE_CONTENT = '''{% extends "base.html" %}
+{% block content %}
 <div class="max-w-3xl mx-auto" id="practice-container">
     <!-- Info Header -->
     <div class="flex justify-between items-end mb-4 px-1">
@@ -340,7 +1682,7 @@ PRACTICE_CONTENT = '''
             </p>
         </div>
         <div class="text-right">
-            <span class="bg-indigo-100 text-indigo-700 px-3 py-1 rounded-full text-sm font-bold">
+            <span class="bg-indigo-100 text-indigo-700 px-3 py-1 rounded-full text-sm font-bold" id="qnum">
                 Q {{ qnum }} / {{ total }}
             </span>
             {% if subject != 'all' %}
@@ -367,7 +1709,7 @@ PRACTICE_CONTENT = '''
             </div>
 
             <!-- Question -->
-            <h3 class="text-xl md:text-2xl font-medium text-gray-800 mt-8 mb-8 leading-relaxed pr-12">
+            <h3 class="text-xl md:text-2xl font-medium text-gray-800 mt-8 mb-8 leading-relaxed pr-12" id="question-text">
                 {{ question['question'] }}
             </h3>
 
@@ -379,7 +1721,7 @@ PRACTICE_CONTENT = '''
 
             <!-- Answer Form -->
             <form method="post" action="/answer" id="quiz-form">
-                <input type="hidden" name="qindex" value="{{ qindex }}">
+                <input type="hidden" name="qindex" id="qindex" value="{{ qindex }}">
                 <input type="hidden" name="is_timeout" id="is_timeout" value="0">
                 
                 <div class="space-y-3" id="options-container">
@@ -400,13 +1742,15 @@ PRACTICE_CONTENT = '''
 </div>
 
 <script>
+    // Answers go to /api/answer in the background and the next question is
+    // swapped in place (prefetched when possible), so there is no page reload
+    // per question. The plain form post to /answer remains the fallback.
     const MODE = "{{ mode }}";
-    const CORRECT_IDX = {{ question['answer'] }};
-    const OPTIONS = {{ question['options'] | tojson }};
-    const IS_LAST = {{ 'true' if qnum == total else 'false' }};
-    
-    let timeLeft = {{ timer_limit }};
-    const totalTime = {{ timer_limit }};
+    const TOTAL = {{ total }};
+    const TIMER_LIMIT = {{ timer_limit }};
+    const PREFETCH = {{ prefetch }};
+    let current = {{ payload | tojson }};
+
     const timerBar = document.getElementById('timer-bar');
     const timerText = document.getElementById('timer-text');
     const form = document.getElementById('quiz-form');
@@ -415,91 +1759,188 @@ PRACTICE_CONTENT = '''
     const feedbackBox = document.getElementById('client-feedback');
     const feedbackMsg = document.getElementById('feedback-msg');
     const feedbackDetail = document.getElementById('feedback-detail');
-    
+    const optionsBox = document.getElementById('options-container');
+    const LABEL_CLASS = optionsBox.querySelector('label').className;
+    const INPUT_CLASS = optionsBox.querySelector('input').className;
+    const SPAN_CLASS = optionsBox.querySelector('span').className;
+    const BUTTON_CLASS = submitBtn.className;
+
     let phase = 1; // 1 = Check Answer, 2 = Go Next
     let submitted = false; // Stops timer
+    let countdown = null;
+    let timeLeft = TIMER_LIMIT;
+    let buffer = {};            // prefetched questions by position
+    let fetching = false;
+    let queue = Promise.resolve();  // answers are posted strictly in order
+
+    function fallback() { window.location.href = '/practice'; }
+
+    function prefetch() {
+        const from = current.pos + 1;
+        const upto = Math.min(from + PREFETCH, TOTAL);
+        let missing = false;
+        for (let p = from; p < upto; p++) if (!buffer[p]) missing = true;
+        if (!missing || fetching) return;
+        fetching = true;
+        fetch('/api/questions?from=' + from + '&count=' + PREFETCH)
+            .then(r => r.ok ? r.json() : {questions: []})
+            .then(d => d.questions.forEach(q => { buffer[q.pos] = q; }))
+            .catch(() => {})
+            .finally(() => { fetching = false; });
+    }
 
-    form.addEventListener('submit', function(e) {
-        // --- PRACTICE MODE LOGIC ---
-        if (MODE === 'practice' && phase === 1 && timeoutInput.value !== '1') {
-            e.preventDefault(); // STOP form from reloading
-            
-            const selected = document.querySelector('input[name="choice"]:checked');
-            if (!selected) { alert('Please select an option!'); return; }
+    function postAnswer(pos, choice, isTimeout) {
+        const body = new URLSearchParams({pos: pos, choice: choice || '', is_timeout: isTimeout ? '1' : '0'});
+        queue = queue
+            .then(() => fetch('/api/answer', {method: 'POST', body: body}))
+            .then(r => { if (!r.ok) throw new Error('answer failed: ' + r.status); return r.json(); });
+        return queue;
+    }
 
-            submitted = true; // Pause timer
+    function renderQuestion(q) {
+        current = q;
+        document.getElementById('question-text').innerText = q.question;
+        document.getElementById('qnum').innerText = 'Q ' + (q.pos + 1) + ' / ' + TOTAL;
+        document.getElementById('qindex').value = q.pos;
+        optionsBox.innerHTML = '';
+        q.options.forEach((opt, i) => {
+            const label = document.createElement('label');
+            label.className = LABEL_CLASS;
+            label.id = 'label-' + (i + 1);
+            const input = document.createElement('input');
+            input.type = 'radio'; input.name = 'choice'; input.value = i + 1; input.className = INPUT_CLASS;
+            const span = document.createElement('span');
+            span.className = SPAN_CLASS; span.innerText = opt;
+            label.appendChild(input); label.appendChild(span);
+            optionsBox.appendChild(label);
+        });
+        feedbackBox.className = 'hidden mb-6 p-4 rounded-lg border animate-pulse';
+        submitBtn.className = BUTTON_CLASS;
+        submitBtn.innerText = MODE === 'practice' ? 'Check Answer' : 'Submit Answer';
+        timeoutInput.value = '0';
+        phase = 1;
+        startTimer();
+        prefetch();
+    }
 
-            try {
-                const val = parseInt(selected.value);
-                const isCorrect = (val === CORRECT_IDX);
-                
-                // UI Updates
-                feedbackBox.classList.remove('hidden');
-                if (isCorrect) {
-                    feedbackBox.className = "mb-6 p-4 rounded-lg border animate-pulse bg-green-100 border-green-300";
-                    feedbackMsg.className = "font-bold text-lg text-green-800";
-                    feedbackMsg.innerText = "✅ Correct Answer!";
-                    feedbackDetail.innerText = "";
-                    document.getElementById('label-'+val).classList.add('bg-green-50', 'border-green-500');
-                } else {
-                    feedbackBox.className = "mb-6 p-4 rounded-lg border animate-pulse bg-red-100 border-red-300";
-                    feedbackMsg.className = "font-bold text-lg text-red-800";
-                    feedbackMsg.innerText = "❌ Wrong Answer!";
-                    feedbackDetail.className = "text-sm text-red-700 mt-1";
-                    feedbackDetail.innerText = "Correct option: " + OPTIONS[CORRECT_IDX - 1];
-                    document.getElementById('label-'+val).classList.add('bg-red-50', 'border-red-500');
-                }
+    function advance(choice, isTimeout) {
+        clearInterval(countdown);
+        const pos = current.pos;
+        const sent = postAnswer(pos, choice, isTimeout);
+        if (pos + 1 >= TOTAL) {
+            submitBtn.disabled = true;
+            sent.then(d => { window.location.href = d.redirect || '/end'; }, fallback);
+            return;
+        }
+        const next = buffer[pos + 1];
+        delete buffer[pos + 1];
+        if (next) {
+            renderQuestion(next);
+            sent.catch(fallback);
+        } else {
+            submitBtn.disabled = true;
+            sent.then(d => {
+                submitBtn.disabled = false;
+                if (d.next) renderQuestion(d.next); else window.location.href = d.redirect || '/end';
+            }, fallback);
+        }
+    }
+
+    function selectedChoice() {
+        const selected = document.querySelector('input[name="choice"]:checked');
+        return selected ? selected.value : null;
+    }
+
+    function showFeedback(val) {
+        const isCorrect = (val === current.answer);
+        feedbackBox.classList.remove('hidden');
+        if (isCorrect) {
+            feedbackBox.className = "mb-6 p-4 rounded-lg border animate-pulse bg-green-100 border-green-300";
+            feedbackMsg.className = "font-bold text-lg text-green-800";
+            feedbackMsg.innerText = "✅ Correct Answer!";
+            feedbackDetail.innerText = "";
+            document.getElementById('label-'+val).classList.add('bg-green-50', 'border-green-500');
+        } else {
+            feedbackBox.className = "mb-6 p-4 rounded-lg border animate-pulse bg-red-100 border-red-300";
+            feedbackMsg.className = "font-bold text-lg text-red-800";
+            feedbackMsg.innerText = "❌ Wrong Answer!";
+            feedbackDetail.className = "text-sm text-red-700 mt-1";
+            feedbackDetail.innerText = "Correct option: " + current.options[current.answer - 1];
+            document.getElementById('label-'+val).classList.add('bg-red-50', 'border-red-500');
+        }
+
+        // Audio
+        if (isCorrect) playSound('correct');
+        else playSound('wrong');
+    }
+
+    form.addEventListener('submit', function(e) {
+        e.preventDefault();
+        const choice = selectedChoice();
 
-                // Audio
-                if (isCorrect) playSound('correct');
-                else playSound('wrong');
-            } catch(err) { console.error(err); }
+        // --- PRACTICE MODE: check first, then move on ---
+        if (MODE === 'practice' && phase === 1) {
+            if (!choice) { alert('Please select an option!'); return; }
+            submitted = true; // Pause timer
+            try { showFeedback(parseInt(choice)); } catch(err) { console.error(err); }
 
             // Update Phase & UI
             phase = 2;
             document.querySelectorAll('.option-input').forEach(el => el.disabled = true);
-            
-            if (IS_LAST) {
+            submitBtn.classList.remove('bg-indigo-600', 'hover:bg-indigo-700');
+            if (current.pos + 1 >= TOTAL) {
                 submitBtn.innerText = "Finish Test 🏁";
-                submitBtn.classList.remove('bg-indigo-600', 'hover:bg-indigo-700');
                 submitBtn.classList.add('bg-green-600', 'hover:bg-green-700');
             } else {
                 submitBtn.innerText = "Next Question ➡️";
-                submitBtn.classList.remove('bg-indigo-600', 'hover:bg-indigo-700');
                 submitBtn.classList.add('bg-gray-800', 'hover:bg-gray-900');
             }
-        } 
-        // --- PHASE 2 (SUBMITTING) ---
-        else {
-            // IMPORTANT FIX: Re-enable inputs so the form sends data!
-            document.querySelectorAll('.option-input').forEach(el => el.disabled = false);
+            return;
         }
+
+        // --- SUBMITTING (exam mode, or practice phase 2) ---
+        if (!choice) { alert('Please select an option!'); return; }
+        advance(choice, false);
     });
 
     // Timer
-    const countdown = setInterval(() => {
-        if(submitted) { clearInterval(countdown); return; }
-        
-        timeLeft--;
+    function startTimer() {
+        clearInterval(countdown);
+        submitted = false;
+        timeLeft = TIMER_LIMIT;
         timerText.innerText = timeLeft;
-        timerBar.style.width = (timeLeft / totalTime * 100) + "%";
+        timerBar.style.width = "100%";
+        timerBar.classList.remove('bg-red-500');
+        timerBar.classList.add('bg-indigo-500');
+        countdown = setInterval(() => {
+            if(submitted) { clearInterval(countdown); return; }
+
+            timeLeft--;
+            timerText.innerText = timeLeft;
+            timerBar.style.width = (timeLeft / TIMER_LIMIT * 100) + "%";
+
+            if (timeLeft <= 5 && timeLeft > 0) {
+                timerBar.classList.remove('bg-indigo-500');
+                timerBar.classList.add('bg-red-500');
+                try { playSound('tick'); } catch(e) {}
+            }
 
-        if (timeLeft <= 5 && timeLeft > 0) {
-            timerBar.classList.remove('bg-indigo-500');
-            timerBar.classList.add('bg-red-500');
-            try { playSound('tick'); } catch(e) {} 
-        }
+            if (timeLeft <= 0) {
+                clearInterval(countdown);
+                timeoutInput.value = "1";
+                advance(selectedChoice(), true);
+            }
+        }, 1000);
+    }
 
-        if (timeLeft <= 0) {
-            clearInterval(countdown);
-            timeoutInput.value = "1";
-            form.submit(); 
-        }
-    }, 1000);
+    startTimer();
+    prefetch();
 </script>
+{% endblock %}
 '''
 
-RESULT_CONTENT = '''
+RESULT_CONTENT = '''{% extends "base.html" %}
+{% block content %}
 <div class="max-w-2xl mx-auto bg-white rounded-2xl shadow-2xl overflow-hidden fade-in print:shadow-none">
     <div class="bg-indigo-600 p-8 text-center print:bg-white print:text-black print:border-b">
         <h2 class="text-3xl font-bold text-white mb-1 print:text-black">Session Result</h2>
@@ -544,9 +1985,11 @@ RESULT_CONTENT = '''
         </div>
     </div>
 </div>
+{% endblock %}
 '''
 
-REVIEW_CONTENT = '''
+REVIEW_CONTENT = '''{% extends "base.html" %}
+{% block content %}
 <div class="max-w-4xl mx-auto fade-in">
     <div class="flex justify-between items-center mb-6 no-print">
         <h2 class="text-2xl font-bold text-gray-800">📝 Review Answers</h2>
@@ -590,64 +2033,266 @@ REVIEW_CONTENT = '''
     {% endfor %}
     </div>
 </div>
+{% endblock %}
 '''
 
+ITEM_STATS_CONTENT = '''{% extends "base.html" %}
+{% block content %}
+<div class="max-w-5xl mx-auto fade-in">
+    <div class="flex justify-between items-center mb-6">
+        <h2 class="text-2xl font-bold text-gray-800">📈 Item Statistics</h2>
+        <a href="/" class="text-indigo-600 font-medium hover:underline">Back to Home</a>
+    </div>
+
+    {% if not authorized %}
+    <form method="POST" class="bg-white p-6 rounded-xl shadow-sm max-w-sm mx-auto space-y-4">
+        <input type="password" name="pin" placeholder="Admin PIN" required
+               class="w-full px-4 py-2 border rounded-lg focus:ring-2 focus:ring-indigo-500 outline-none">
+        <button class="w-full bg-indigo-600 text-white font-bold py-2 rounded-lg hover:bg-indigo-700">Unlock</button>
+    </form>
+    {% elif not items %}
+    <p class="text-gray-400 italic text-center">No answers recorded yet.</p>
+    {% else %}
+    <p class="text-sm text-gray-500 mb-4">
+        p-value = share of correct answers (higher is easier). Discrimination = point-biserial correlation
+        between getting the item right and the candidate's total, from {{ '{:,}'.format(items|sum(attribute='scored')) }} finished-exam answers.
+    </p>
+    <div class="bg-white rounded-xl shadow-sm overflow-x-auto">
+        <table class="w-full text-sm">
+            <thead class="bg-gray-50 text-gray-500 uppercase text-xs">
+                <tr>
+                    <th class="p-3 text-left">#</th>
+                    <th class="p-3 text-left">Question</th>
+                    <th class="p-3 text-right">Responses</th>
+                    <th class="p-3 text-right">p-value</th>
+                    <th class="p-3 text-right">Discrimination</th>
+                    <th class="p-3 text-left">Options chosen</th>
+                </tr>
+            </thead>
+            <tbody>
+            {% for item in items %}
+                <tr class="border-t align-top">
+                    <td class="p-3 text-gray-400">{{ item.id }}</td>
+                    <td class="p-3 text-gray-800">{{ item.question|truncate(90) }}</td>
+                    <td class="p-3 text-right">{{ item.responses }}</td>
+                    <td class="p-3 text-right font-mono">{{ '%.2f'|format(item.p_value) if item.p_value is not none else '–' }}</td>
+                    <td class="p-3 text-right font-mono {{ 'text-red-600' if item.discrimination is not none and item.discrimination < 0.1 }}">
+                        {{ '%.2f'|format(item.discrimination) if item.discrimination is not none else '–' }}
+                    </td>
+                    <td class="p-3">
+                    {% for label, share, is_key in item.distribution %}
+                        <div class="flex items-center gap-2 text-xs">
+                            <span class="w-10 {{ 'font-bold text-green-700' if is_key else 'text-gray-500' }}">{{ label }}</span>
+                            <div class="h-2 bg-gray-100 rounded w-24"><div class="h-2 rounded {{ 'bg-green-500' if is_key else 'bg-indigo-300' }}" style="width: {{ (share * 100)|round|int }}%"></div></div>
+                            <span class="text-gray-500">{{ (share * 100)|round|int }}%</span>
+                        </div>
+                    {% endfor %}
+                    </td>
+                </tr>
+            {% endfor %}
+            </tbody>
+        </table>
+    </div>
+    {% endif %}
+</div>
+{% endblock %}
+'''
+
+OFFLINE_CONTENT = '''{% extends "base.html" %}
+{% block content %}
+<div class="max-w-3xl mx-auto" id="offline-container">
+    <!-- Info Header -->
+    <div class="flex justify-between items-end mb-4 px-1">
+        <div>
+            <p class="text-xs font-bold text-gray-400 uppercase tracking-wider">Candidate</p>
+            <p class="font-bold text-gray-800">{{ user_name }}
+                <span class="text-xs font-normal text-gray-500 ml-1">({{ difficulty|title }} / Offline Exam)</span>
+            </p>
+        </div>
+        <span class="bg-indigo-100 text-indigo-700 px-3 py-1 rounded-full text-sm font-bold" id="qnum">Loading…</span>
+    </div>
+
+    <div class="bg-white rounded-2xl shadow-xl overflow-hidden mb-6 relative">
+        <div class="h-2 w-full bg-gray-100">
+            <div id="timer-bar" class="h-full bg-indigo-500 transition-all duration-1000 ease-linear" style="width: 100%;"></div>
+        </div>
+        <div class="p-6 md:p-8 relative">
+            <div class="absolute top-4 right-4 flex items-center gap-1 font-mono font-bold text-xl">
+                <span class="text-indigo-500">⏱️</span>
+                <span id="timer-text" class="text-gray-700"></span>
+            </div>
+            <h3 class="text-xl md:text-2xl font-medium text-gray-800 mt-8 mb-8 leading-relaxed pr-12" id="question-text">
+                Downloading your exam…
+            </h3>
+            <form id="offline-form">
+                <div class="space-y-3" id="options-container"></div>
+                <button type="submit" id="submit-btn" class="mt-8 w-full bg-indigo-600 text-white font-bold py-4 rounded-xl hover:bg-indigo-700 transition shadow-lg" disabled>
+                    Submit Answer
+                </button>
+            </form>
+            <p id="status" class="text-sm text-gray-400 mt-4 text-center"></p>
+        </div>
+    </div>
+</div>
+
+<script>
+    // The whole exam arrives in one (gzip) download and runs locally; the
+    // answer sheet is posted once at the end and graded by the server.
+    let bundle = null;
+    let pos = 0;
+    let answers = [];
+    let timeouts = [];
+    let countdown = null;
+    let timeLeft = 0;
+    const box = document.getElementById('options-container');
+    const submitBtn = document.getElementById('submit-btn');
+    const statusText = document.getElementById('status');
+
+    function show() {
+        const q = bundle.questions[pos];
+        document.getElementById('qnum').innerText = 'Q ' + (pos + 1) + ' / ' + bundle.questions.length;
+        document.getElementById('question-text').innerText = q.question;
+        box.innerHTML = '';
+        q.options.forEach((opt, i) => {
+            const label = document.createElement('label');
+            label.className = 'group relative flex items-center p-4 border-2 border-gray-100 rounded-xl cursor-pointer hover:border-indigo-500 hover:bg-indigo-50 transition-all duration-200';
+            const input = document.createElement('input');
+            input.type = 'radio'; input.name = 'choice'; input.value = i + 1;
+            input.className = 'w-5 h-5 text-indigo-600 border-gray-300 focus:ring-indigo-500';
+            const span = document.createElement('span');
+            span.className = 'ml-4 text-gray-700 font-medium group-hover:text-indigo-800';
+            span.innerText = opt;
+            label.appendChild(input); label.appendChild(span);
+            box.appendChild(label);
+        });
+        submitBtn.disabled = false;
+        submitBtn.innerText = pos + 1 === bundle.questions.length ? 'Finish Test 🏁' : 'Submit Answer';
+        startTimer();
+    }
+
+    function record(isTimeout) {
+        clearInterval(countdown);
+        const selected = document.querySelector('input[name="choice"]:checked');
+        answers.push(selected ? parseInt(selected.value) : 0);
+        timeouts.push(isTimeout);
+        pos++;
+        if (pos < bundle.questions.length) show(); else finish();
+    }
+
+    function finish() {
+        submitBtn.disabled = true;
+        statusText.innerText = 'Submitting your answers…';
+        fetch('/api/grade_bundle', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({bundle_id: bundle.bundle_id, answers: answers, timeouts: timeouts})
+        }).then(r => r.json()).then(d => {
+            window.location.href = d.redirect || '/end';
+        }).catch(() => {
+            statusText.innerText = 'Could not reach the server. Your answers are kept; retrying in 5 seconds…';
+            setTimeout(finish, 5000);
+        });
+    }
+
+    function startTimer() {
+        clearInterval(countdown);
+        timeLeft = bundle.timer;
+        const bar = document.getElementById('timer-bar');
+        const text = document.getElementById('timer-text');
+        text.innerText = timeLeft;
+        bar.style.width = '100%';
+        countdown = setInterval(() => {
+            timeLeft--;
+            text.innerText = timeLeft;
+            bar.style.width = (timeLeft / bundle.timer * 100) + '%';
+            if (timeLeft <= 0) record(true);
+        }, 1000);
+    }
+
+    document.getElementById('offline-form').addEventListener('submit', function(e) {
+        e.preventDefault();
+        if (!document.querySelector('input[name="choice"]:checked')) { alert('Please select an option!'); return; }
+        record(false);
+    });
+
+    fetch('/api/exam_bundle').then(r => r.json()).then(b => {
+        bundle = b;
+        if (!b.questions.length) { window.location.href = '/end'; return; }
+        show();
+    }).catch(() => { statusText.innerText = 'Could not download the exam. Reload the page to try again.'; });
+</script>
+{% endblock %}
+'''
+
+TEMPLATES = {
+    'base.html': BASE_LAYOUT,
+    'index.html': INDEX_CONTENT,
+    'practice.html': PRACTICE_CONTENT,
+    'result.html': RESULT_CONTENT,
+    'review.html': REVIEW_CONTENT,
+    'offline.html': OFFLINE_CONTENT,
+    'item_stats.html': ITEM_STATS_CONTENT,
+}
+
+app.jinja_options = {
+    'loader': DictLoader(TEMPLATES),
+    'bytecode_cache': FileSystemBytecodeCache(),
+}
+app.jinja_env.globals.update(enumerate=enumerate, min=min)
+
+# --- Instrumentation Hooks ---
+
+if PROFILE_SLOW_MS: metrics.enable_profiler(PROFILE_DIR, PROFILE_SLOW_MS)
+
+@app.before_request
+def _metrics_start():
+    metrics.request_started()
+
+@app.teardown_request
+def _metrics_finish(exc):
+    metrics.request_finished(request.url_rule.rule if request.url_rule else 'unmatched')
+
+def _render_started(sender, template, context, **extra):
+    g.render_start = time.perf_counter()
+
+def _render_finished(sender, template, context, **extra):
+    start = g.pop('render_start', None)
+    if start is not None: metrics.FUNCTION_LATENCY.observe('render_template', time.perf_counter() - start)
+
+before_render_template.connect(_render_started, app)
+template_rendered.connect(_render_finished, app)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.exposition(), mimetype='text/plain; version=0.0.4')
+
 # --- Routes ---
 
 @app.route('/')
 def index():
-    qs = load_questions()
-    scores = load_scores()
-    subjects = sorted(list(set([q.get('subject', 'General') for q in qs]))) if qs else []
+    bank = get_bank()
+    board = request.args.get('board', 'all')
+    scores = load_scores(board)
     session.pop('authenticated', None)
-    return render_template_string(BASE_LAYOUT, 
-        content=render_template_string(INDEX_CONTENT, total=len(qs), subjects=subjects, scores=scores, min=min))
+    return render_template('index.html', total=len(bank.questions), subjects=bank.subjects, scores=scores, board=board)
 
 @app.route('/start_session', methods=['POST'])
 def start_session():
-    user_name = request.form.get('user_name')
-    access_pin = request.form.get('access_pin')
-    subject = request.form.get('subject')
-    difficulty = request.form.get('difficulty')
-    mode = request.form.get('mode')
-    try:
-        limit = int(request.form.get('num_questions'))
-    except: limit = 10
-
-    if access_pin != ACCESS_PIN:
+    if request.form.get('access_pin') != ACCESS_PIN:
         flash('❌ Invalid PIN', 'warning')
         return redirect(url_for('index'))
 
-    qs = load_questions()
-    if subject != 'all':
-        qs = [q for q in qs if q.get('subject', 'General') == subject]
+    sess_data = new_exam(**exam_request(request.form))
     
-    if not qs:
+    if not sess_data:
         flash('⚠️ No questions found for this subject.', 'warning')
         return redirect(url_for('index'))
 
-    random.shuffle(qs)
-    qs = qs[:limit]
-    timers = {'easy': 60, 'medium': 30, 'hard': 15}
-    
-    session['user_name'] = user_name
+    session['user_name'] = sess_data['user_name']
     session['authenticated'] = True
-    reset_session_file()
-    
-    sess_data = {
-        'questions': qs,
-        'pos': 0,
-        'score': 0,
-        'correct': 0,
-        'attempted': 0,
-        'difficulty': difficulty,
-        'mode': mode,
-        'timer': timers.get(difficulty, 30),
-        'start_time': time.time(),
-        'subject': subject,
-        'reviews': []
-    }
+    reset_session_data()
     save_session_data(sess_data)
+    if sess_data['mode'] == 'offline': return redirect(url_for('offline_exam'))
     return redirect(url_for('practice'))
 
 @app.route('/practice')
@@ -658,29 +2303,34 @@ def practice():
 
     if request.args.get('restart'):
         sess['pos'] = 0; sess['score'] = 0; sess['correct'] = 0; sess['attempted'] = 0
-        sess['reviews'] = []; sess['start_time'] = time.time()
-        random.shuffle(sess['questions'])
+        sess['answers'] = []; sess['timeouts'] = []; sess['start_time'] = time.time()
+        sess.pop('stats_recorded', None)
+        sess['round'] = sess.get('round', 0) + 1
+        if sess['mode'] == 'adaptive':
+            sess['limit'] = sess['max_questions']
+            start_adaptive(sess)
         save_session_data(sess)
         return redirect(url_for('practice'))
 
-    if sess['pos'] >= len(sess['questions']):
+    qids = session_question_ids(sess)
+    if sess['pos'] >= len(qids):
         return redirect(url_for('end'))
 
-    question = sess['questions'][sess['pos']]
+    question = get_bank().get(qids[sess['pos']])
+    if not question: return redirect(url_for('index'))
     
-    return render_template_string(BASE_LAYOUT,
-        content=render_template_string(PRACTICE_CONTENT,
-            user_name=session['user_name'],
-            question=question,
-            qindex=sess['pos'],
-            qnum=sess['pos'] + 1,
-            total=len(sess['questions']),
-            difficulty=sess['difficulty'],
-            mode=sess['mode'],
-            timer_limit=sess['timer'],
-            subject=sess.get('subject', 'General').title(),
-            enumerate=enumerate
-        )
+    return render_template('practice.html',
+        user_name=session['user_name'],
+        question=present_question(question, option_order(sess, question['id'], len(question['options']))),
+        payload=question_payload(sess, question['id'], sess['pos']),
+        prefetch=PREFETCH,
+        qindex=sess['pos'],
+        qnum=sess['pos'] + 1,
+        total=sess['limit'] if sess['mode'] == 'adaptive' else len(qids),
+        difficulty=sess['difficulty'],
+        mode=sess['mode'],
+        timer_limit=sess['timer'],
+        subject=sess.get('subject', 'General').title()
     )
 
 @app.route('/answer', methods=['POST'])
@@ -696,118 +2346,405 @@ def answer():
         flash('Please select an option', 'warning')
         return redirect(url_for('practice'))
 
-    question = sess['questions'][sess['pos']]
-    correct_ans = question['answer']
-    
-    user_choice = int(choice_str) if choice_str else None
-    is_correct = (user_choice == correct_ans) and not is_timeout
-    
-    # Update Stats
-    sess['attempted'] += 1
-    
-    if is_correct:
-        sess['score'] += 1
-        sess['correct'] += 1
-    else:
-        if sess['difficulty'] == 'hard':
-            sess['score'] -= 0.25
-    
-    # Save Review
-    sess['reviews'].append({
-        'question': question['question'],
-        'options': question['options'],
-        'user_choice': user_choice,
-        'correct_choice': correct_ans,
-        'is_correct': is_correct,
-        'is_timeout': is_timeout
-    })
-    
-    # Move Next (Always, for both modes now)
-    sess['pos'] += 1
+    qids = session_question_ids(sess)
+    if sess['pos'] >= len(qids): return redirect(url_for('end'))
+    if not record_answer(sess, qids[sess['pos']], choice_str, is_timeout): return redirect(url_for('index'))
     save_session_data(sess)
     
     return redirect(url_for('practice'))
 
+# --- JSON API (in-page practice flow) ---
+# The practice page posts answers to /api/answer and swaps the next question
+# in place; upcoming questions are prefetched with /api/questions.
+# /api/start_session, /api/answer and /api/end are the whole exam as JSON;
+# asgi.py serves the same three on asyncio from the same helpers.
+
+PREFETCH = 3
+API_MAX_BATCH = 50
+
+@app.route('/api/questions')
+def api_questions():
+    if not session.get('authenticated'): return {'error': 'not authenticated'}, 401
+    sess = get_session_data()
+    if not sess: return {'error': 'no active session'}, 404
+    qids = session_question_ids(sess)
+    try:
+        start = max(int(request.args.get('from', sess['pos'])), sess['pos'])
+        count = min(max(int(request.args.get('count', PREFETCH)), 0), API_MAX_BATCH)
+    except ValueError: return {'error': 'bad range'}, 400
+    payloads = [question_payload(sess, qids[pos], pos) for pos in range(start, min(start + count, len(qids)))]
+    return {'total': len(qids), 'questions': [p for p in payloads if p]}
+
+def exam_started(sess, redirect_url):
+    """Reply to a JSON start: the exam's shape and its first question."""
+    qids = session_question_ids(sess)
+    return {
+        'total': sess['limit'] if sess['mode'] == 'adaptive' else len(qids),
+        'mode': sess['mode'],
+        'difficulty': sess['difficulty'],
+        'timer': sess['timer'],
+        'question': question_payload(sess, qids[0], 0) if qids else None,
+        'redirect': redirect_url
+    }
+
+def answer_current(sess, data, end_url):
+    """Grade a posted answer to the current question: (reply, status, whether sess changed)."""
+    choice_str = str(data.get('choice') or '')
+    is_timeout = str(data.get('is_timeout')) in ('1', 'true', 'True')
+    if not choice_str and not is_timeout: return {'error': 'select an option'}, 400, False
+
+    qids = session_question_ids(sess)
+    pos = sess['pos']
+    if str(data.get('pos', pos)) != str(pos):   # stale or duplicate submit
+        return {'error': 'out of sync', 'pos': pos}, 409, False
+    if pos >= len(qids): return {'finished': True, 'next': None, 'redirect': end_url}, 200, False
+    result = record_answer(sess, qids[pos], choice_str, is_timeout)
+    if not result: return {'error': 'question no longer exists'}, 410, False
+    if 'qids' in sess: qids = sess['qids']   # adaptive: the next question was just picked
+
+    finished = sess['pos'] >= len(qids)
+    return {
+        'result': result,
+        'finished': finished,
+        'next': None if finished else question_payload(sess, qids[sess['pos']], sess['pos']),
+        'redirect': end_url if finished else None
+    }, 200, True
+
+@app.route('/api/start_session', methods=['POST'])
+def api_start_session():
+    data = request.get_json(silent=True) or request.form
+    if data.get('access_pin') != ACCESS_PIN: return {'error': 'invalid PIN'}, 403
+    sess = new_exam(**exam_request(data))
+    if not sess: return {'error': 'no questions found for this subject'}, 404
+    session['user_name'] = sess['user_name']
+    session['authenticated'] = True
+    reset_session_data()
+    save_session_data(sess)
+    return exam_started(sess, url_for('offline_exam' if sess['mode'] == 'offline' else 'practice'))
+
+@app.route('/api/answer', methods=['POST'])
+def api_answer():
+    if not session.get('authenticated'): return {'error': 'not authenticated'}, 401
+    sess = get_session_data()
+    if not sess: return {'error': 'no active session'}, 404
+    reply, status, changed = answer_current(sess, request.get_json(silent=True) or request.form, url_for('end'))
+    if changed: save_session_data(sess)
+    return reply, status
+
+@app.route('/api/end', methods=['POST'])
+def api_end():
+    if not session.get('authenticated'): return {'error': 'not authenticated'}, 401
+    sess = get_session_data()
+    if not sess: return {'error': 'no active session'}, 404
+    graded, record, changed = finish_exam(sess, session['user_name'])
+    if changed: save_session_data(sess)
+    save_score(record)
+    return dict(graded, total=sess['limit'], redirect=url_for('review'))
+
+# --- Offline Exam Bundles ---
+# The whole exam (without answers) is delivered as one gzip-compressed JSON
+# payload, the browser runs it locally and posts a single answer vector,
+# graded with record_answer() exactly like per-question submits.
+
+@app.route('/exam/offline')
+def offline_exam():
+    if not session.get('authenticated'): return redirect(url_for('index'))
+    sess = get_session_data()
+    if not sess: return redirect(url_for('index'))
+    return render_template('offline.html', user_name=session['user_name'], difficulty=sess['difficulty'])
+
+@app.route('/api/exam_bundle')
+def api_exam_bundle():
+    if not session.get('authenticated'): return {'error': 'not authenticated'}, 401
+    sess = get_session_data()
+    if not sess: return {'error': 'no active session'}, 404
+    qids = session_question_ids(sess)
+    exam_view = dict(sess, mode='exam')   # never include answers in a bundle
+    questions = [question_payload(exam_view, qid, pos) for pos, qid in enumerate(qids) if pos >= sess['pos']]
+    bundle = {
+        'bundle_id': f"{sess['seed']}:{sess.get('round', 0)}",
+        'start': sess['pos'],
+        'timer': sess['timer'],
+        'difficulty': sess['difficulty'],
+        'questions': [q for q in questions if q]
+    }
+    body = json.dumps(bundle, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if 'gzip' not in request.headers.get('Accept-Encoding', ''):
+        return Response(body, mimetype='application/json')
+    resp = Response(gzip.compress(body, 6), mimetype='application/json')
+    resp.headers['Content-Encoding'] = 'gzip'
+    resp.headers['Vary'] = 'Accept-Encoding'
+    return resp
+
+@app.route('/api/grade_bundle', methods=['POST'])
+def api_grade_bundle():
+    if not session.get('authenticated'): return {'error': 'not authenticated'}, 401
+    sess = get_session_data()
+    if not sess: return {'error': 'no active session'}, 404
+    raw = request.get_data()
+    if request.headers.get('Content-Encoding') == 'gzip':
+        try: raw = gzip.decompress(raw)
+        except OSError: return {'error': 'bad gzip body'}, 400
+    try: data = json.loads(raw or b'{}')
+    except ValueError: return {'error': 'invalid JSON'}, 400
+    if not isinstance(data, dict): return {'error': 'expected a JSON object'}, 400
+    answers, timeouts = data.get('answers') or [], data.get('timeouts') or []
+    if not (isinstance(answers, list) and all(a is None or (isinstance(a, (int, str)) and not isinstance(a, bool)) for a in answers)):
+        return {'error': 'answers must be a list of option numbers (or null)'}, 400
+    if not (isinstance(timeouts, list) and all(t is None or isinstance(t, (bool, int)) for t in timeouts)):
+        return {'error': 'timeouts must be a list of booleans'}, 400
+    if data.get('bundle_id') not in (None, f"{sess['seed']}:{sess.get('round', 0)}"):
+        return {'error': 'bundle does not belong to the current exam'}, 409
+
+    qids = session_question_ids(sess)
+    start = sess['pos']
+    if start >= len(qids): return {'error': 'exam already submitted', 'redirect': url_for('end')}, 409
+    # answers/timeouts are indexed from the bundle's first question; missing entries count as timed out
+    for i, qid in enumerate(qids[start:]):
+        choice = answers[i] if i < len(answers) else None
+        is_timeout = bool(timeouts[i]) if i < len(timeouts) else not choice
+        if not choice and not is_timeout: is_timeout = True
+        record_answer(sess, qid, str(choice) if choice else '', is_timeout)
+    save_session_data(sess)
+    return dict(grade_session(sess), total=sess['limit'], redirect=url_for('end'))
+
 @app.route('/end')
 def end():
     if not session.get('authenticated'): return redirect(url_for('index'))
     sess = get_session_data()
     if not sess: return redirect(url_for('index'))
     
-    total = len(sess['questions'])
-    acc = int((sess['correct'] / total * 100)) if total > 0 else 0
-    
-    score_record = {
-        'name': session['user_name'],
-        'score': sess['score'],
-        'accuracy': acc,
-        'date': datetime.now().strftime("%Y-%m-%d %H:%M")
-    }
+    total = sess['limit']
+    graded, score_record, changed = finish_exam(sess, session['user_name'])
+    acc = graded['accuracy']
+    if changed: save_session_data(sess)
     save_score(score_record)
     
-    return render_template_string(BASE_LAYOUT,
-        content=render_template_string(RESULT_CONTENT,
-            user_name=session['user_name'],
-            score=sess['score'],
-            total=total,
-            accuracy=acc,
-            date=datetime.now().strftime("%Y-%m-%d")
-        )
+    return render_template('result.html',
+        user_name=session['user_name'],
+        score=graded['score'],
+        total=total,
+        accuracy=acc,
+        date=datetime.now().strftime("%Y-%m-%d")
     )
 
 @app.route('/review')
 def review():
     if not session.get('authenticated'): return redirect(url_for('index'))
     sess = get_session_data()
-    return render_template_string(BASE_LAYOUT, 
-        content=render_template_string(REVIEW_CONTENT, reviews=sess.get('reviews', [])))
+    if not sess: return redirect(url_for('index'))
+    return render_template('review.html', reviews=build_reviews(sess))
+
+@app.route('/join/<token>')
+def join(token):
+    """Enter an exam created by the bulk API/CLI."""
+    sess = SESSIONS.get(token) if SID_RE.match(token) else None
+    if not sess:
+        flash('❌ Unknown or expired exam link.', 'warning')
+        return redirect(url_for('index'))
+    session['sid'] = token
+    session['user_name'] = sess.get('user_name') or 'Candidate'
+    session['authenticated'] = True
+    return redirect(url_for('practice'))
+
+@app.route('/api/bulk_sessions', methods=['POST'])
+def api_bulk_sessions():
+    data = request.get_json(silent=True) or {}
+    if str(data.get('pin')) != ACCESS_PIN: return {'error': 'invalid pin'}, 403
+    names = data.get('names')
+    try: count = len(names) if names else int(data.get('count', 0))
+    except (TypeError, ValueError): count = 0
+    if not 1 <= count <= BULK_MAX: return {'error': f'give names or a count between 1 and {BULK_MAX}'}, 400
+    if names and not (isinstance(names, list) and all(isinstance(n, str) and n.strip() for n in names)):
+        return {'error': 'names must be a list of non-empty strings'}, 400
+    names = [n.strip() for n in names] if names else [f'Candidate {i + 1}' for i in range(count)]
+    difficulty, mode = data.get('difficulty', 'medium'), data.get('mode', 'exam')
+    if not isinstance(difficulty, str) or difficulty not in TIMERS: return {'error': f'difficulty must be one of {", ".join(sorted(TIMERS))}'}, 400
+    if not isinstance(mode, str) or mode not in MODES: return {'error': f'mode must be one of {", ".join(MODES)}'}, 400
+    try:
+        limit, seed = int(data.get('num_questions', 10)), data.get('seed')
+        if seed is not None: seed = int(seed)
+        exams = create_bulk_exams(names, str(data.get('subject', 'all')), difficulty, mode, limit, seed)
+    except (TypeError, ValueError) as e: return {'error': str(e)}, 400
+    return {'sessions': [{'name': sess['user_name'], 'token': sid, 'seed': sess['seed'],
+                          'url': url_for('join', token=sid, _external=True)} for sid, sess in exams]}, 201
+
+@app.route('/admin/item-stats', methods=['GET', 'POST'])
+def item_stats():
+    if request.method == 'POST':
+        if request.form.get('pin') == ACCESS_PIN: session['admin'] = True
+        else: flash('❌ Invalid PIN', 'warning')
+        return redirect(url_for('item_stats'))
+    if not session.get('admin'): return render_template('item_stats.html', authorized=False)
+
+    bank = get_bank()
+    items = []
+    for row in ITEM_STATS.report():
+        q = bank.get(row['id'])
+        if not q: continue
+        counts = row['options']
+        answered = sum(counts.values()) or 1
+        labels = [(chr(65 + i), i + 1) for i in range(len(q['options']))] + [('Blank', 0)]
+        row['question'] = q['question']
+        row['distribution'] = [(label, counts.get(n, 0) / answered, n == q['answer']) for label, n in labels]
+        items.append(row)
+    return render_template('item_stats.html', authorized=True, items=items)
+
+SEARCH_PAGE_SIZE = 20
+
+@app.route('/search')
+def search_questions():
+    """BM25-ranked search over the bank (answers included, so admin only)."""
+    if not session.get('admin') and request.args.get('pin') != ACCESS_PIN: return {'error': 'admin PIN required'}, 403
+    query = request.args.get('q', '').strip()
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', SEARCH_PAGE_SIZE)), 1), API_MAX_BATCH)
+    except ValueError: return {'error': 'bad page'}, 400
+    bank = get_bank()
+    start = time.perf_counter()
+    total, hits = bank.search(query, per_page, (page - 1) * per_page)
+    results = []
+    for qid, score in hits:
+        q = bank.get(qid)
+        if q: results.append(dict(q, score=round(score, 4)))
+    return {
+        'query': query,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': (total + per_page - 1) // per_page,
+        'took_ms': round((time.perf_counter() - start) * 1000, 2),
+        'results': results
+    }
 
 @app.route('/upload', methods=['POST'])
 def upload():
     file = request.files.get('file')
     if not file: return redirect(url_for('index'))
     
+    def progress(stats):
+        app.logger.info('upload %s: %d rows read, %d imported, %d rejected',
+                        file.filename, stats['rows'], stats['accepted'], stats['rejected'])
     try:
-        lines = file.read().decode('utf-8').splitlines()
-        reader = csv.reader(lines)
-        new_qs = []
-        for row in reader:
-            if len(row) >= 6 and row[0].strip():
-                try:
-                    ans = int(row[5].strip())
-                    subj = row[6].strip() if len(row) > 6 else 'General'
-                    new_qs.append({
-                        'question': row[0],
-                        'options': [x.strip() for x in row[1:5]],
-                        'answer': ans,
-                        'subject': subj
-                    })
-                except: continue
-        
-        if new_qs:
-            curr = load_questions()
-            curr.extend(new_qs)
-            save_questions(curr)
-            flash(f'✅ Uploaded {len(new_qs)} questions successfully!', 'success')
+        fmt = request.form.get('format') or importers.detect_format(file.filename)
+        if fmt not in importers.FORMATS: raise ValueError(f'unknown format {fmt!r}')
+        stats = import_questions(file.stream, fmt, progress)
+        if stats['accepted']:
+            flash(f'✅ Uploaded {stats["accepted"]} questions successfully!', 'success')
         else: flash('⚠️ No valid data found.', 'warning')
+        if stats['rejected']:
+            shown = '; '.join(f'line {n}: {reason}' for n, reason in stats['reasons'][:5])
+            more = ' …' if stats['rejected'] > 5 else ''
+            dups = f' ({stats["duplicates"]} already in the bank or repeated)' if stats['duplicates'] else ''
+            flash(f'⚠️ Skipped {stats["rejected"]} rows{dups}. {shown}{more}', 'warning')
     except Exception as e: flash(f'Error: {e}', 'error')
     
     return redirect(url_for('index'))
 
 @app.route('/clear_all', methods=['POST'])
 def clear_all():
-    if os.path.exists(DATA_FILE): os.remove(DATA_FILE)
-    if os.path.exists(SCORES_FILE): os.remove(SCORES_FILE)
-    reset_session_file()
+    STORE.clear()
+    BANK.replace([])
+    if os.path.exists(SNAPSHOT_FILE):
+        try: os.remove(SNAPSHOT_FILE)
+        except OSError: log.warning('could not remove %s', SNAPSHOT_FILE)
+    LEADERBOARD.clear()
+    ITEM_STATS.clear()
+    FINGERPRINTS.clear()
+    SESSIONS.clear()
     flash('🗑️ All data cleared.', 'success')
     return redirect(url_for('index'))
 
+# --- Production Server ---
+
+def serve(argv):
+    """Run the app under gunicorn (multi-process) or waitress (threaded, e.g. on Windows)."""
+    import argparse
+    parser = argparse.ArgumentParser(prog='app.py serve', description='Run MCQ Master Suite under a production WSGI server.')
+    parser.add_argument('--bind', default=os.environ.get('MCQ_BIND', '0.0.0.0:8000'), help='host:port to listen on')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('MCQ_WORKERS', (os.cpu_count() or 1) * 2 + 1)),
+                        help='worker processes (gunicorn only)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('MCQ_THREADS', 4)), help='threads per worker')
+    parser.add_argument('--keepalive', type=int, default=int(os.environ.get('MCQ_KEEPALIVE', 5)),
+                        help='seconds to keep idle client connections open')
+    parser.add_argument('--timeout', type=int, default=30, help='worker timeout in seconds (gunicorn only)')
+    args = parser.parse_args(argv)
+    host, _, port = args.bind.rpartition(':')
+    host = host or '0.0.0.0'
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        BaseApplication = None
+
+    if BaseApplication is not None:
+        if args.workers > 1 and SESSION_BACKEND == 'memory':
+            sys.exit('MCQ_SESSION_BACKEND=memory is per-process; use file or sqlite with more than one worker.')
+        if args.workers > 1 and DURABILITY == 'async':
+            sys.exit('MCQ_DURABILITY=async keeps writes in one process; use group or fsync with more than one worker.')
+        if args.workers > 1 and SNAPSHOT_MODE != '0' and not BANK.snapshot_path: BANK.use_snapshot(SNAPSHOT_FILE)
+        # Load the bank in the master so the forked workers share it, and keep
+        # the collector from touching (and so copying) everything loaded so far
+        get_bank()
+        gc.freeze()
+
+        class Server(BaseApplication):
+            def load_config(self):
+                self.cfg.set('bind', f'{host}:{port}')
+                self.cfg.set('workers', args.workers)
+                self.cfg.set('threads', args.threads)
+                self.cfg.set('worker_class', 'gthread')
+                self.cfg.set('keepalive', args.keepalive)
+                self.cfg.set('timeout', args.timeout)
+                self.cfg.set('preload_app', True)
+                # A worker recycled (max_requests) or stopped keeps nothing in memory
+                self.cfg.set('worker_exit', lambda arbiter, worker: flush_buffers())
+
+            def load(self):
+                return app
+
+        print(f'Serving on http://{host}:{port} with gunicorn ({args.workers} workers x {args.threads} threads)')
+        Server().run()
+        return
+
+    try:
+        import waitress
+    except ImportError:
+        waitress = None
+    if waitress is not None:
+        print(f'Serving on http://{host}:{port} with waitress ({args.threads} threads)')
+        waitress.serve(app, host=host, port=int(port), threads=args.threads, channel_timeout=max(args.keepalive, 1))
+        return
+
+    print('Neither gunicorn nor waitress is installed (pip install gunicorn / waitress); '
+          'falling back to the threaded development server.')
+    app.run(host=host, port=int(port), threaded=True, debug=False, use_reloader=False)
+
 def open_browser():
     # Give the server a moment to start
     time.sleep(1)
     webbrowser.open('http://127.0.0.1:5000')
 
 if __name__ == '__main__':
+    if sys.argv[1:2] == ['migrate-sqlite']:
+        print(f'Imported {migrate_to_sqlite()} questions into {QUESTIONS_DB}')
+        print('Start the app with MCQ_QUESTION_STORE=sqlite to use it.')
+        sys.exit(0)
+
+    if sys.argv[1:2] == ['import']:
+        if not os.path.exists(DATA_FILE): save_questions([])
+        sys.exit(import_cli(sys.argv[2:]))
+
+    if sys.argv[1:2] == ['bulk-sessions']:
+        bulk_sessions_cli(sys.argv[2:])
+        sys.exit(0)
+
+    if sys.argv[1:2] == ['serve']:
+        if not os.path.exists(DATA_FILE): save_questions([])
+        serve(sys.argv[2:])
+        sys.exit(0)
+
     if not os.path.exists(DATA_FILE): save_questions([])
     
     # Start browser in a separate thread so it doesn't block the server
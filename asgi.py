@@ -0,0 +1,293 @@
+"""
+Async (ASGI) front end for timed exams.
+
+When the timer runs out for a whole class, hundreds of candidates submit
+their last answer and end the exam at the same moment. Under the WSGI
+server every one of those requests holds a worker thread while it waits for
+its session and score writes, so the burst queues behind the thread pool.
+
+Here /api/start_session, /api/answer and /api/end run on an asyncio event
+loop, built from the same helpers as the Flask routes in app.py (new_exam,
+answer_current, finish_exam), and a request waiting for storage holds no
+thread. Session and score I/O runs in a small thread pool and is group
+committed: writes that arrive while one is in flight go out together in the
+next batch (one put_many, one scores.jsonl append and fsync), so a burst of N
+submits costs a handful of commits instead of N. Every request still waits
+for its own write before it replies.
+
+Any other request (pages, uploads, admin) is passed to the Flask app in the
+same thread pool, and the Flask session cookie is shared, so a candidate can
+start here and continue on /practice.
+
+Run with any ASGI server:
+    pip install uvicorn
+    python asgi.py --bind 0.0.0.0:8000 --workers 4
+    gunicorn -k uvicorn.workers.UvicornWorker -w 4 asgi:application
+"""
+import argparse
+import asyncio
+import functools
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import CookieError, SimpleCookie
+from urllib.parse import parse_qsl
+
+from flask import url_for
+from itsdangerous import BadSignature
+
+import app as mcq
+import metrics
+
+# Threads for session/score/item-statistics I/O and for requests handed to Flask
+IO_THREADS = int(os.environ.get('MCQ_ASYNC_IO_THREADS', 8))
+IO = ThreadPoolExecutor(IO_THREADS, thread_name_prefix='mcq-io')
+
+MAX_BODY = 64 * 1024   # JSON API bodies are tiny; larger uploads go to Flask
+
+with mcq.app.test_request_context():
+    URLS = {name: url_for(name) for name in ('practice', 'offline_exam', 'end', 'review')}
+
+async def run_io(fn, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(IO, functools.partial(fn, *args, **kwargs))
+
+# --- Group Commit ---
+
+class GroupCommit:
+    """Calls write(items) in the I/O pool; items submitted while a write is
+    in flight are collected and written together by the next call."""
+    def __init__(self, write):
+        self.write = write
+        self.pending = []   # (item, future)
+        self.task = None
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((item, future))
+        if self.task is None: self.task = asyncio.create_task(self._drain())
+        await future
+
+    async def _drain(self):
+        try:
+            while self.pending:
+                batch, self.pending = self.pending, []
+                try: await run_io(self.write, [item for item, _ in batch])
+                except Exception as exc:
+                    for _, future in batch:
+                        if not future.done(): future.set_exception(exc)
+                else:
+                    for _, future in batch:
+                        if not future.done(): future.set_result(None)
+        finally: self.task = None
+
+SESSION_WRITES = GroupCommit(mcq.SESSIONS.put_many)
+SCORE_WRITES = GroupCommit(mcq.LEADERBOARD.append_many)
+
+# --- Flask Session Cookie ---
+
+SESSION_COOKIE = mcq.app.config['SESSION_COOKIE_NAME']
+SIGNER = mcq.app.session_interface.get_signing_serializer(mcq.app)
+
+def read_cookie(headers):
+    raw = headers.get(b'cookie')
+    if not raw: return {}
+    try: morsel = SimpleCookie(raw.decode('latin-1')).get(SESSION_COOKIE)
+    except CookieError: return {}
+    if morsel is None: return {}
+    try: return SIGNER.loads(morsel.value, max_age=int(mcq.app.permanent_session_lifetime.total_seconds()))
+    except BadSignature: return {}
+
+def session_cookie(data):
+    config = mcq.app.config
+    parts = [f'{SESSION_COOKIE}={SIGNER.dumps(data)}', 'HttpOnly',
+             f"Path={config['SESSION_COOKIE_PATH'] or config['APPLICATION_ROOT']}"]
+    if config['SESSION_COOKIE_SECURE']: parts.append('Secure')
+    if config['SESSION_COOKIE_SAMESITE']: parts.append(f"SameSite={config['SESSION_COOKIE_SAMESITE']}")
+    return '; '.join(parts)
+
+# --- Exam API ---
+# Handlers take the decoded cookie and the posted data and return
+# (status, reply, new cookie contents or None). Exam steps run in the I/O
+# pool too: besides grading they revalidate the bank against the store, and
+# buffer item statistics or (adaptive exams) read item_stats.db.
+
+async def current_session(cookie):
+    """(sid, session record, None) or (None, None, error reply)."""
+    if not cookie.get('authenticated'): return None, None, (401, {'error': 'not authenticated'}, None)
+    sid = cookie.get('sid')
+    sess = await run_io(mcq.SESSIONS.get, sid) if sid and mcq.SID_RE.match(sid) else None
+    if not sess: return None, None, (404, {'error': 'no active session'}, None)
+    return sid, sess, None
+
+async def start_session(cookie, data):
+    if data.get('access_pin') != mcq.ACCESS_PIN: return 403, {'error': 'invalid PIN'}, None
+    exam = mcq.exam_request(data)
+    sess = await run_io(mcq.new_exam, **exam)
+    if not sess: return 404, {'error': 'no questions found for this subject'}, None
+    sid = cookie.get('sid')
+    if not (sid and mcq.SID_RE.match(sid)): sid = mcq.new_session_id()
+    await SESSION_WRITES.submit((sid, sess))
+    reply = await run_io(mcq.exam_started, sess, URLS['offline_exam' if sess['mode'] == 'offline' else 'practice'])
+    return 200, reply, dict(cookie, sid=sid, user_name=sess['user_name'], authenticated=True)
+
+async def answer(cookie, data):
+    sid, sess, error = await current_session(cookie)
+    if error: return error
+    reply, status, changed = await run_io(mcq.answer_current, sess, data, URLS['end'])
+    if changed: await SESSION_WRITES.submit((sid, sess))
+    return status, reply, None
+
+async def end(cookie, data):
+    sid, sess, error = await current_session(cookie)
+    if error: return error
+    graded, record, changed = await run_io(mcq.finish_exam, sess, cookie.get('user_name'))
+    writes = [SCORE_WRITES.submit(record)]
+    if changed: writes.append(SESSION_WRITES.submit((sid, sess)))
+    await asyncio.gather(*writes)
+    return 200, dict(graded, total=sess['limit'], redirect=URLS['review']), None
+
+ROUTES = {'/api/start_session': start_session, '/api/answer': answer, '/api/end': end}
+
+# --- ASGI Plumbing ---
+
+async def read_body(receive, limit=None):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if limit is not None and len(body) > limit: return None
+        if not message.get('more_body'): return body
+
+def parse_data(headers, body):
+    if headers.get(b'content-type', b'').startswith(b'application/json'):
+        try: data = json.loads(body or b'{}')
+        except ValueError: return {}
+        return data if isinstance(data, dict) else {}
+    return dict(parse_qsl(body.decode('utf-8', 'replace')))
+
+async def respond(send, status, reply, cookie=None):
+    body = json.dumps(reply).encode('utf-8')
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    if cookie is not None: headers += [(b'set-cookie', session_cookie(cookie).encode('latin-1')), (b'vary', b'Cookie')]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+def wsgi_environ(scope, body):
+    root = scope.get('root_path', '')
+    path = scope['path'][len(root):] if scope['path'].startswith(root) else scope['path']
+    host, port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': host,
+        'SERVER_PORT': str(port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope['headers']:
+        key, value = name.decode('latin-1').upper().replace('-', '_'), value.decode('latin-1')
+        if key == 'CONTENT_TYPE': environ[key] = value
+        elif key != 'CONTENT_LENGTH':
+            key = 'HTTP_' + key
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+def run_wsgi(environ):
+    started = {}
+    chunks = []
+    def start_response(status, headers, exc_info=None):
+        started['status'], started['headers'] = status, headers
+        return chunks.append
+    result = mcq.app(environ, start_response)
+    try: chunks.extend(result)
+    finally:
+        if hasattr(result, 'close'): result.close()
+    return int(started['status'].split()[0]), started['headers'], b''.join(chunks)
+
+async def call_flask(scope, receive, send):
+    """Serve a request with the Flask app in the I/O pool (whole body buffered)."""
+    status, headers, body = await run_io(run_wsgi, wsgi_environ(scope, await read_body(receive)))
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]})
+    await send({'type': 'http.response.body', 'body': body})
+
+# --- Lifespan ---
+
+FLUSHER = None
+
+async def flush_item_stats():
+    while True:
+        await asyncio.sleep(0.5)
+        if mcq.ITEM_STATS.due(): await run_io(mcq.ITEM_STATS.flush)
+
+async def startup():
+    global FLUSHER
+    mcq.ITEM_STATS.auto_flush = False   # batches go to item_stats.db from the flusher task, not from the loop
+    FLUSHER = asyncio.create_task(flush_item_stats())
+    await run_io(mcq.get_bank)
+
+async def shutdown():
+    global FLUSHER
+    if FLUSHER: FLUSHER.cancel()
+    FLUSHER = None
+    mcq.ITEM_STATS.auto_flush = True
+    await run_io(mcq.flush_buffers)
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await startup()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await shutdown()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan': return await lifespan(receive, send)
+    if scope['type'] != 'http': return
+    handler = ROUTES.get(scope['path']) if scope['method'] == 'POST' else None
+    if handler is None: return await call_flask(scope, receive, send)
+    start = time.perf_counter()
+    headers = dict(scope['headers'])
+    body = await read_body(receive, MAX_BODY)
+    if body is None: return await respond(send, 413, {'error': 'request body too large'})
+    status, reply, cookie = await handler(read_cookie(headers), parse_data(headers, body))
+    await respond(send, status, reply, cookie)
+    metrics.REQUEST_LATENCY.observe(scope['path'], time.perf_counter() - start)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='asgi.py', description='Run MCQ Master Suite under an ASGI server (uvicorn).')
+    parser.add_argument('--bind', default=os.environ.get('MCQ_BIND', '0.0.0.0:8000'), help='host:port to listen on')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('MCQ_WORKERS', 1)), help='worker processes')
+    args = parser.parse_args(argv)
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit('asgi.py needs an ASGI server: pip install uvicorn (or point any ASGI server at asgi:application).')
+    if args.workers > 1 and mcq.SESSION_BACKEND == 'memory':
+        sys.exit('MCQ_SESSION_BACKEND=memory is per-process; use file or sqlite with more than one worker.')
+    if args.workers > 1 and mcq.DURABILITY == 'async':
+        sys.exit('MCQ_DURABILITY=async keeps writes in one process; use group or fsync with more than one worker.')
+    if not os.path.exists(mcq.DATA_FILE): mcq.save_questions([])
+    host, _, port = args.bind.rpartition(':')
+    print(f'Serving on http://{host or "0.0.0.0"}:{port} with uvicorn ({args.workers} workers, asyncio exam API)')
+    uvicorn.run('asgi:application', host=host or '0.0.0.0', port=int(port), workers=args.workers,
+                lifespan='on', app_dir=os.path.dirname(os.path.abspath(__file__)))
+
+if __name__ == '__main__':
+    main()
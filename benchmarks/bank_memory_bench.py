@@ -0,0 +1,117 @@
+"""
+Question bank memory benchmark: list of dicts vs QuestionTable.
+
+Builds N synthetic questions from JSON (as the bank does when it reads
+questions.json) and holds them, in a fresh subprocess per layout, either
+- dicts: the previous bank layout, a list of question dicts plus the
+  ids list, the by_id dict and per-subject id lists, or
+- table: questiontable.QuestionTable, typed columns and one UTF-8 pool.
+
+Reports the time to parse and build the bank, the memory it retains
+(tracemalloc) and bytes per question, the RSS added, and the cost of a lookup
+by id afterwards.
+
+Usage:
+    python benchmarks/bank_memory_bench.py --size 1000000
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+sys.path.insert(0, ROOT)
+
+from snapshot_bench import rss_mb
+
+def synthetic_json(size, subjects=10):
+    return json.dumps([{'question': f'Synthetic question {i}: which of these options is the correct one?',
+                        'options': [f'Option A{i}', f'Option B{i}', f'Option C{i}', f'Option D{i}'],
+                        'answer': i % 4 + 1, 'subject': f'Subject {i % subjects}', 'id': i + 1}
+                       for i in range(size)])
+
+class DictBank:
+    """The list-of-dicts layout the bank used before QuestionTable."""
+    def __init__(self, qs):
+        by_subject = {}
+        for q in qs: by_subject.setdefault(q.get('subject', 'General'), []).append(q['id'])
+        self.questions = qs
+        self.ids = [q['id'] for q in qs]
+        self.by_id = {q['id']: q for q in qs}
+        self.by_subject = by_subject
+
+    def get(self, qid):
+        return self.by_id.get(qid)
+
+def build(layout, data):
+    from questiontable import QuestionTable
+    qs = json.loads(data)
+    return DictBank(qs) if layout == 'dicts' else QuestionTable.from_questions(qs)
+
+def run_child(args):
+    data = synthetic_json(args.size)
+    gc.collect()
+    before_rss = rss_mb()
+    t = time.perf_counter()
+    bank = build(args.layout, data)
+    build_s = time.perf_counter() - t
+    gc.collect()
+    after_rss = rss_mb()
+
+    # Retained memory in a second, traced build (tracemalloc slows allocation down)
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    traced = build(args.layout, data)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced
+
+    rng = random.Random(1)
+    qids = [rng.randint(1, args.size) for _ in range(args.lookups)]
+    t = time.perf_counter()
+    for qid in qids: assert bank.get(qid)['id'] == qid
+    lookup = time.perf_counter() - t
+    print(json.dumps({
+        'layout': args.layout,
+        'questions': args.size,
+        'build_s': round(build_s, 3),
+        'retained_mb': round((retained - base) / 2**20, 1),
+        'bytes_per_question': round((retained - base) / args.size),
+        'rss_added_mb': round(after_rss - before_rss, 1),
+        'lookup_us': round(lookup / len(qids) * 1e6, 2),
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=10000, help='random questions fetched by id afterwards')
+    parser.add_argument('--layout', help=argparse.SUPPRESS)   # child mode
+    args = parser.parse_args()
+    if args.layout:
+        run_child(args)
+        return
+
+    results = []
+    for layout in ('dicts', 'table'):
+        cmd = [sys.executable, os.path.abspath(__file__), '--layout', layout,
+               '--size', str(args.size), '--lookups', str(args.lookups)]
+        out = subprocess.run(cmd, capture_output=True, text=True)
+        if out.returncode != 0: sys.exit(f'{layout} run failed:\n{out.stderr}')
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f'{args.size:,} questions')
+    print(f'{"layout":<8}{"retained":>12}{"per question":>14}{"RSS added":>12}{"build":>9}{"lookup":>11}')
+    for r in results:
+        print(f'{r["layout"]:<8}{r["retained_mb"]:>10.1f}MB{r["bytes_per_question"]:>12,}B'
+              f'{r["rss_added_mb"]:>10.1f}MB{r["build_s"]:>8.2f}s{r["lookup_us"]:>9.2f}us')
+
+if __name__ == '__main__':
+    main()
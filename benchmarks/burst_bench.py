@@ -0,0 +1,185 @@
+"""
+Timer-expiry burst benchmark: WSGI (app.py) vs ASGI (asgi.py) exam API.
+
+N candidates start an exam and answer all but its last question. Then the
+timer runs out for all of them at the same moment: every candidate posts
+the last answer as timed out (/api/answer) and immediately ends the exam
+(/api/end). Reports the latency from the moment of expiry until each
+candidate's /api/end reply (p50/p99/max), i.e. the wait a candidate sees.
+
+- wsgi: the Flask routes in app.py called through WSGI by a pool of
+  --threads threads, like one gunicorn gthread worker; requests beyond the
+  pool wait in the queue, as they would in the listen backlog
+- asgi: asgi.application called on one asyncio event loop, like one uvicorn
+  worker; session and score writes are group committed
+
+Both run in process (no sockets) against the same data files, one fresh
+subprocess and data dir per server and burst size. The local disk may fsync
+much faster than the one the app is deployed on; --fsync-ms adds a sleep to
+every os.fsync to emulate a slower disk (the file session store and
+scores.jsonl fsync through os.fsync).
+
+Usage:
+    python benchmarks/burst_bench.py --bursts 50,200,500 --fsync-ms 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+
+from flow_bench import write_bank
+from loadtest import PIN, percentile
+
+def start_form(i, questions):
+    return dict(user_name=f'candidate{i}', access_pin=PIN, subject='all', difficulty='medium', mode='exam',
+                num_questions=questions)
+
+class WsgiCandidate:
+    def __init__(self, app):
+        self.app = app
+        self.cookie = ''
+
+    def post(self, path, form=None):
+        from werkzeug.test import EnvironBuilder, run_wsgi_app
+        builder = EnvironBuilder(path=path, method='POST', data=form or {}, headers={'Cookie': self.cookie} if self.cookie else {})
+        try: body, status, headers = run_wsgi_app(self.app, builder.get_environ(), buffered=True)
+        finally: builder.close()
+        data = b''.join(body)
+        cookie = headers.get('Set-Cookie')
+        if cookie: self.cookie = cookie.split(';', 1)[0]
+        return int(status.split()[0]), json.loads(data)
+
+class AsgiCandidate:
+    def __init__(self, application):
+        self.application = application
+        self.cookie = ''
+
+    async def post(self, path, form=None):
+        body = urlencode(form or {}).encode()
+        headers = [(b'content-type', b'application/x-www-form-urlencoded')]
+        if self.cookie: headers.append((b'cookie', self.cookie.encode('latin-1')))
+        scope = {'type': 'http', 'method': 'POST', 'path': path, 'root_path': '', 'query_string': b'',
+                 'headers': headers, 'http_version': '1.1', 'scheme': 'http', 'server': ('bench', 80)}
+        sent = []
+        async def receive(): return {'type': 'http.request', 'body': body, 'more_body': False}
+        async def send(message): sent.append(message)
+        await self.application(scope, receive, send)
+        cookie = dict(sent[0]['headers']).get(b'set-cookie')
+        if cookie: self.cookie = cookie.decode('latin-1').split(';', 1)[0]
+        return sent[0]['status'], json.loads(sent[1]['body'])
+
+def check(status, reply):
+    if status != 200: raise RuntimeError(f'{status}: {reply}')
+    return reply
+
+def run_wsgi(mcq, args):
+    candidates = [WsgiCandidate(mcq.app) for _ in range(args.burst)]
+    def prepare(i):
+        c = candidates[i]
+        check(*c.post('/api/start_session', start_form(i, args.questions)))
+        for pos in range(args.questions - 1): check(*c.post('/api/answer', dict(choice='1', pos=pos)))
+    def expire(c, t0):
+        check(*c.post('/api/answer', dict(is_timeout='1', pos=args.questions - 1)))
+        check(*c.post('/api/end'))
+        return time.perf_counter() - t0
+    with ThreadPoolExecutor(args.threads) as pool:
+        list(pool.map(prepare, range(args.burst)))
+        t0 = time.perf_counter()
+        return list(pool.map(expire, candidates, [t0] * args.burst))
+
+def run_asgi(asgi, args):
+    async def main():
+        await asgi.startup()
+        candidates = [AsgiCandidate(asgi.application) for _ in range(args.burst)]
+        async def prepare(i):
+            c = candidates[i]
+            check(*await c.post('/api/start_session', start_form(i, args.questions)))
+            for pos in range(args.questions - 1): check(*await c.post('/api/answer', dict(choice='1', pos=pos)))
+        async def expire(c, t0):
+            check(*await c.post('/api/answer', dict(is_timeout='1', pos=args.questions - 1)))
+            check(*await c.post('/api/end'))
+            return time.perf_counter() - t0
+        await asyncio.gather(*(prepare(i) for i in range(args.burst)))
+        t0 = time.perf_counter()
+        waits = await asyncio.gather(*(expire(c, t0) for c in candidates))
+        await asgi.shutdown()
+        return waits
+    return asyncio.run(main())
+
+def run_child(args):
+    os.environ['MCQ_DATA_DIR'] = args.data_dir
+    sys.path.insert(0, ROOT)
+    if args.fsync_ms:
+        real_fsync = os.fsync
+        def slow_fsync(fd):
+            real_fsync(fd)
+            time.sleep(args.fsync_ms / 1000)
+        os.fsync = slow_fsync
+    import app as mcq
+    mcq.get_bank()
+    if args.server == 'asgi':
+        import asgi
+        waits = run_asgi(asgi, args)
+    else:
+        waits = run_wsgi(mcq, args)
+    with open(mcq.SCORES_LOG, 'rb') as f: scores = sum(1 for _ in f)
+    if scores != args.burst: raise RuntimeError(f'{scores} scores recorded for {args.burst} candidates')
+    print(json.dumps({
+        'server': args.server,
+        'burst': args.burst,
+        'p50_ms': round(percentile(waits, 50) * 1000, 1),
+        'p99_ms': round(percentile(waits, 99) * 1000, 1),
+        'max_ms': round(max(waits) * 1000, 1),
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bursts', default='50,200,500', help='candidates whose timer expires together')
+    parser.add_argument('--questions', type=int, default=10)
+    parser.add_argument('--size', type=int, default=5000, help='questions in the bank')
+    parser.add_argument('--threads', type=int, default=16, help='WSGI worker threads')
+    parser.add_argument('--fsync-ms', type=float, default=0.0, help='extra latency per os.fsync (emulated disk)')
+    parser.add_argument('--backend', default='file', help='MCQ_SESSION_BACKEND for both servers')
+    parser.add_argument('--server', help=argparse.SUPPRESS)   # child mode
+    parser.add_argument('--burst', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--data-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.server:
+        run_child(args)
+        return
+
+    results = []
+    for burst in [int(n) for n in args.bursts.split(',')]:
+        for server in ('wsgi', 'asgi'):
+            data_dir = tempfile.mkdtemp(prefix='mcq-burst-')
+            try:
+                write_bank(os.path.join(data_dir, 'questions.json'), args.size)
+                cmd = [sys.executable, os.path.abspath(__file__), '--server', server, '--burst', str(burst),
+                       '--data-dir', data_dir, '--questions', str(args.questions), '--threads', str(args.threads),
+                       '--fsync-ms', str(args.fsync_ms)]
+                out = subprocess.run(cmd, capture_output=True, text=True,
+                                     env=dict(os.environ, MCQ_SESSION_BACKEND=args.backend))
+                if out.returncode != 0: sys.exit(f'{server} burst of {burst} failed:\n{out.stderr}')
+                results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+            finally:
+                shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(f'{args.backend} sessions, {args.questions} questions, wsgi with {args.threads} threads, '
+          f'+{args.fsync_ms:g} ms per fsync; wait from timer expiry to /api/end reply')
+    print(f'{"server":<8}{"burst":>7}{"p50":>11}{"p99":>11}{"max":>11}')
+    for r in results:
+        print(f'{r["server"]:<8}{r["burst"]:>7}{r["p50_ms"]:>9.1f}ms{r["p99_ms"]:>9.1f}ms{r["max_ms"]:>9.1f}ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+End-to-end quiz flow benchmark.
+
+Simulates N concurrent candidates each running the full flow
+    start_session -> practice -> (answer -> practice) x K -> end -> review
+against synthetic banks of the given sizes. Reports p50/p95/p99 latency per
+route, throughput and peak RSS, and writes the results as JSON so runs can be
+diffed between versions.
+
+Each bank size runs in a fresh subprocess with its own temporary data dir,
+using Flask's test client (in-process) or, with --url, a running server.
+
+Usage:
+    python benchmarks/flow_bench.py --sizes 1000,100000 --users 20 --questions 10 --output before.json
+    python benchmarks/flow_bench.py --sizes 1000,100000 --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+
+from loadtest import PIN, Client, percentile
+
+ROUTES = ['/start_session', '/practice', '/answer', '/end', '/review']
+
+def write_bank(path, size, subjects=10):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for i in range(size):
+            q = {'question': f'Synthetic question {i}: which option is correct?',
+                 'options': [f'Option A{i}', f'Option B{i}', f'Option C{i}', f'Option D{i}'],
+                 'answer': i % 4 + 1, 'subject': f'Subject {i % subjects}', 'id': i + 1}
+            f.write((',' if i else '') + json.dumps(q))
+        f.write(']')
+
+def peak_rss_mb():
+    if resource is None: return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+class TestClientDriver:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, form=None):
+        resp = self.client.open(path, method=method, data=form)
+        return resp.status_code, resp.headers.get('Location', '')
+
+def candidate(make_client, questions, timings, errors):
+    c = make_client()
+    local = {route: [] for route in ROUTES}
+    def hit(route, method='GET', form=None, path=None):
+        t = time.perf_counter()
+        status, location = c.request(method, path or route, form)
+        local[route].append(time.perf_counter() - t)
+        return status, location
+    try:
+        hit('/start_session', 'POST', dict(user_name='bench', access_pin=PIN, subject='all',
+                                           difficulty='hard', mode='exam', num_questions=questions))
+        status, _ = hit('/practice')
+        while status == 200:
+            hit('/answer', 'POST', dict(choice='1', is_timeout='0'))
+            status, _ = hit('/practice')
+        hit('/end')
+        hit('/review')
+    except Exception as e:
+        errors.append(repr(e))
+    for route, samples in local.items():
+        timings[route].extend(samples)
+
+def run_child(args):
+    """Runs inside the subprocess for a single bank size; prints one JSON result."""
+    data_dir = tempfile.mkdtemp(prefix='mcq-flow-')
+    write_bank(os.path.join(data_dir, 'questions.json'), args.size)
+    os.environ['MCQ_DATA_DIR'] = data_dir
+    sys.path.insert(0, ROOT)
+
+    t = time.perf_counter()
+    import app as mcq
+    mcq.get_bank()
+    load_time = time.perf_counter() - t
+
+    if args.url:
+        parts = urlsplit(args.url)
+        make_client = lambda: Client(parts.hostname, parts.port or 80)
+    else:
+        make_client = lambda: TestClientDriver(mcq.app)
+
+    timings = {route: [] for route in ROUTES}
+    errors = []
+    threads = [threading.Thread(target=candidate, args=(make_client, args.questions, timings, errors))
+               for _ in range(args.users)]
+    start = time.perf_counter()
+    for th in threads: th.start()
+    for th in threads: th.join()
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(v) for v in timings.values())
+    result = {
+        'bank_size': args.size,
+        'users': args.users,
+        'questions': args.questions,
+        'driver': 'http' if args.url else 'testclient',
+        'bank_load_s': round(load_time, 4),
+        'elapsed_s': round(elapsed, 4),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 1) if elapsed else 0,
+        'peak_rss_mb': peak_rss_mb(),
+        'errors': len(errors),
+        'routes': {route: {
+            'count': len(samples),
+            'p50_ms': round(percentile(samples, 50) * 1000, 3),
+            'p95_ms': round(percentile(samples, 95) * 1000, 3),
+            'p99_ms': round(percentile(samples, 99) * 1000, 3),
+        } for route, samples in timings.items()},
+    }
+    print(json.dumps(result))
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_table(results, baseline=None):
+    base = {(r['bank_size'], r['users'], r['questions']): r for r in (baseline or {}).get('results', [])}
+    for r in results:
+        old = base.get((r['bank_size'], r['users'], r['questions']))
+        def delta(new, prev):
+            return f' ({(new - prev) / prev * 100:+.0f}%)' if prev else ''
+        print(f"\nbank={r['bank_size']:,} users={r['users']} questions={r['questions']} "
+              f"load={r['bank_load_s']}s rps={r['throughput_rps']}{delta(r['throughput_rps'], old and old['throughput_rps'])} "
+              f"peak_rss={r['peak_rss_mb']}MB errors={r['errors']}")
+        print(f'  {"route":<15} {"count":>7} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}')
+        for route, s in r['routes'].items():
+            prev = old and old['routes'].get(route)
+            print(f"  {route:<15} {s['count']:>7} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f}"
+                  f"{delta(s['p99_ms'], prev and prev['p99_ms'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the full quiz flow against synthetic banks.')
+    parser.add_argument('--sizes', default='1000,100000,1000000', help='comma-separated bank sizes')
+    parser.add_argument('--users', type=int, default=20, help='concurrent candidates')
+    parser.add_argument('--questions', type=int, default=10, help='questions answered per candidate (K)')
+    parser.add_argument('--url', help='drive a running server over HTTP instead of the test client')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--compare', help='previous results JSON to diff against')
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)   # child mode
+    args = parser.parse_args()
+
+    if args.size is not None:
+        run_child(args)
+        return
+
+    results = []
+    for size in [int(x) for x in args.sizes.split(',') if x]:
+        cmd = [sys.executable, os.path.abspath(__file__), '--size', str(size),
+               '--users', str(args.users), '--questions', str(args.questions)]
+        if args.url: cmd += ['--url', args.url]
+        env = dict(os.environ, MCQ_SESSION_BACKEND=os.environ.get('MCQ_SESSION_BACKEND', 'memory'))
+        out = subprocess.run(cmd, capture_output=True, text=True, env=env)
+        if out.returncode != 0:
+            sys.exit(f'bank size {size} failed:\n{out.stderr}')
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    report = {
+        'meta': {'revision': git_revision(), 'python': platform.python_version(), 'platform': platform.platform(),
+                 'session_backend': os.environ.get('MCQ_SESSION_BACKEND', 'memory'),
+                 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'results': results,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f: baseline = json.load(f)
+    print_table(results, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f: json.dump(report, f, indent=2)
+        print(f'\nwrote {args.output}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Bulk grading benchmark.
+
+Grades N random answer sheets with grading.grade_sheets() (NumPy when
+installed) and checks a sample of them against the per-question rule used by
+the /answer route.
+
+Usage:
+    python benchmarks/grading_bench.py --sheets 100000 --questions 50 --difficulty hard
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import grading
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sheets', type=int, default=100000)
+    parser.add_argument('--questions', type=int, default=50)
+    parser.add_argument('--options', type=int, default=4)
+    parser.add_argument('--difficulty', default='hard')
+    parser.add_argument('--check', type=int, default=1000, help='sheets re-graded one question at a time')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    key = [rng.randint(1, args.options) for _ in range(args.questions)]
+    t = time.perf_counter()
+    if grading.np is not None:
+        gen = grading.np.random.default_rng(args.seed)
+        responses = gen.integers(0, args.options + 1, size=(args.sheets, args.questions))
+        timeouts = gen.random((args.sheets, args.questions)) < 0.05
+    else:
+        responses = [[rng.randint(0, args.options) for _ in key] for _ in range(args.sheets)]
+        timeouts = [[rng.random() < 0.05 for _ in key] for _ in range(args.sheets)]
+    build = time.perf_counter() - t
+
+    t = time.perf_counter()
+    result = grading.grade_sheets(key, responses, args.difficulty, timeouts)
+    elapsed = time.perf_counter() - t
+
+    mismatches = 0
+    for i in range(min(args.check, args.sheets)):
+        score = correct = 0
+        for j, choice in enumerate(responses[i]):
+            ok, delta = grading.grade_answer(key[j], int(choice), bool(timeouts[i][j]), args.difficulty)
+            score += delta
+            correct += ok
+        if score != result['score'][i] or correct != result['correct'][i]: mismatches += 1
+
+    engine = 'numpy' if grading.np is not None else 'python'
+    print(f'{args.sheets:,} sheets x {args.questions} questions ({engine}): generated in {build:.2f}s, '
+          f'graded in {elapsed:.3f}s ({args.sheets / elapsed:,.0f} sheets/s)')
+    print(f'mean score {sum(result["score"]) / args.sheets:.2f}, mean accuracy {sum(result["accuracy"]) / args.sheets:.1f}%')
+    print(f'{min(args.check, args.sheets)} sheets checked against grade_answer(): {mismatches} mismatches')
+    if mismatches: sys.exit(1)
+
+if __name__ == '__main__':
+    main()
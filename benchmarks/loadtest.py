@@ -0,0 +1,90 @@
+"""
+HTTP load test for a running server (e.g. `python app.py serve`).
+
+Each virtual user keeps one keep-alive connection, starts a session and then
+loops GET /practice + POST /answer until the duration is up. Prints
+requests/sec and latency for both routes.
+
+Usage:
+    python benchmarks/loadtest.py --url http://127.0.0.1:8000 --users 50 --duration 20
+"""
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+PIN = '1234'
+
+class Client:
+    def __init__(self, host, port):
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+        self.cookie = None
+
+    def request(self, method, path, form=None):
+        headers = {}
+        body = None
+        if self.cookie: headers['Cookie'] = self.cookie
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        self.conn.request(method, path, body=body, headers=headers)
+        resp = self.conn.getresponse()
+        resp.read()
+        cookie = resp.getheader('Set-Cookie')
+        if cookie: self.cookie = cookie.split(';', 1)[0]
+        return resp.status, resp.getheader('Location') or ''
+
+def percentile(samples, p):
+    if not samples: return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+def user(url, deadline, questions, results, errors):
+    parts = urlsplit(url)
+    client = Client(parts.hostname, parts.port or 80)
+    local = {'/practice': [], '/answer': []}
+    try:
+        while time.time() < deadline:
+            client.request('POST', '/start_session', dict(user_name='load', access_pin=PIN, subject='all',
+                                                          difficulty='medium', mode='exam', num_questions=questions))
+            while time.time() < deadline:
+                t = time.perf_counter()
+                status, location = client.request('GET', '/practice')
+                local['/practice'].append(time.perf_counter() - t)
+                if status != 200: break   # redirected to /end: exam finished
+                t = time.perf_counter()
+                client.request('POST', '/answer', dict(choice='1', is_timeout='0'))
+                local['/answer'].append(time.perf_counter() - t)
+    except (OSError, http.client.HTTPException) as e:
+        errors.append(repr(e))
+    for route, samples in local.items():
+        results[route].extend(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--questions', type=int, default=20, help='questions per exam')
+    args = parser.parse_args()
+
+    results = {'/practice': [], '/answer': []}
+    errors = []
+    deadline = time.time() + args.duration
+    threads = [threading.Thread(target=user, args=(args.url, deadline, args.questions, results, errors))
+               for _ in range(args.users)]
+    start = time.time()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.time() - start
+
+    print(f'{args.users} users, {elapsed:.1f}s against {args.url}')
+    print(f'{"route":<10} {"requests":>9} {"req/s":>9} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+    for route, samples in results.items():
+        print(f'{route:<10} {len(samples):>9} {len(samples) / elapsed:>9.1f} '
+              f'{percentile(samples, 50) * 1000:>8.1f} {percentile(samples, 95) * 1000:>8.1f} {percentile(samples, 99) * 1000:>8.1f}')
+    if errors: print(f'{len(errors)} users failed, e.g. {errors[0]}')
+
+if __name__ == '__main__':
+    main()
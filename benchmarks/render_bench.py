@@ -0,0 +1,89 @@
+"""
+Template render benchmark for /practice and /review.
+
+Compares the old per-request path (render_template_string on the page content,
+then again on BASE_LAYOUT) with the precompiled DictLoader templates.
+
+Usage:
+    python benchmarks/render_bench.py --iterations 500
+"""
+import argparse
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from flask import render_template, render_template_string, template_rendered
+
+def legacy_source(mcq, name):
+    # Rebuild the pre-inheritance sources: bare content + a base that injects it.
+    if name == 'base.html':
+        return mcq.BASE_LAYOUT.replace('{% block content %}{% endblock %}', '{{ content | safe }}')
+    src = mcq.TEMPLATES[name]
+    for tag in ('{% extends "base.html" %}', '{% block content %}', '{% endblock %}'):
+        src = src.replace(tag, '')
+    return src
+
+def capture_contexts(mcq):
+    """Run one real session and record the context each page was rendered with."""
+    client = mcq.app.test_client()
+    seen = {}
+    def record(sender, template, context, **extra):
+        seen.setdefault(template.name, dict(context))
+    template_rendered.connect(record, mcq.app)
+    client.post('/start_session', data=dict(user_name='bench', access_pin=mcq.ACCESS_PIN, subject='all',
+                                            difficulty='medium', mode='practice', num_questions='10'))
+    client.get('/practice')
+    for _ in range(10):
+        client.post('/answer', data=dict(choice='1', is_timeout='0'))
+    client.get('/end')
+    client.get('/review')
+    template_rendered.disconnect(record, mcq.app)
+    return seen
+
+def timed(fn, n):
+    fn()  # warm up
+    samples = []
+    for _ in range(n):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    samples.sort()
+    return sum(samples) / n, samples[n // 2]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=500, help='renders per page and path')
+    n = parser.parse_args().iterations
+
+    # Run against a throwaway copy of the bank so scores/sessions don't touch real data.
+    # Registered before the app is imported, so it runs after the app's own exit-time flushes
+    data_dir = tempfile.mkdtemp(prefix='mcq-bench-')
+    atexit.register(shutil.rmtree, data_dir, ignore_errors=True)
+    os.environ.setdefault('MCQ_SESSION_BACKEND', 'memory')
+    os.environ['MCQ_DATA_DIR'] = data_dir
+    shutil.copy(os.path.join(ROOT, 'questions.json'), data_dir)
+    import app as mcq
+
+    contexts = capture_contexts(mcq)
+    base_src = legacy_source(mcq, 'base.html')
+    print(f'{"page":<14} {"path":<8} {"mean (ms)":>10} {"p50 (ms)":>10}')
+    for name in ('practice.html', 'review.html'):
+        ctx = {k: v for k, v in contexts[name].items() if k not in ('g', 'request', 'session', 'config')}
+        src = legacy_source(mcq, name)
+        with mcq.app.test_request_context('/'):
+            def before():
+                return render_template_string(base_src, content=render_template_string(src, **ctx))
+            def after():
+                return render_template(name, **ctx)
+            for label, fn in (('before', before), ('after', after)):
+                mean, p50 = timed(fn, n)
+                print(f'{name:<14} {label:<8} {mean * 1000:>10.3f} {p50 * 1000:>10.3f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Shared question bank benchmark: memory of W forked workers.
+
+Starts a master process per layout, forks W workers from it the way
+'python app.py serve' (gunicorn with preload) does, lets every worker look
+up questions and sample exams, then sums the proportional set size (PSS) of
+the master and all workers: pages shared by k processes count 1/k towards
+each, so the total is the real memory used. Then one worker appends
+questions and every worker reloads the bank, and the total is taken again.
+The same processes with an empty bank are measured first; "x bank" is what
+each layout adds over that, in multiples of one copy of the question table.
+
+Layouts:
+- private:  every worker loads the bank itself after the fork
+- preload:  the master loads the in-memory question table before forking
+- snapshot: the master maps questions.snap before forking (MCQ_SNAPSHOT=1);
+            the reload re-maps the snapshot published by the appending worker
+
+Linux only (reads /proc/<pid>/smaps_rollup).
+
+Usage:
+    python benchmarks/shared_bank_bench.py --size 200000 --workers 8
+"""
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+sys.path.insert(0, ROOT)
+
+from flow_bench import write_bank
+
+LAYOUTS = ('private', 'preload', 'snapshot')
+
+def pss_mb(pid):
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            if line.startswith('Pss:'): return int(line.split()[1]) / 1024
+    return 0.0
+
+def worker(conn, mcq):
+    while True:
+        cmd = conn.recv()
+        if cmd == 'exit': return
+        if cmd == 'append':
+            mcq.append_questions([{'question': f'Appended question {i}?', 'options': ['a', 'b', 'c', 'd'],
+                                   'answer': 1, 'subject': 'Appended'} for i in range(1000)])
+        bank = mcq.get_bank()
+        rng = random.Random(os.getpid())
+        for _ in range(2000 if bank.ids else 0): bank.get(bank.ids[rng.randrange(len(bank.ids))])
+        for seed in range(100): mcq.sample_exam('all', 50, seed)
+        gc.collect()
+        conn.send(len(bank.ids))
+
+def run_child(args):
+    os.environ['MCQ_DATA_DIR'] = args.data_dir
+    os.environ['MCQ_SNAPSHOT'] = '1' if args.layout == 'snapshot' else '0'
+    import app as mcq
+    if args.layout != 'private':
+        mcq.get_bank()
+        gc.freeze()
+    ctx = multiprocessing.get_context('fork')
+    conns, procs = [], []
+    for _ in range(args.workers):
+        mine, theirs = ctx.Pipe()
+        proc = ctx.Process(target=worker, args=(theirs, mcq))
+        proc.start()
+        conns.append(mine)
+        procs.append(proc)
+
+    def broadcast(cmd):
+        for c in conns: c.send(cmd)
+        return [c.recv() for c in conns]
+
+    def total_pss():
+        return round(pss_mb(os.getpid()) + sum(pss_mb(p.pid) for p in procs), 1)
+
+    counts = broadcast('touch')
+    loaded = total_pss()
+    conns[0].send('append')
+    conns[0].recv()
+    reloaded_counts = broadcast('touch')
+    reloaded = total_pss()
+    for c in conns: c.send('exit')
+    for p in procs: p.join()
+    print(json.dumps({
+        'layout': args.layout,
+        'workers': args.workers,
+        'questions': counts[0],
+        'consistent': len(set(counts)) == 1 and len(set(reloaded_counts)) == 1 and reloaded_counts[0] == counts[0] + 1000,
+        'pss_mb': loaded,
+        'pss_after_reload_mb': reloaded,
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=200000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--layout', help=argparse.SUPPRESS)   # child mode
+    parser.add_argument('--data-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.layout:
+        run_child(args)
+        return
+    if not os.path.exists('/proc/self/smaps_rollup'): sys.exit('needs Linux /proc/<pid>/smaps_rollup')
+
+    import snapshot
+    from questiontable import QuestionTable
+    def run(layout, size):
+        data_dir = tempfile.mkdtemp(prefix='mcq-shared-')
+        try:
+            write_bank(os.path.join(data_dir, 'questions.json'), size)
+            cmd = [sys.executable, os.path.abspath(__file__), '--layout', layout, '--data-dir', data_dir,
+                   '--size', str(size), '--workers', str(args.workers)]
+            out = subprocess.run(cmd, capture_output=True, text=True,
+                                 env=dict(os.environ, MCQ_SESSION_BACKEND='memory'))
+            if out.returncode != 0: sys.exit(f'{layout} run failed:\n{out.stderr}')
+            return json.loads(out.stdout.strip().splitlines()[-1])
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_bank(os.path.join(tmp, 'questions.json'), args.size)
+        with open(os.path.join(tmp, 'questions.json'), 'rb') as f:
+            bank_mb = len(snapshot.encode(QuestionTable.from_questions(json.load(f)))) / 2**20
+    empty = run('preload', 0)
+    results = [run(layout, args.size) for layout in LAYOUTS]
+
+    print(f'{args.size:,} questions ({bank_mb:.0f} MB as a question table), master + {args.workers} workers, '
+          f'{empty["pss_mb"]:.0f} MB total PSS with an empty bank')
+    print(f'{"layout":<10}{"total PSS":>12}{"x bank":>8}{"after reload":>15}{"x bank":>8}  consistent')
+    for r in results:
+        loaded, reloaded = r['pss_mb'] - empty['pss_mb'], r['pss_after_reload_mb'] - empty['pss_after_reload_mb']
+        print(f'{r["layout"]:<10}{r["pss_mb"]:>10.1f}MB{loaded / bank_mb:>8.1f}'
+              f'{r["pss_after_reload_mb"]:>13.1f}MB{reloaded / bank_mb:>8.1f}  {r["consistent"]}')
+
+if __name__ == '__main__':
+    main()
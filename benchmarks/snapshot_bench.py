@@ -0,0 +1,122 @@
+"""
+Question bank load benchmark: questions.json vs questions.snap.
+
+Writes a synthetic pretty-printed questions.json of N questions (the format
+the app writes), converts it to a snapshot with snapshot.py, then starts the
+app's bank cache in a fresh subprocess per format and reports the time to
+load the bank, the RSS it added, and the cost of looking questions up by id
+and sampling an exam afterwards.
+
+The snapshot child runs with MCQ_SNAPSHOT=1 and must not parse the JSON at
+all; the run fails if it does. Both children read from the OS page cache, so
+this compares parsing cost, not disk speed.
+
+Usage:
+    python benchmarks/snapshot_bench.py --size 1000000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+sys.path.insert(0, ROOT)
+
+from flow_bench import peak_rss_mb
+
+def rss_mb():
+    """Current resident set size (peak RSS where /proc is not available)."""
+    try:
+        with open('/proc/self/statm') as f: pages = int(f.read().split()[1])
+        return round(pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+def write_pretty_bank(path, size, subjects=10):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[\n')
+        for i in range(size):
+            q = {'question': f'Synthetic question {i}: which of these options is the correct one?',
+                 'options': [f'Option A{i}', f'Option B{i}', f'Option C{i}', f'Option D{i}'],
+                 'answer': i % 4 + 1, 'subject': f'Subject {i % subjects}', 'id': i + 1}
+            f.write((',\n' if i else '') + '  ' + json.dumps(q, ensure_ascii=False, indent=2).replace('\n', '\n  '))
+        f.write('\n]')
+
+def run_child(args):
+    os.environ['MCQ_DATA_DIR'] = args.data_dir
+    os.environ['MCQ_SNAPSHOT'] = '1' if args.mode == 'snapshot' else '0'
+    import app as mcq
+    if args.mode == 'snapshot':
+        def refuse(self): raise AssertionError('snapshot run parsed questions.json')
+        mcq.JsonQuestionStore.read_all = refuse
+    before = rss_mb()
+    t = time.perf_counter()
+    bank = mcq.get_bank()
+    load = time.perf_counter() - t
+    after = rss_mb()
+
+    rng = random.Random(1)
+    qids = [rng.randint(1, args.size) for _ in range(args.lookups)]
+    t = time.perf_counter()
+    for qid in qids: assert bank.get(qid)['id'] == qid
+    lookup = time.perf_counter() - t
+    t = time.perf_counter()
+    for seed in range(100): mcq.sample_exam('all', 50, seed)
+    sample = time.perf_counter() - t
+    print(json.dumps({
+        'mode': args.mode,
+        'questions': len(bank.ids),
+        'load_ms': round(load * 1000, 3),
+        'rss_added_mb': round(after - before, 1),
+        'rss_mb': after,
+        'lookup_us': round(lookup / len(qids) * 1e6, 2),
+        'sample_exam_ms': round(sample / 100 * 1000, 3),
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=10000, help='random questions fetched by id after loading')
+    parser.add_argument('--keep', action='store_true', help='keep the temporary data dir')
+    parser.add_argument('--mode', help=argparse.SUPPRESS)       # child mode
+    parser.add_argument('--data-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        run_child(args)
+        return
+
+    import snapshot
+    data_dir = tempfile.mkdtemp(prefix='mcq-snap-')
+    json_path = os.path.join(data_dir, 'questions.json')
+    try:
+        t = time.perf_counter()
+        write_pretty_bank(json_path, args.size)
+        print(f'wrote {args.size:,} questions ({os.path.getsize(json_path) / 2**20:.0f} MB JSON) in {time.perf_counter() - t:.1f}s')
+        t = time.perf_counter()
+        snapshot.main([json_path])
+        print(f'converted in {time.perf_counter() - t:.1f}s ({os.path.getsize(os.path.join(data_dir, "questions.snap")) / 2**20:.0f} MB snapshot)')
+
+        results = []
+        for mode in ('json', 'snapshot'):
+            cmd = [sys.executable, os.path.abspath(__file__), '--mode', mode, '--data-dir', data_dir,
+                   '--size', str(args.size), '--lookups', str(args.lookups)]
+            out = subprocess.run(cmd, capture_output=True, text=True)
+            if out.returncode != 0: sys.exit(f'{mode} run failed:\n{out.stderr}')
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    finally:
+        if args.keep: print(f'data kept in {data_dir}')
+        else: shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(f'\n{"format":<10}{"load":>10}{"RSS added":>12}{"lookup":>12}{"sample_exam":>14}')
+    for r in results:
+        print(f'{r["mode"]:<10}{r["load_ms"]:>8.1f}ms{r["rss_added_mb"]:>10.1f}MB{r["lookup_us"]:>10.2f}us{r["sample_exam_ms"]:>12.3f}ms')
+
+if __name__ == '__main__':
+    main()
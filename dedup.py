@@ -0,0 +1,233 @@
+"""
+Duplicate detection for question imports.
+
+Every question gets two fingerprints:
+- an exact key: hash of the normalized question text plus its options in
+  sorted order (case, punctuation, spacing and option order are ignored)
+- a MinHash signature over word shingles of the same text, split into LSH
+  bands, so questions that are merely similar land in a shared bucket
+
+Fingerprints are stored in SQLite (fingerprints.db) with indexes on the exact
+key and the band buckets. Checking a chunk of rows is one indexed lookup per
+key, never a comparison against the whole bank. Bucket hits are confirmed by
+the estimated Jaccard similarity of the signatures.
+"""
+import hashlib
+import re
+import sqlitedb
+import struct
+import unicodedata
+
+try:
+    import numpy as np
+except ImportError:   # optional: pure-Python MinHash below
+    np = None
+
+NUM_PERM = 96
+BANDS = 16               # 16 bands x 6 rows: pairs above ~0.65 similarity usually share a bucket
+ROWS = NUM_PERM // BANDS
+NEAR_THRESHOLD = 0.8     # estimated Jaccard similarity that counts as a near-duplicate
+SHINGLE = 2              # words per shingle
+
+# Universal hashing (a*h + b) mod p with p just above 2**32 and a < 2**31,
+# so the products also fit in NumPy's uint64 when it is available
+_PRIME = 4294967311
+_MASK = (1 << 32) - 1
+_PERMS = []
+_seed = hashlib.sha256(b'mcq-minhash').digest()
+for _i in range(NUM_PERM):
+    _seed = hashlib.sha256(_seed).digest()
+    a, b = struct.unpack('<II', _seed[:8])
+    _PERMS.append((a % ((1 << 31) - 1) + 1, b))
+if np is not None:
+    _A = np.array([a for a, _ in _PERMS], dtype=np.uint64).reshape(-1, 1)
+    _B = np.array([b for _, b in _PERMS], dtype=np.uint64).reshape(-1, 1)
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+def normalize(text):
+    text = unicodedata.normalize('NFKC', str(text)).lower()
+    return ' '.join(WORD_RE.findall(text))
+
+def exact_key(q):
+    parts = [normalize(q.get('question', ''))] + sorted(normalize(o) for o in q.get('options', []))
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=8).hexdigest()
+
+def shingle_hashes(q):
+    words = normalize(' '.join([q.get('question', '')] + list(q.get('options', [])))).split()
+    if len(words) < SHINGLE: found = set(words) or {''}
+    else: found = {' '.join(words[i:i + SHINGLE]) for i in range(len(words) - SHINGLE + 1)}
+    return [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little') for s in found]
+
+def minhash_many(hash_lists, batch=1000):
+    """MinHash signatures for many shingle-hash lists: an (n, NUM_PERM) uint32
+    array with NumPy, otherwise a list of lists."""
+    if np is None:
+        return [[min((a * h + b) % _PRIME & _MASK for h in hashes) for a, b in _PERMS] for hashes in hash_lists]
+    out = np.empty((len(hash_lists), NUM_PERM), dtype=np.uint32)
+    for i in range(0, len(hash_lists), batch):
+        part = hash_lists[i:i + batch]
+        lengths = [len(h) for h in part]
+        flat = np.fromiter((h for hashes in part for h in hashes), dtype=np.uint64, count=sum(lengths))
+        starts = np.cumsum([0] + lengths[:-1])
+        values = ((_A * flat.reshape(1, -1) + _B) % _PRIME) & _MASK
+        out[i:i + len(part)] = np.minimum.reduceat(values, starts, axis=1).T
+    return out
+
+# Band buckets: each band's ROWS values folded into one 63-bit key (fits a
+# SQLite INTEGER) with a multiply/xor-shift mix; arithmetic is mod 2**64 in
+# both the NumPy and the pure-Python version so the keys are identical
+_MIX = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+def band_keys_many(signatures):
+    if np is None:
+        rows = []
+        for sig in signatures:
+            keys = []
+            for band in range(BANDS):
+                h = band + 1
+                for x in sig[band * ROWS:(band + 1) * ROWS]: h = ((h ^ x) * _MIX) & _MASK64
+                keys.append((h ^ (h >> 29)) >> 1)
+            rows.append(keys)
+        return rows
+    sig = signatures.astype(np.uint64)
+    keys = np.empty((len(sig), BANDS), dtype=np.uint64)
+    mix, shift = np.uint64(_MIX), np.uint64(29)
+    for band in range(BANDS):
+        h = np.full(len(sig), band + 1, dtype=np.uint64)
+        for r in range(band * ROWS, (band + 1) * ROWS): h = (h ^ sig[:, r]) * mix
+        keys[:, band] = (h ^ (h >> shift)) >> np.uint64(1)
+    return keys.tolist()
+
+def closest(packed, candidates):
+    """Best (similarity, key) among [(key, packed signature)], or None."""
+    if not candidates: return None
+    if np is not None:
+        others = np.frombuffer(b''.join(blob for _, blob in candidates), dtype='<u4').reshape(-1, NUM_PERM)
+        sims = (others == np.frombuffer(packed, dtype='<u4')).mean(axis=1)
+        i = int(sims.argmax())
+        return float(sims[i]), candidates[i][0]
+    mine = struct.unpack(f'<{NUM_PERM}I', packed)
+    return max((sum(x == y for x, y in zip(mine, struct.unpack(f'<{NUM_PERM}I', blob))) / NUM_PERM, key)
+               for key, blob in candidates)
+
+class Fingerprint:
+    __slots__ = ('exact', 'packed', 'bands')
+
+    def __init__(self, exact, packed, bands):
+        self.exact = exact
+        self.packed = packed
+        self.bands = bands
+
+def fingerprints(questions, exact=None):
+    signatures = minhash_many([shingle_hashes(q) for q in questions])
+    bands = band_keys_many(signatures)
+    if np is not None: packed = [row.astype('<u4').tobytes() for row in signatures]
+    else: packed = [struct.pack(f'<{NUM_PERM}I', *sig) for sig in signatures]
+    return [Fingerprint(exact[i] if exact else exact_key(q), packed[i], bands[i]) for i, q in enumerate(questions)]
+
+class FingerprintIndex:
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlitedb.LocalConnection(path, [
+            'CREATE TABLE IF NOT EXISTS fingerprints (qid INTEGER PRIMARY KEY, exact TEXT NOT NULL, signature BLOB NOT NULL)',
+            'CREATE INDEX IF NOT EXISTS fingerprints_exact ON fingerprints (exact)',
+            'CREATE TABLE IF NOT EXISTS bands (bucket INTEGER NOT NULL, qid INTEGER NOT NULL, '
+            'PRIMARY KEY (bucket, qid)) WITHOUT ROWID',
+        ])
+
+    def count(self):
+        return self._conn().execute('SELECT COUNT(*) FROM fingerprints').fetchone()[0]
+
+    def _lookup(self, db, fps):
+        """Existing exact matches and LSH candidates for a batch of fingerprints."""
+        exact, buckets = {}, {}
+        keys = list({fp.exact for fp in fps})
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            for qid, key in db.execute(f'SELECT qid, exact FROM fingerprints WHERE exact IN ({",".join("?" * len(part))})', part):
+                exact.setdefault(key, qid)
+        wanted = list({key for fp in fps for key in fp.bands})
+        for i in range(0, len(wanted), 500):
+            part = wanted[i:i + 500]
+            for bucket, qid in db.execute(f'SELECT bucket, qid FROM bands WHERE bucket IN ({",".join("?" * len(part))})', part):
+                buckets.setdefault(bucket, set()).add(qid)
+        return exact, buckets
+
+    def check(self, questions):
+        """Classify a batch of new questions against the index and against each
+        other. Returns (fingerprint, match) per question, where match is None or
+        (kind, other, similarity); other is an existing question id, or
+        ('batch', index) for an earlier question of the same batch."""
+        fps = fingerprints(questions)
+        db = self._conn()
+        exact, buckets = self._lookup(db, fps)
+        signatures = {}
+        seen_exact, seen_buckets = {}, {}
+        results = []
+        for i, fp in enumerate(fps):
+            match = None
+            if fp.exact in exact: match = ('duplicate', exact[fp.exact], 1.0)
+            elif fp.exact in seen_exact: match = ('duplicate', ('batch', seen_exact[fp.exact]), 1.0)
+            else:
+                candidates = set().union(*(buckets.get(k, ()) for k in fp.bands))
+                missing = [qid for qid in candidates if qid not in signatures]
+                for j in range(0, len(missing), 500):
+                    part = missing[j:j + 500]
+                    for qid, blob in db.execute(f'SELECT qid, signature FROM fingerprints WHERE qid IN ({",".join("?" * len(part))})', part):
+                        signatures[qid] = blob
+                best = closest(fp.packed, [(qid, signatures[qid]) for qid in candidates if qid in signatures])
+                if best and best[0] >= NEAR_THRESHOLD: match = ('near-duplicate', best[1], best[0])
+                else:
+                    local = set().union(*(seen_buckets.get(k, ()) for k in fp.bands))
+                    best = closest(fp.packed, [(j, fps[j].packed) for j in local])
+                    if best and best[0] >= NEAR_THRESHOLD: match = ('near-duplicate', ('batch', best[1]), best[0])
+            if match is None:   # later rows of the batch are checked against this one too
+                seen_exact[fp.exact] = i
+                for k in fp.bands: seen_buckets.setdefault(k, set()).add(i)
+            results.append((fp, match))
+        return results
+
+    def _drop(self, db, qids):
+        """Delete stored fingerprints; their band rows are found from the stored signatures."""
+        rows = []
+        for i in range(0, len(qids), 500):
+            part = qids[i:i + 500]
+            rows += db.execute(f'SELECT qid, signature FROM fingerprints WHERE qid IN ({",".join("?" * len(part))})', part).fetchall()
+        if not rows: return
+        if np is not None: signatures = np.frombuffer(b''.join(blob for _, blob in rows), dtype='<u4').reshape(-1, NUM_PERM)
+        else: signatures = [struct.unpack(f'<{NUM_PERM}I', blob) for _, blob in rows]
+        db.executemany('DELETE FROM bands WHERE bucket = ? AND qid = ?',
+                       [(key, qid) for (qid, _), keys in zip(rows, band_keys_many(signatures)) for key in keys])
+        db.executemany('DELETE FROM fingerprints WHERE qid = ?', [(qid,) for qid, _ in rows])
+
+    def add(self, items, replace=True):
+        """Store fingerprints for questions that now have ids: [(qid, fingerprint)]."""
+        with self._conn() as db:   # one transaction
+            if replace: self._drop(db, [qid for qid, _ in items])
+            db.executemany('INSERT INTO fingerprints (qid, exact, signature) VALUES (?, ?, ?)',
+                           [(qid, fp.exact, fp.packed) for qid, fp in items])
+            db.executemany('INSERT OR IGNORE INTO bands (bucket, qid) VALUES (?, ?)',   # sorted: b-tree appends
+                           sorted((key, qid) for qid, fp in items for key in fp.bands))
+
+    def sync(self, questions):
+        """Re-fingerprint questions whose text changed and drop removed ones;
+        returns how many entries changed."""
+        db = self._conn()
+        stored = dict(db.execute('SELECT qid, exact FROM fingerprints'))
+        keys = [exact_key(q) for q in questions]
+        todo = [i for i, (q, key) in enumerate(zip(questions, keys)) if stored.get(q['id']) != key]
+        fps = fingerprints([questions[i] for i in todo], [keys[i] for i in todo])
+        changed = [(questions[i]['id'], fp) for i, fp in zip(todo, fps)]
+        live = {q['id'] for q in questions}
+        gone = [qid for qid in stored if qid not in live]
+        if changed: self.add(changed, replace=any(qid in stored for qid, _ in changed))
+        if gone:
+            with db: self._drop(db, gone)
+        return len(changed) + len(gone)
+
+    def clear(self):
+        with self._conn() as db:
+            db.execute('DELETE FROM fingerprints')
+            db.execute('DELETE FROM bands')
@@ -0,0 +1,96 @@
+"""
+Grading rules for MCQ Master Suite, shared by the live /answer route, the
+result page and bulk grading of answer sheets.
+
+- A question scores +1 when the chosen option matches the key and the
+  candidate did not time out.
+- Anything else (wrong, blank or timed out) costs PENALTY[difficulty]
+  points, i.e. -0.25 in hard mode and nothing otherwise.
+- Accuracy is the share of correct answers out of the exam length.
+
+grade_sheets() grades a whole matrix of answer sheets at once with NumPy
+when it is installed and falls back to plain Python otherwise; both give the
+same numbers as grading the questions one by one with grade_answer().
+"""
+try:
+    import numpy as np
+except ImportError:   # optional: pure-Python fallback below
+    np = None
+
+NO_ANSWER = 0      # blank / timed out
+NOT_REACHED = -1   # question not graded yet (exam still running)
+
+PENALTY = {'hard': 0.25}
+
+def penalty_for(difficulty):
+    return PENALTY.get(difficulty, 0)
+
+def grade_answer(correct_ans, choice, is_timeout, difficulty):
+    """Grade one question; returns (is_correct, score delta)."""
+    is_correct = bool(choice) and choice == correct_ans and not is_timeout
+    return is_correct, 1 if is_correct else -penalty_for(difficulty)
+
+def accuracy(correct, total):
+    return int(correct / total * 100) if total > 0 else 0
+
+def whole(score):
+    """Scores are shown as 5, not 5.0, unless a penalty made them fractional."""
+    return int(score) if score == int(score) else score
+
+def grade_sheets(key, responses, difficulty='easy', timeouts=None, total=None):
+    """Grade N answer sheets of Q questions.
+
+    key        -- correct option numbers, shape (Q,) shared by all candidates
+                  or (N, Q) when every candidate has their own exam
+    responses  -- chosen option numbers, shape (N, Q); NO_ANSWER for blank,
+                  NOT_REACHED for questions that were not graded
+    difficulty -- one mode for everyone or a sequence of N modes
+    timeouts   -- optional (N, Q) booleans; a timed-out answer never scores
+    total      -- exam length used for accuracy (defaults to Q)
+
+    Returns a dict of per-candidate lists: score, correct, attempted, accuracy.
+    """
+    if np is None: return _grade_sheets_py(key, responses, difficulty, timeouts, total)
+    resp = np.asarray(responses, dtype=np.int64)
+    if resp.ndim == 1: resp = resp.reshape(1, -1)
+    n, q = resp.shape
+    key = np.asarray(key, dtype=np.int64)
+    if total is None: total = q
+
+    graded = resp != NOT_REACHED
+    hit = (resp == key) & (resp > 0)
+    if timeouts is not None: hit &= ~np.asarray(timeouts, dtype=bool).reshape(n, q)
+    correct = hit.sum(axis=1)
+    attempted = graded.sum(axis=1)
+
+    if isinstance(difficulty, str): penalty = penalty_for(difficulty)
+    else: penalty = np.array([penalty_for(d) for d in difficulty], dtype=np.float64)
+    score = correct - (attempted - correct) * penalty
+    acc = (correct / total * 100).astype(np.int64) if total > 0 else np.zeros(n, dtype=np.int64)
+    return {
+        'score': [whole(s) for s in score.astype(np.float64).tolist()],
+        'correct': correct.tolist(),
+        'attempted': attempted.tolist(),
+        'accuracy': acc.tolist()
+    }
+
+def _grade_sheets_py(key, responses, difficulty, timeouts, total):
+    responses = list(responses)
+    if responses and isinstance(responses[0], int): responses = [responses]   # a single sheet
+    key = list(key)
+    per_row_key = bool(key) and not isinstance(key[0], int)
+    result = {'score': [], 'correct': [], 'attempted': [], 'accuracy': []}
+    for i, row in enumerate(responses):
+        row_key = key[i] if per_row_key else key
+        row_timeouts = timeouts[i] if timeouts is not None else None
+        mode = difficulty if isinstance(difficulty, str) else difficulty[i]
+        correct = attempted = 0
+        for j, choice in enumerate(row):
+            if choice == NOT_REACHED: continue
+            attempted += 1
+            if choice > 0 and choice == row_key[j] and not (row_timeouts is not None and row_timeouts[j]): correct += 1
+        result['score'].append(whole(correct - (attempted - correct) * penalty_for(mode)))
+        result['correct'].append(correct)
+        result['attempted'].append(attempted)
+        result['accuracy'].append(accuracy(correct, len(row) if total is None else total))
+    return result
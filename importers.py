@@ -0,0 +1,336 @@
+"""
+Question importers for MCQ Master Suite.
+
+Each file format is a small plugin registered in FORMATS:
+- records(stream) splits the input into raw records (cheap, sequential)
+- parse(record) turns one record into a question dict or a rejection reason
+
+import_stream() reads records in chunks, parses the chunks (across a process
+pool when workers > 1) and hands the parsed chunks to a store callback strictly
+in input order, so question ids follow the file. Only this module is needed in
+the worker processes; storage, duplicate checks and locking stay in app.py.
+
+Formats: csv (number or letter answers), jsonl, xlsx (needs openpyxl), aiken
+and gift.
+"""
+import csv
+import io
+import json
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import openpyxl
+except ImportError:   # optional: only needed for .xlsx uploads
+    openpyxl = None
+
+IMPORT_CHUNK = 1000
+MAX_REJECT_REASONS = 50
+MIN_OPTIONS, MAX_OPTIONS = 2, 6
+LETTERS = 'ABCDEF'
+
+FORMATS = {}
+
+def register(fmt):
+    FORMATS[fmt.name] = fmt
+    return fmt
+
+def detect_format(filename, default='csv'):
+    ext = os.path.splitext(filename or '')[1].lower()
+    for fmt in FORMATS.values():
+        if ext in fmt.extensions: return fmt.name
+    return default
+
+# --- Validation ---
+
+ANSWER_CELL = re.compile(r'\(?([A-Fa-f])[).]?|\d+')
+
+def resolve_answer(answer, options, by_text=True):
+    """1-based option number from a number, a letter (A-F) or the option text."""
+    text = str(answer).strip()
+    if text.isdigit(): return int(text)
+    m = ANSWER_CELL.fullmatch(text)
+    if m: return LETTERS.index(m.group(1).upper()) + 1
+    if by_text:
+        for i, opt in enumerate(options):
+            if text == opt: return i + 1
+    return None
+
+def make_question(question, options, answer, subject=None, by_text=True):
+    """Return (question, None) or (None, reason). A blank subject is left out
+    so import_stream can tell it from an explicit 'General'."""
+    question = str(question or '').strip()
+    if not question: return None, 'empty question'
+    options = [str(o).strip() for o in options]
+    if not all(options): return None, 'empty option'
+    if not MIN_OPTIONS <= len(options) <= MAX_OPTIONS:
+        return None, f'expected {MIN_OPTIONS}-{MAX_OPTIONS} options, got {len(options)}'
+    ans = resolve_answer(answer, options, by_text)
+    if ans is None:
+        return None, f'answer {str(answer).strip()!r} is not an option number{", letter or option text" if by_text else " or letter"}'
+    if not 1 <= ans <= len(options): return None, f'answer {ans} is not between 1 and {len(options)}'
+    q = {'question': question, 'options': options, 'answer': ans}
+    subject = str(subject or '').strip()
+    if subject: q['subject'] = subject
+    return q, None
+
+# --- Formats ---
+
+class CsvFormat:
+    """question,option1,option2,option3,option4,answer[,subject]; answer 1-4 or A-D."""
+    name = 'csv'
+    extensions = ('.csv',)
+    binary = False
+
+    def records(self, stream):
+        # Numbered by the reader: a quoted field may span several lines
+        reader, next_line = csv.reader(stream), 1
+        for row in reader:
+            line_no, next_line = next_line, reader.line_num + 1
+            if not row or not any(cell.strip() for cell in row): continue
+            if line_no == 1 and row[0].strip().lower() == 'question': continue   # header
+            yield line_no, row
+
+    def parse(self, row):
+        if len(row) > 7 or (len(row) == 7 and ANSWER_CELL.fullmatch(row[6].strip())):
+            # Unquoted commas: the real separators in such files have no space
+            # after them, commas inside the text do ("Hello, world!")
+            merged = rejoin_spaced(row)
+            if len(merged) in (6, 7): row = merged
+            elif len(row) > 7: return None, f'expected at most 7 columns, got {len(row)} (unquoted comma in the question?)'
+        if len(row) < 6: return None, f'expected at least 6 columns, got {len(row)}'
+        return make_question(row[0], row[1:5], row[5], row[6] if len(row) > 6 else None, by_text=False)
+
+def rejoin_spaced(row):
+    out = [row[0]]
+    for cell in row[1:]:
+        if cell.startswith(' '): out[-1] += ',' + cell
+        else: out.append(cell)
+    return out
+
+class JsonLinesFormat:
+    """One JSON object per line: {"question", "options", "answer", "subject"}."""
+    name = 'jsonl'
+    extensions = ('.jsonl', '.ndjson')
+    binary = False
+
+    def records(self, stream):
+        for line_no, line in enumerate(stream, start=1):
+            if line.strip(): yield line_no, line
+
+    def parse(self, line):
+        try: obj = json.loads(line)
+        except ValueError as e: return None, f'invalid JSON: {e.msg}'
+        if not isinstance(obj, dict): return None, 'expected a JSON object'
+        options = obj.get('options')
+        if not isinstance(options, list): return None, 'options must be a list'
+        return make_question(obj.get('question'), options, obj.get('answer', ''), obj.get('subject'))
+
+class XlsxFormat:
+    """First worksheet, same columns as CSV."""
+    name = 'xlsx'
+    extensions = ('.xlsx',)
+    binary = True
+
+    def records(self, stream):
+        if openpyxl is None: raise ValueError('XLSX import needs openpyxl (pip install openpyxl)')
+        book = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+        try:
+            for line_no, values in enumerate(book.worksheets[0].iter_rows(values_only=True), start=1):
+                row = ['' if v is None else str(int(v) if isinstance(v, float) and v.is_integer() else v) for v in values]
+                while row and not row[-1].strip(): row.pop()
+                if not row: continue
+                if line_no == 1 and row[0].strip().lower() == 'question': continue
+                yield line_no, row
+        finally: book.close()
+
+    def parse(self, row):
+        return FORMATS['csv'].parse(row)
+
+AIKEN_OPTION = re.compile(r'^([A-Z])[.)]\s+(.*)$')
+AIKEN_ANSWER = re.compile(r'^ANSWER:\s*([A-Z])\s*$', re.IGNORECASE)
+
+class AikenFormat:
+    """Moodle Aiken: question lines, 'A. option' lines, then 'ANSWER: B'."""
+    name = 'aiken'
+    extensions = ('.aiken', '.txt')
+    binary = False
+
+    def records(self, stream):
+        lines, start = [], None
+        for line_no, line in enumerate(stream, start=1):
+            line = line.rstrip('\r\n')
+            if not line.strip() and not lines: continue
+            if start is None: start = line_no
+            lines.append(line)
+            if AIKEN_ANSWER.match(line.strip()):
+                yield start, lines
+                lines, start = [], None
+        if any(l.strip() for l in lines): yield start, lines   # no ANSWER line: rejected by parse
+
+    def parse(self, lines):
+        question, options, answer = [], [], None
+        for line in (l.strip() for l in lines):
+            if not line: continue
+            m = AIKEN_ANSWER.match(line)
+            if m: answer = m.group(1)
+            elif AIKEN_OPTION.match(line) and (options or question):
+                letter, text = AIKEN_OPTION.match(line).groups()
+                expected = LETTERS[len(options)] if len(options) < len(LETTERS) else None
+                if letter != expected: return None, f'option {letter} out of order'
+                options.append(text)
+            elif options: return None, 'text after the options'
+            else: question.append(line)
+        if answer is None: return None, 'missing ANSWER line'
+        return make_question(' '.join(question), options, answer)
+
+GIFT_SPECIAL = re.compile(r'\\([~=#{}:n\\])')
+
+def gift_unescape(text):
+    return GIFT_SPECIAL.sub(lambda m: '\n' if m.group(1) == 'n' else m.group(1), text).strip()
+
+def gift_split(text, marks):
+    """Split on unescaped marks, keeping the mark at the start of each piece."""
+    pieces, current, i = [], '', 0
+    while i < len(text):
+        ch = text[i]
+        if ch == '\\' and i + 1 < len(text):
+            current += text[i:i + 2]
+            i += 2
+            continue
+        if ch in marks:
+            if current.strip(): pieces.append(current)
+            current = ch
+        else: current += ch
+        i += 1
+    if current.strip(): pieces.append(current)
+    return pieces
+
+def gift_find(text, ch, start=0):
+    i = start
+    while i < len(text):
+        if text[i] == '\\': i += 2; continue
+        if text[i] == ch: return i
+        i += 1
+    return -1
+
+class GiftFormat:
+    """Moodle GIFT, multiple-choice questions only: 'Question {=right ~wrong ~wrong}'.
+    $CATEGORY lines set the subject of the questions after them."""
+    name = 'gift'
+    extensions = ('.gift',)
+    binary = False
+
+    def records(self, stream):
+        lines, start, category = [], None, None
+        def record():
+            return start, ('\n'.join(lines), category)
+        for line_no, line in enumerate(stream, start=1):
+            line = line.rstrip('\r\n')
+            stripped = line.strip()
+            if stripped.startswith('//'): continue
+            if stripped.startswith('$CATEGORY:'):
+                category = stripped[len('$CATEGORY:'):].strip().split('/')[-1] or None
+                continue
+            if not stripped:
+                if lines: yield record()
+                lines, start = [], None
+                continue
+            if start is None: start = line_no
+            lines.append(line)
+        if lines: yield record()
+
+    def parse(self, record):
+        text, category = record
+        text = re.sub(r'^\s*::.*?::', '', text, count=1, flags=re.S)   # ::title::
+        text = re.sub(r'^\s*\[(html|moodle|plain|markdown)\]', '', text)
+        open_at = gift_find(text, '{')
+        close_at = gift_find(text, '}', open_at + 1) if open_at >= 0 else -1
+        if open_at < 0 or close_at < 0: return None, 'no {answer block}'
+        question = gift_unescape((text[:open_at] + ' ' + text[close_at + 1:]).strip())
+        options, answer = [], None
+        for piece in gift_split(text[open_at + 1:close_at], '=~'):
+            mark, body = piece[0], piece[1:]
+            if mark not in '=~': return None, 'only multiple-choice questions are supported'
+            feedback_at = gift_find(body, '#')
+            if feedback_at >= 0: body = body[:feedback_at]
+            weight = re.match(r'\s*%(-?\d+(?:\.\d+)?)%', body)
+            if weight: body = body[weight.end():]
+            is_right = mark == '=' or (weight is not None and float(weight.group(1)) >= 100)
+            if '->' in body: return None, 'matching questions are not supported'
+            options.append(gift_unescape(body))
+            if is_right:
+                if answer is not None: return None, 'more than one correct answer'
+                answer = len(options)
+        if answer is None: return None, 'no correct answer (true/false, numeric and essay questions are not supported)'
+        return make_question(question, options, answer, category)
+
+for _fmt in (CsvFormat(), JsonLinesFormat(), XlsxFormat(), AikenFormat(), GiftFormat()): register(_fmt)
+
+# --- Pipeline ---
+
+def parse_chunk(fmt_name, records):
+    """Runs in a worker process: [(line_no, record)] -> [(line_no, question, reason)]."""
+    fmt = FORMATS[fmt_name]
+    out = []
+    for line_no, record in records:
+        try: q, reason = fmt.parse(record)
+        except Exception as e: q, reason = None, f'could not parse: {e}'
+        out.append((line_no, q, reason))
+    return out
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk: yield chunk
+
+def parsed_chunks(fmt_name, records, workers=0, chunk_size=IMPORT_CHUNK):
+    """Parsed chunks in input order; with workers > 1 up to 2 x workers chunks
+    are parsed ahead in a process pool."""
+    chunks = chunked(records, chunk_size)
+    if workers <= 1:
+        for chunk in chunks: yield parse_chunk(fmt_name, chunk)
+        return
+    first = next(chunks, None)
+    if first is None: return
+    if len(first) < chunk_size:   # a small file: not worth starting processes
+        yield parse_chunk(fmt_name, first)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque([pool.submit(parse_chunk, fmt_name, first)])
+        for chunk in chunks:
+            pending.append(pool.submit(parse_chunk, fmt_name, chunk))
+            if len(pending) >= workers * 2: yield pending.popleft().result()
+        while pending: yield pending.popleft().result()
+
+def reject(stats, line_no, reason):
+    stats['rejected'] += 1
+    if len(stats['reasons']) < MAX_REJECT_REASONS: stats['reasons'].append((line_no, reason))
+
+def import_stream(stream, fmt_name, store, progress=None, workers=0, subject=None, chunk_size=IMPORT_CHUNK):
+    """Import a binary stream. store(chunk, stats) receives [(line_no, question)]
+    in input order and updates stats['accepted'] (and rejections) itself.
+    Returns {'rows', 'accepted', 'rejected', 'duplicates', 'reasons'}."""
+    fmt = FORMATS[fmt_name]
+    stats = {'rows': 0, 'accepted': 0, 'rejected': 0, 'duplicates': 0, 'reasons': []}
+    text = stream if fmt.binary else io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        for parsed in parsed_chunks(fmt_name, fmt.records(text), workers, chunk_size):
+            good = []
+            for line_no, q, reason in parsed:
+                stats['rows'] += 1
+                if q is None: reject(stats, line_no, reason)
+                else:
+                    if 'subject' not in q: q['subject'] = subject or 'General'
+                    good.append((line_no, q))
+            if good: store(good, stats)
+            if progress: progress(stats)
+    finally:
+        if not fmt.binary: text.detach()
+    return stats
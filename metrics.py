@@ -0,0 +1,192 @@
+"""
+In-process instrumentation for MCQ Master Suite:
+- Latency histograms (per route and per timed function)
+- Byte counters for file/database I/O, attributed to the current request
+- Prometheus text exposition (served at /metrics by app.py)
+- Optional sampling profiler that dumps folded stacks for slow requests
+
+Metrics are kept per process; with several gunicorn workers each worker
+reports its own numbers.
+"""
+import os
+import sys
+import threading
+import time
+from functools import wraps
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class Histogram:
+    def __init__(self, name, help_text, label):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self.lock = threading.Lock()
+        self.series = {}   # label value -> [bucket counts..., sum, count]
+
+    def observe(self, key, value):
+        with self.lock:
+            row = self.series.get(key)
+            if row is None: row = self.series[key] = [0] * (len(BUCKETS) + 2)
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            for key, row in sorted(self.series.items()):
+                label = f'{self.label}="{escape(key)}"'
+                cumulative = 0
+                for bound, n in zip(BUCKETS, row):
+                    cumulative += n
+                    lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {row[-1]}')
+                lines.append(f'{self.name}_sum{{{label}}} {row[-2]:.6f}')
+                lines.append(f'{self.name}_count{{{label}}} {row[-1]}')
+        return lines
+
+class Counter:
+    def __init__(self, name, help_text, label=None):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def inc(self, amount=1, key=''):
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                suffix = f'{{{self.label}="{escape(key)}"}}' if self.label else ''
+                lines.append(f'{self.name}{suffix} {value}')
+        return lines
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+REQUEST_LATENCY = Histogram('mcq_request_duration_seconds', 'Request latency by route.', 'route')
+FUNCTION_LATENCY = Histogram('mcq_function_duration_seconds', 'Latency of instrumented hot-path functions.', 'fn')
+BYTES = Counter('mcq_io_bytes_total', 'Bytes read from / written to data files and databases.', 'direction')
+REQUEST_BYTES_READ = Counter('mcq_request_bytes_read_total', 'Data bytes read while serving each route.', 'route')
+REQUEST_BYTES_WRITTEN = Counter('mcq_request_bytes_written_total', 'Data bytes written while serving each route.', 'route')
+SLOW_REQUESTS = Counter('mcq_slow_requests_total', 'Requests over the profiler threshold.', 'route')
+REGISTRY = [REQUEST_LATENCY, FUNCTION_LATENCY, BYTES, REQUEST_BYTES_READ, REQUEST_BYTES_WRITTEN, SLOW_REQUESTS]
+
+_request = threading.local()   # per-thread byte tally for the request being served
+
+def timed(name):
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try: return fn(*args, **kwargs)
+            finally: FUNCTION_LATENCY.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+def count_read(n):
+    BYTES.inc(n, 'read')
+    if getattr(_request, 'active', False): _request.read += n
+
+def count_written(n):
+    BYTES.inc(n, 'written')
+    if getattr(_request, 'active', False): _request.written += n
+
+def request_started():
+    _request.active = True
+    _request.read = _request.written = 0
+    _request.start = time.perf_counter()
+    if PROFILER: PROFILER.watch()
+
+def request_finished(route):
+    if not getattr(_request, 'active', False): return
+    _request.active = False
+    elapsed = time.perf_counter() - _request.start
+    REQUEST_LATENCY.observe(route, elapsed)
+    REQUEST_BYTES_READ.inc(_request.read, route)
+    REQUEST_BYTES_WRITTEN.inc(_request.written, route)
+    if PROFILER: PROFILER.unwatch(route, elapsed)
+
+def exposition():
+    lines = []
+    for metric in REGISTRY: lines.extend(metric.expose())
+    return '\n'.join(lines) + '\n'
+
+# --- Slow Request Profiler ---
+
+class SlowRequestProfiler:
+    """Samples the stacks of threads serving requests; requests slower than
+    `threshold` seconds are written as folded stacks (flamegraph.pl/speedscope).
+    The sampler thread starts on the first request in each process: one
+    started at import would live only in the gunicorn master (after_fork()
+    resets it in a forked child)."""
+
+    def __init__(self, out_dir, threshold, interval=0.005):
+        self.out_dir = out_dir
+        self.threshold = threshold
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.samples = {}   # thread id -> {folded stack: count}
+        self.running = False   # sampler thread started in this process
+        self.start_lock = threading.Lock()
+        os.makedirs(out_dir, exist_ok=True)
+
+    def _start(self):
+        with self.start_lock:
+            if self.running: return
+            threading.Thread(target=self._run, name='mcq-profiler', daemon=True).start()
+            self.running = True
+
+    def after_fork(self):
+        # State inherited over fork belongs to the parent's threads
+        self.lock = threading.Lock()
+        self.start_lock = threading.Lock()
+        self.samples = {}
+        self.running = False
+
+    def watch(self):
+        if not self.running: self._start()
+        with self.lock: self.samples[threading.get_ident()] = {}
+
+    def unwatch(self, route, elapsed):
+        with self.lock: stacks = self.samples.pop(threading.get_ident(), None)
+        if not stacks or elapsed < self.threshold: return
+        SLOW_REQUESTS.inc(1, route)
+        name = f'{time.strftime("%Y%m%d-%H%M%S")}-{int(elapsed * 1000)}ms{route.replace("/", "_") or "_"}.folded'
+        with open(os.path.join(self.out_dir, name), 'w', encoding='utf-8') as f:
+            for stack, n in sorted(stacks.items()): f.write(f'{stack} {n}\n')
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.samples: continue
+                frames = sys._current_frames()
+                for tid, stacks in self.samples.items():
+                    frame = frames.get(tid)
+                    if frame is None: continue
+                    parts = []
+                    while frame is not None:
+                        code = frame.f_code
+                        parts.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                        frame = frame.f_back
+                    key = ';'.join(reversed(parts))
+                    stacks[key] = stacks.get(key, 0) + 1
+
+PROFILER = None
+
+def enable_profiler(out_dir, threshold_ms, interval_ms=5):
+    global PROFILER
+    PROFILER = SlowRequestProfiler(out_dir, threshold_ms / 1000, interval_ms / 1000)
+
+def after_fork():
+    """Call in a forked child (app.after_fork does)."""
+    if PROFILER: PROFILER.after_fork()
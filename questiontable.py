@@ -0,0 +1,200 @@
+"""
+Compact, columnar question table for the in-process bank.
+
+A list of question dicts costs several hundred bytes per question before any
+text is counted: a dict, an options list, five str objects and an int, each
+with its own object header and refcount. The table keeps the same data in
+typed columns and one shared UTF-8 string pool:
+
+    ids           array('q')  question id per row
+    answers       array('i')
+    subjects      array('I')  code into subject_names; each subject is stored once
+    first         array('I')  index of the row's first string in the pool
+    n_options     array('H')
+    n_tags        array('H')
+    sorted_ids    array('q')  ids in ascending order, for bisect lookups
+    sorted_rows   array('I')  row of each sorted id
+    by_subject    {subject: array('q')} ids per subject, in row order
+    offsets       array('Q')  start of every string in blob, plus the end
+    blob          bytearray   the strings of each row: question, options,
+                              tags, then a JSON object of any other keys
+
+It reads like the list it replaces: len(), table[row] and iteration give
+freshly decoded question dicts, and get(qid) finds a question by id. Rows are
+only ever appended. snapshot.py writes these columns to a file and maps them
+back read-only.
+"""
+import bisect
+import json
+from array import array
+from itertools import accumulate
+
+BASE_KEYS = frozenset(['question', 'options', 'answer', 'subject', 'id', 'tags'])
+
+# Per-row columns as (attribute, array typecode)
+COLUMNS = [('ids', 'q'), ('answers', 'i'), ('subjects', 'I'), ('first', 'I'), ('n_options', 'H'),
+           ('n_tags', 'H'), ('sorted_ids', 'q'), ('sorted_rows', 'I')]
+
+def assign_ids(qs):
+    """Number entries without an integer id after the highest id (in place)."""
+    next_id = max((q['id'] for q in qs if isinstance(q.get('id'), int)), default=0) + 1
+    for q in qs:
+        if not isinstance(q.get('id'), int):
+            q['id'] = next_id
+            next_id += 1
+    return qs
+
+def _copy(col, code):
+    out = array(code)
+    out.frombytes(memoryview(col).cast('B'))
+    return out
+
+def _starts_with(col, prefix):
+    prefix = memoryview(prefix).cast('B')
+    return memoryview(col).cast('B')[:len(prefix)].tobytes() == prefix.tobytes()
+
+class QuestionTable:
+    readonly = False
+
+    def __init__(self):
+        for name, code in COLUMNS: setattr(self, name, array(code))
+        self.offsets = array('Q', [0])
+        self.blob = bytearray()
+        self.subject_names = []
+        self.codes = {}
+        self.by_subject = {}
+        self.max_id = 0
+
+    @classmethod
+    def from_questions(cls, questions):
+        table = cls()
+        table.append(questions)
+        return table
+
+    def copy(self):
+        """Writable in-memory copy, e.g. of a read-only mapped snapshot."""
+        table = QuestionTable()
+        for name, code in COLUMNS: setattr(table, name, _copy(getattr(self, name), code))
+        table.offsets = _copy(self.offsets, 'Q')
+        table.blob = bytearray(self.blob)
+        table.subject_names = list(self.subject_names)
+        table.codes = {name: i for i, name in enumerate(table.subject_names)}
+        table.by_subject = {name: _copy(ids, 'q') for name, ids in self.by_subject.items()}
+        table.max_id = self.max_id
+        return table
+
+    def append(self, questions):
+        """Add question dicts (ids assigned). Readers on other threads never
+        see a partial row: a row's strings and columns are in place before its
+        id shows up in ids, the lookup index or by_subject."""
+        if self.readonly: raise TypeError('read-only question table; copy() it first')
+        questions = list(questions)
+        if not questions: return
+        rows = {name: array(code) for name, code in COLUMNS[:6]}
+        ids, answers, subjects, first, n_options, n_tags = (rows[name].append for name, _ in COLUMNS[:6])
+        strings = []
+        add, add_all = strings.append, strings.extend
+        codes = self.codes
+        next_string = len(self.offsets) - 1
+        for q in questions:
+            options, tags = q['options'], q.get('tags', ())
+            subject = q.get('subject', 'General')
+            code = codes.get(subject)
+            if code is None:
+                code = codes[subject] = len(self.subject_names)
+                self.subject_names.append(subject)
+            ids(q['id'])
+            answers(q['answer'])
+            subjects(code)
+            first(next_string)
+            n_options(len(options))
+            n_tags(len(tags))
+            add(q['question'])
+            add_all(options)
+            add_all(tags)
+            add('' if q.keys() <= BASE_KEYS else
+                json.dumps({k: v for k, v in q.items() if k not in BASE_KEYS}, ensure_ascii=False))
+            next_string += len(options) + len(tags) + 2
+        try:
+            text = ''.join(strings)
+            data = text.encode('utf-8')
+            ascii_only = len(data) == len(text)   # then byte lengths are the str lengths
+        except TypeError:   # non-string options or tags (hand-edited bank)
+            strings = [str(s) for s in strings]
+            data, ascii_only = None, False
+        if not ascii_only:
+            encoded = [s.encode('utf-8') for s in strings]
+            data = b''.join(encoded)
+        ends = accumulate(map(len, strings if ascii_only else encoded), initial=len(self.blob))
+        next(ends)
+        self.blob += data
+        self.offsets.extend(ends)
+        start, new_ids = len(self.ids), rows.pop('ids')
+        for name, col in rows.items(): getattr(self, name).extend(col)
+        self.ids.extend(new_ids)
+
+        if all(a < b for a, b in zip(new_ids, new_ids[1:])) and (not start or new_ids[0] > self.sorted_ids[-1]):
+            self.sorted_rows.extend(range(start, start + len(new_ids)))
+            self.sorted_ids.extend(new_ids)
+        else:   # ids out of order (hand-edited bank): rebuild the lookup index once
+            order = sorted(range(len(self.ids)), key=self.ids.__getitem__)
+            self.sorted_ids = array('q', (self.ids[i] for i in order))
+            self.sorted_rows = array('I', order)
+        for qid, code in zip(new_ids, rows['subjects']):
+            name = self.subject_names[code]
+            if name not in self.by_subject: self.by_subject[name] = array('q')
+            self.by_subject[name].append(qid)
+        self.max_id = max(self.max_id, max(new_ids))
+
+    def extends(self, other):
+        """True if this table is `other` plus appended rows: every row of
+        `other` is here unchanged, at the same position. Compares raw column
+        bytes; nothing is decoded."""
+        if len(self) < len(other) or self.subject_names[:len(other.subject_names)] != other.subject_names: return False
+        return (all(_starts_with(getattr(self, name), getattr(other, name)) for name, _ in COLUMNS[:6])
+                and _starts_with(self.offsets, other.offsets) and _starts_with(self.blob, other.blob))
+
+    def _text(self, i):
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, row):
+        count = len(self.ids)
+        if isinstance(row, slice): return [self[i] for i in range(*row.indices(count))]
+        if row < 0: row += count
+        if not 0 <= row < count: raise IndexError('question table row out of range')
+        first, n_opt, n_tags = self.first[row], self.n_options[row], self.n_tags[row]
+        q = {
+            'question': self._text(first),
+            'options': [self._text(i) for i in range(first + 1, first + 1 + n_opt)],
+            'answer': self.answers[row],
+            'subject': self.subject_names[self.subjects[row]],
+            'id': self.ids[row]
+        }
+        if n_tags: q['tags'] = [self._text(i) for i in range(first + 1 + n_opt, first + 1 + n_opt + n_tags)]
+        extra = self._text(first + 1 + n_opt + n_tags)
+        if extra: q.update(json.loads(extra))
+        return q
+
+    def __iter__(self):
+        for row in range(len(self.ids)): yield self[row]
+
+    def row_of(self, qid):
+        sorted_ids = self.sorted_ids
+        i = bisect.bisect_left(sorted_ids, qid)
+        if i < len(sorted_ids) and sorted_ids[i] == qid: return self.sorted_rows[i]
+        return None
+
+    def get(self, qid, default=None):
+        row = self.row_of(qid)
+        return default if row is None else self[row]
+
+    def __contains__(self, qid):
+        return self.row_of(qid) is not None
+
+    def answer(self, qid):
+        """Answer key of one question without decoding its text (None if unknown)."""
+        row = self.row_of(qid)
+        return None if row is None else self.answers[row]
@@ -0,0 +1,109 @@
+"""
+Full-text search over the question bank.
+
+An in-memory inverted index (term -> {question id: term frequency}) over the
+question text, options and subject, ranked with Okapi BM25. A query only
+touches the postings of its own terms, never the whole bank.
+
+The index is kept in step with the bank incrementally: sync() re-indexes
+only questions whose text changed (or were removed) and add() indexes
+freshly appended ones.
+"""
+import heapq
+import math
+import re
+import threading
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+STOPWORDS = frozenset('a an and are as at be by for from in is it of on or the to was what which who with'.split())
+
+K1 = 1.2
+B = 0.75
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(str(text).lower()) if t not in STOPWORDS]
+
+def document_text(q):
+    return (q.get('question', ''), tuple(q.get('options', [])), q.get('subject', 'General'))
+
+class SearchIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.postings = {}   # term -> {qid: tf}
+        self.docs = {}       # qid -> (text tuple, {term: tf})
+        self.lengths = {}    # qid -> token count
+        self.total_len = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _add(self, qid, text):
+        question, options, subject = text
+        terms = {}
+        for part in (question, *options, subject):
+            for t in tokenize(part): terms[t] = terms.get(t, 0) + 1
+        length = sum(terms.values())
+        for t, tf in terms.items(): self.postings.setdefault(t, {})[qid] = tf
+        self.docs[qid] = (text, terms)
+        self.lengths[qid] = length
+        self.total_len += length
+
+    def _remove(self, qid):
+        text, terms = self.docs.pop(qid)
+        for t in terms:
+            posting = self.postings[t]
+            del posting[qid]
+            if not posting: del self.postings[t]
+        self.total_len -= self.lengths.pop(qid)
+
+    def add(self, questions):
+        """Index newly appended questions (ids must be assigned)."""
+        with self.lock:
+            for q in questions:
+                if q['id'] in self.docs: self._remove(q['id'])
+                self._add(q['id'], document_text(q))
+
+    def sync(self, questions):
+        """Bring the index in line with a full question list; returns how many docs changed."""
+        changed = 0
+        with self.lock:
+            seen = set()
+            for q in questions:
+                qid = q['id']
+                seen.add(qid)
+                text = document_text(q)
+                old = self.docs.get(qid)
+                if old is not None and old[0] == text: continue
+                if old is not None: self._remove(qid)
+                self._add(qid, text)
+                changed += 1
+            for qid in [qid for qid in self.docs if qid not in seen]:
+                self._remove(qid)
+                changed += 1
+        return changed
+
+    def clear(self):
+        with self.lock:
+            self.postings = {}
+            self.docs = {}
+            self.lengths = {}
+            self.total_len = 0
+
+    def search(self, query, limit=10, offset=0):
+        """Returns (total hits, [(qid, score), ...]) for one page, best first."""
+        terms = set(tokenize(query))
+        with self.lock:
+            n = len(self.docs)
+            if not n or not terms: return 0, []
+            base, per_token = K1 * (1 - B), K1 * B / (self.total_len / n)
+            lengths = self.lengths
+            scores = {}
+            get = scores.get
+            for t in terms:
+                posting = self.postings.get(t)
+                if not posting: continue
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5)) * (K1 + 1)
+                for qid, tf in posting.items():
+                    scores[qid] = get(qid, 0.0) + idf * tf / (tf + base + per_token * lengths[qid])
+        best = heapq.nlargest(offset + limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return len(scores), best[offset:]
@@ -0,0 +1,169 @@
+"""
+Binary snapshot of the question bank.
+
+questions.json has to be parsed in full before the first request can be
+served. A snapshot is the bank's QuestionTable (see questiontable.py) written
+to a file: fixed-width columns plus one UTF-8 string blob. It is opened with
+mmap, so opening costs the same for 50 or 5 million questions, and a
+question's text is only decoded when it is looked up. Pages that are never
+touched are never read from disk.
+
+Layout (little-endian, every section 8-byte aligned):
+    header        MAGIC, version, question count, length of the store
+                  signature and of the subject names, then one
+                  (offset, length) pair per section, the signature and the
+                  subject names (both JSON)
+    ids .. sorted_rows
+                  the per-row columns of QuestionTable, in COLUMNS order
+    subject_start uint32[s+1] start of each subject's ids in subject_ids
+    subject_ids   int64[n]    ids grouped by subject, in row order
+    offsets       uint64[m+1] byte offset of every string in the blob
+    blob          UTF-8 text
+
+The snapshot records the signature of the store it was built from, so a
+stale one is detected and rebuilt instead of served.
+
+Convert with:
+    python snapshot.py questions.json              # writes questions.snap
+    python snapshot.py questions.snap out.json     # and back
+
+Sessions refer to questions by id, so a questions.json with entries that
+have no id is only converted with --number-ids, which first writes the
+assigned ids back to it (do this while the app is stopped).
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+
+from questiontable import COLUMNS, QuestionTable, assign_ids
+
+MAGIC = b'MCQSNAP\x00'
+VERSION = 2
+
+# (name, array typecode) in file order; the blob is written raw after them
+SECTIONS = COLUMNS + [('subject_start', 'I'), ('subject_ids', 'q'), ('offsets', 'Q')]
+HEADER = struct.Struct('<8sIIII')
+SECTION = struct.Struct('<QQ')
+
+def _pad(n):
+    return -n % 8
+
+def encode(table, signature=None):
+    """Snapshot bytes for a QuestionTable or a list of question dicts (ids assigned)."""
+    if not isinstance(table, QuestionTable): table = QuestionTable.from_questions(table)
+    cols = {name: getattr(table, name) for name, _ in COLUMNS}
+    cols['subject_start'] = array('I', [0])
+    cols['subject_ids'] = array('q')
+    for name in table.subject_names:
+        cols['subject_ids'].frombytes(memoryview(table.by_subject[name]).cast('B'))
+        cols['subject_start'].append(len(cols['subject_ids']))
+    cols['offsets'] = table.offsets
+
+    sig = json.dumps(signature).encode('utf-8')
+    names = json.dumps(table.subject_names, ensure_ascii=False).encode('utf-8')
+    head = HEADER.size + SECTION.size * (len(SECTIONS) + 1) + len(sig) + len(names)
+    pos = head + _pad(head)
+    table_of_contents, parts = [], []
+    for name, _ in SECTIONS:
+        data = memoryview(cols[name]).cast('B')
+        table_of_contents.append(SECTION.pack(pos, len(data)))
+        parts += [data, b'\0' * _pad(len(data))]
+        pos += len(data) + _pad(len(data))
+    table_of_contents.append(SECTION.pack(pos, len(table.blob)))
+    return b''.join([HEADER.pack(MAGIC, VERSION, len(table), len(sig), len(names)),
+                     *table_of_contents, sig, names, b'\0' * _pad(head), *parts, table.blob])
+
+def write(path, questions, signature=None):
+    """Write a snapshot atomically (temp file + rename); processes that still
+    map the old file keep reading it until they re-open."""
+    data = encode(questions, signature)
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+    return len(data)
+
+class Snapshot(QuestionTable):
+    """A QuestionTable whose columns are memoryviews into a mapped snapshot
+    file. Read-only: copy() gives a writable in-memory table."""
+    readonly = True
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, sig_len, names_len = HEADER.unpack_from(self.mm)
+        if magic != MAGIC or version != VERSION: raise ValueError(f'{path}: not a question snapshot (version {version})')
+        buf = memoryview(self.mm)
+        pos = HEADER.size
+        for name, code in SECTIONS:
+            start, size = SECTION.unpack_from(self.mm, pos)
+            setattr(self, name, buf[start:start + size].cast(code))
+            pos += SECTION.size
+        start, size = SECTION.unpack_from(self.mm, pos)
+        self.blob = buf[start:start + size]
+        pos += SECTION.size
+        self.signature = json.loads(self.mm[pos:pos + sig_len])
+        pos += sig_len
+        self.subject_names = json.loads(self.mm[pos:pos + names_len])
+        self.codes = {name: i for i, name in enumerate(self.subject_names)}
+        self.by_subject = {name: self.subject_ids[self.subject_start[i]:self.subject_start[i + 1]]
+                           for i, name in enumerate(self.subject_names)}
+        self.max_id = self.sorted_ids[-1] if count else 0
+
+    def matches(self, signature):
+        """True if built from a store with this signature (tuples compare as lists)."""
+        return self.signature == json.loads(json.dumps(signature))
+
+    def close(self):
+        for name, _ in SECTIONS: getattr(self, name).release()
+        self.blob.release()
+        self.by_subject = {}
+        self.mm.close()
+
+def json_signature(path):
+    """Same signature as app.JsonQuestionStore, so a converted snapshot is picked up."""
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert between questions.json and a question snapshot.')
+    parser.add_argument('source', help='questions.json or a .snap file')
+    parser.add_argument('target', nargs='?', help='default: the source with .snap / .json swapped')
+    parser.add_argument('--number-ids', action='store_true', help='give entries without an id one and save them to the source first')
+    args = parser.parse_args(argv)
+    base, ext = os.path.splitext(args.source)
+    if ext == '.snap':
+        target = args.target or base + '.json'
+        snap = Snapshot(args.source)
+        with open(target, 'w', encoding='utf-8') as f:
+            json.dump(list(snap), f, ensure_ascii=False, indent=2)
+        print(f'{args.source} -> {target}: {len(snap)} questions')
+        return 0
+    target = args.target or base + '.snap'
+    with open(args.source, 'rb') as f:
+        qs = json.load(f)
+    if not all(isinstance(q.get('id'), int) for q in qs):
+        # Ids that exist only in the snapshot would change with the next edit of the file
+        if not args.number_ids: parser.error(f'{args.source} has questions without an id; rerun with --number-ids')
+        tmp = f'{args.source}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(assign_ids(qs), f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, args.source)
+    size = write(target, qs, json_signature(args.source))
+    print(f'{args.source} -> {target}: {len(qs)} questions, {size:,} bytes')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
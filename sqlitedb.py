@@ -0,0 +1,49 @@
+"""
+Shared SQLite plumbing for the stores in app.py and dedup.py: one WAL
+connection per thread and per process, and the schema created on first use
+rather than at import (which under gunicorn --preload is the master).
+"""
+import sqlite3
+import threading
+import weakref
+
+_CONNECTIONS = weakref.WeakSet()
+
+class LocalConnection:
+    """Callable returning this thread's connection to `path`. A connection
+    inherited over fork is never used (nor closed: closing it could drop
+    the parent's locks); after_fork() makes the child open its own."""
+
+    def __init__(self, path, schema=()):
+        self.path = path
+        self.schema = schema
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.ready = False      # schema created by this process
+        self.inherited = []
+        _CONNECTIONS.add(self)
+
+    def __call__(self):
+        db = getattr(self.local, 'db', None)
+        if db is not None: return db
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        if not self.ready:
+            with self.lock:
+                if not self.ready:
+                    with db:
+                        for stmt in self.schema: db.execute(stmt)
+                    self.ready = True
+        self.local.db = db
+        return db
+
+    def after_fork(self):
+        self.inherited.append(self.local)
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.ready = False
+
+def after_fork():
+    """Call in a forked child (app.after_fork does)."""
+    for conn in list(_CONNECTIONS): conn.after_fork()
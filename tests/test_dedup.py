@@ -0,0 +1,50 @@
+import dedup
+
+def q(question, options=('alpha', 'beta', 'gamma', 'delta')):
+    return {'question': question, 'options': list(options)}
+
+COMMUNICATION = q('Communication is MAINLY about transmitting information from one entity to another?',
+                  ['Storing data', 'Moving physically', 'Transmitting information', 'Writing letters'])
+
+def test_exact_key_ignores_case_punctuation_spacing_and_option_order():
+    a = q('What is  the Capital of France?', ['Paris', 'Rome', 'Berlin', 'Madrid'])
+    b = q('what is the capital of france', ['madrid', 'BERLIN', 'rome', 'Paris!'])
+    assert dedup.exact_key(a) == dedup.exact_key(b)
+    assert dedup.exact_key(a) != dedup.exact_key(q('What is the capital of Spain?', ['Paris', 'Rome', 'Berlin', 'Madrid']))
+
+def test_fingerprints_are_deterministic():
+    first, second = dedup.fingerprints([COMMUNICATION]), dedup.fingerprints([COMMUNICATION])
+    assert first[0].packed == second[0].packed and first[0].bands == second[0].bands
+    assert len(first[0].bands) == dedup.BANDS
+
+def test_index_schema_is_created_on_first_use(tmp_path):
+    path = tmp_path / 'fingerprints.db'
+    index = dedup.FingerprintIndex(str(path))
+    assert not path.exists()
+    assert index.count() == 0
+
+def test_check_against_index_and_batch(tmp_path):
+    index = dedup.FingerprintIndex(str(tmp_path / 'fingerprints.db'))
+    [(fp, match)] = index.check([COMMUNICATION])
+    assert match is None
+    index.add([(1, fp)])
+    near = q('Communication is mainly about transmitting the information from one entity to another?',
+             COMMUNICATION['options'])
+    fresh = q('Which layer of the OSI model handles routing between networks?', ['Physical', 'Network', 'Session', 'Application'])
+    results = index.check([dict(COMMUNICATION, options=COMMUNICATION['options'][::-1]), near, fresh, dict(fresh)])
+    matches = [match for _, match in results]
+    assert matches[0] == ('duplicate', 1, 1.0)
+    assert matches[1][:2] == ('near-duplicate', 1) and matches[1][2] >= dedup.NEAR_THRESHOLD
+    assert matches[2] is None
+    assert matches[3] == ('duplicate', ('batch', 2), 1.0)
+
+def test_sync_follows_edits_and_removals(tmp_path):
+    index = dedup.FingerprintIndex(str(tmp_path / 'fingerprints.db'))
+    bank = [dict(q(f'Distinct question number {i} about topic {i * 13}?'), id=i) for i in range(1, 6)]
+    assert index.sync(bank) == 5
+    assert index.sync(bank) == 0
+    bank[0] = dict(bank[0], question='Completely rewritten question about something else?')
+    assert index.sync(bank[:4]) == 2   # one edited, one removed
+    assert index.count() == 4
+    [(_, match)] = index.check([bank[0]])
+    assert match == ('duplicate', 1, 1.0)
@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+import grading
+from grading import NO_ANSWER, NOT_REACHED
+
+def test_grade_answer():
+    assert grading.grade_answer(2, 2, False, 'easy') == (True, 1)
+    assert grading.grade_answer(2, 3, False, 'hard') == (False, -0.25)
+    assert grading.grade_answer(2, 2, True, 'hard') == (False, -0.25)   # a timed-out answer never scores
+    assert grading.grade_answer(2, None, False, 'medium') == (False, 0)
+
+def test_accuracy_and_whole():
+    assert grading.accuracy(2, 3) == 66
+    assert grading.accuracy(0, 0) == 0
+    assert grading.whole(5.0) == 5 and isinstance(grading.whole(5.0), int)
+    assert grading.whole(4.75) == 4.75
+
+def one_by_one(key, row, difficulty, timeouts):
+    score = correct = attempted = 0
+    for j, choice in enumerate(row):
+        if choice == NOT_REACHED: continue
+        attempted += 1
+        is_correct, delta = grading.grade_answer(key[j], choice or None, timeouts[j], difficulty)
+        correct += is_correct
+        score += delta
+    return grading.whole(score), correct, attempted, grading.accuracy(correct, len(row))
+
+@pytest.mark.parametrize('sheets', ['numpy', 'python'])
+def test_grade_sheets_matches_grade_answer(sheets):
+    if sheets == 'numpy': pytest.importorskip('numpy')
+    grade = grading.grade_sheets if sheets == 'numpy' else grading._grade_sheets_py
+    rng = random.Random(7)
+    n, q = 40, 12
+    key = [rng.randint(1, 4) for _ in range(q)]
+    responses = [[rng.choice([NO_ANSWER, NOT_REACHED, 1, 2, 3, 4]) for _ in range(q)] for _ in range(n)]
+    timeouts = [[rng.random() < 0.1 for _ in range(q)] for _ in range(n)]
+    modes = [rng.choice(['easy', 'medium', 'hard']) for _ in range(n)]
+    result = grade(key, responses, modes, timeouts, None)
+    for i in range(n):
+        got = (result['score'][i], result['correct'][i], result['attempted'][i], result['accuracy'][i])
+        assert got == one_by_one(key, responses[i], modes[i], timeouts[i])
+
+def test_grade_sheets_single_sheet_and_per_candidate_keys():
+    assert grading.grade_sheets([1, 2, 3], [1, 2, 4], 'hard')['score'] == [1.75]
+    result = grading.grade_sheets([[1, 1], [2, 2]], [[1, 1], [1, 2]], total=4)
+    assert result['correct'] == [2, 1] and result['accuracy'] == [50, 25]
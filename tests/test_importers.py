@@ -0,0 +1,139 @@
+import io
+import json
+
+import pytest
+
+import importers
+
+def run_import(text, fmt, subject=None, workers=0, chunk_size=importers.IMPORT_CHUNK):
+    stored = []
+    def store(chunk, stats):
+        stored.extend(chunk)
+        stats['accepted'] += len(chunk)
+    data = text if isinstance(text, bytes) else text.encode('utf-8')
+    stats = importers.import_stream(io.BytesIO(data), fmt, store, workers=workers, subject=subject, chunk_size=chunk_size)
+    return stored, stats
+
+def parse(fmt, record):
+    return importers.FORMATS[fmt].parse(record)
+
+# --- CSV ---
+
+def test_csv_line_numbers_after_multiline_field():
+    text = ('question,a,b,c,d,answer\n'
+            '"Spread\nover\nthree lines?",w,x,y,z,1\n'
+            'Bad answer?,w,x,y,z,9\n'
+            'Last?,w,x,y,z,B\n')
+    stored, stats = run_import(text, 'csv')
+    assert [line for line, _ in stored] == [2, 6]
+    assert stats['reasons'] == [(5, 'answer 9 is not between 1 and 4')]
+    assert stored[0][1]['question'] == 'Spread\nover\nthree lines?'
+
+def test_csv_header_skipped_and_letter_answers():
+    stored, stats = run_import('Question,a,b,c,d,answer\nQ1?,w,x,y,z,(C)\nQ2?,w,x,y,z,d\n', 'csv')
+    assert [q['answer'] for _, q in stored] == [3, 4]
+    assert stats['rows'] == 2
+
+def test_csv_unquoted_commas_are_rejoined():
+    q, reason = parse('csv', ['Hello', ' world?', 'a', 'b', 'c', 'd', '2'])
+    assert reason is None
+    assert q['question'] == 'Hello, world?' and q['options'] == ['a', 'b', 'c', 'd']
+
+def test_csv_rejects_short_rows_and_text_answers():
+    assert parse('csv', ['Q?', 'a', 'b'])[1] == 'expected at least 6 columns, got 3'
+    assert parse('csv', ['Q?', 'a', 'b', 'c', 'd', 'a'])[0]['answer'] == 1   # a letter, not option text
+    assert 'not an option number or letter' in parse('csv', ['Q?', 'x', 'y', 'z', 'w', 'y'])[1]
+
+def test_subject_option_only_fills_missing_subjects():
+    text = 'question,a,b,c,d,answer,subject\nQ1?,w,x,y,z,1,General\nQ2?,w,x,y,z,1\nQ3?,w,x,y,z,1,Maths\n'
+    stored, _ = run_import(text, 'csv', subject='Physics')
+    assert [q['subject'] for _, q in stored] == ['General', 'Physics', 'Maths']
+    stored, _ = run_import(text, 'csv')
+    assert [q['subject'] for _, q in stored] == ['General', 'General', 'Maths']
+
+# --- JSON Lines ---
+
+def test_jsonl_records_and_rejections():
+    lines = [json.dumps({'question': 'Q1?', 'options': ['a', 'b'], 'answer': 'b', 'subject': 'S'}),
+             '',
+             '{not json',
+             json.dumps({'question': 'Q2?', 'options': 'a,b', 'answer': 1}),
+             json.dumps([1, 2])]
+    stored, stats = run_import('\n'.join(lines) + '\n', 'jsonl')
+    assert stored == [(1, {'question': 'Q1?', 'options': ['a', 'b'], 'answer': 2, 'subject': 'S'})]
+    assert [line for line, _ in stats['reasons']] == [3, 4, 5]
+    assert stats['reasons'][1][1] == 'options must be a list'
+
+# --- Aiken ---
+
+@pytest.mark.parametrize('mark', ['.', ')'])
+def test_aiken_option_styles(mark):
+    text = f'What is 2 + 2?\nA{mark} 3\nB{mark} 4\nC{mark} 5\nANSWER: B\n'
+    stored, stats = run_import(text, 'aiken')
+    assert stats['rejected'] == 0
+    assert stored[0][1]['options'] == ['3', '4', '5'] and stored[0][1]['answer'] == 2
+
+def test_aiken_rejections_keep_the_record_start_line():
+    text = ('Good?\nA. yes\nB. no\nANSWER: A\n\n'
+            'Out of order?\nA. one\nC. three\nANSWER: A\n\n'
+            'No answer line?\nA. one\nB. two\n')
+    stored, stats = run_import(text, 'aiken')
+    assert [line for line, _ in stored] == [1]
+    assert stats['reasons'] == [(6, 'option C out of order'), (11, 'missing ANSWER line')]
+
+# --- GIFT ---
+
+def test_gift_multiple_choice_with_category_and_escapes():
+    text = ('$CATEGORY: top/Networks\n'
+            '// a comment\n'
+            '::Q1:: Which port does HTTP use \\{by default\\}? {~21 =80 ~443}\n')
+    stored, stats = run_import(text, 'gift')
+    assert stats['rejected'] == 0
+    line, q = stored[0]
+    assert line == 3
+    assert q == {'question': 'Which port does HTTP use {by default}?', 'options': ['21', '80', '443'],
+                 'answer': 2, 'subject': 'Networks'}
+
+@pytest.mark.parametrize('record', ['The sky is blue. {T}', 'Two plus two? {#4}', 'Match {=a -> 1 =b -> 2}', 'Essay {}'])
+def test_gift_rejects_non_multiple_choice(record):
+    q, reason = parse('gift', (record, None))
+    assert q is None and reason
+
+def test_gift_weighted_answer_and_two_right_answers():
+    assert parse('gift', ('Pick? {~%100%yes ~no}', None))[0]['answer'] == 1
+    assert parse('gift', ('Pick? {=yes =also}', None)) == (None, 'more than one correct answer')
+
+# --- XLSX ---
+
+def test_xlsx_rows_like_csv(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    book = openpyxl.Workbook()
+    sheet = book.active
+    sheet.append(['question', 'a', 'b', 'c', 'd', 'answer'])
+    sheet.append(['Q1?', 'w', 'x', 'y', 'z', 2.0])
+    sheet.append([None])
+    sheet.append(['Q2?', 'w', 'x', 'y', 'z', 'D', None])
+    path = tmp_path / 'q.xlsx'
+    book.save(path)
+    stored, stats = run_import(path.read_bytes(), 'xlsx')
+    assert [(line, q['answer']) for line, q in stored] == [(2, 2), (4, 4)]
+
+# --- Pipeline ---
+
+def test_process_pool_keeps_input_order():
+    records = [(i, ['Q%d?' % i, 'a', 'b', 'c', 'd', '9' if i % 7 == 0 else '1']) for i in range(1, 96)]
+    serial = [row for chunk in importers.parsed_chunks('csv', iter(records), 0, 10) for row in chunk]
+    pooled_chunks = list(importers.parsed_chunks('csv', iter(records), 2, 10))
+    assert [len(chunk) for chunk in pooled_chunks] == [10] * 9 + [5]
+    assert [row for chunk in pooled_chunks for row in chunk] == serial
+    assert [line for line, q, _ in serial if q is None] == list(range(7, 96, 7))
+
+def test_import_stream_with_workers_matches_serial():
+    text = 'question,a,b,c,d,answer\n' + ''.join(f'Question {i}?,w,x,y,z,{i % 5}\n' for i in range(250))
+    assert run_import(text, 'csv', workers=2, chunk_size=40) == run_import(text, 'csv')
+
+def test_detect_format():
+    assert importers.detect_format('bank.GIFT') == 'gift'
+    assert importers.detect_format('bank.ndjson') == 'jsonl'
+    assert importers.detect_format('bank.txt') == 'aiken'
+    assert importers.detect_format(None) == 'csv'
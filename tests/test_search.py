@@ -0,0 +1,45 @@
+import search
+
+BANK = [
+    {'id': 1, 'question': 'What does PSTN stand for?', 'options': ['Public switched telephone network', 'Packet stream'], 'subject': 'Telecom'},
+    {'id': 2, 'question': 'Which satellite was the first geosynchronous telecom satellite?', 'options': ['SYNCOM', 'Telstar'], 'subject': 'Telecom'},
+    {'id': 3, 'question': 'What is the boiling point of water?', 'options': ['100 C', '90 C'], 'subject': 'Physics'},
+    {'id': 4, 'question': 'Telecom telecom telecom?', 'options': ['a', 'b'], 'subject': 'Telecom'},
+]
+
+def build():
+    index = search.SearchIndex()
+    index.sync(BANK)
+    return index
+
+def test_tokenize_drops_stopwords_and_case():
+    assert search.tokenize('What is the PSTN, and WHO runs it?') == ['pstn', 'runs']
+
+def test_search_ranks_by_term_frequency():
+    total, hits = build().search('telecom')
+    assert total == 3
+    assert [qid for qid, _ in hits][0] == 4
+    assert all(score > 0 for _, score in hits)
+
+def test_search_matches_options_and_pages():
+    index = build()
+    assert [qid for qid, _ in index.search('syncom')[1]] == [2]
+    total, page = index.search('telecom', limit=1, offset=1)
+    assert total == 3 and len(page) == 1
+    assert index.search('the is of') == (0, [])
+
+def test_sync_reindexes_changed_and_removed_questions():
+    index = build()
+    edited = [dict(BANK[0], question='What does ISDN stand for?')] + BANK[1:3]
+    assert index.sync(edited) == 2   # one edited, one removed
+    assert index.search('pstn')[0] == 0
+    assert index.search('switched')[1][0][0] == 1   # options are still indexed
+    assert index.search('isdn')[1][0][0] == 1
+    assert len(index) == 3
+
+def test_add_replaces_an_existing_id():
+    index = build()
+    index.add([{'id': 3, 'question': 'Freezing point of water?', 'options': ['0 C', '4 C'], 'subject': 'Physics'}])
+    assert index.search('boiling')[0] == 0
+    assert [qid for qid, _ in index.search('freezing')[1]] == [3]
+    assert len(index) == 4